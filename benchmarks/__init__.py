@@ -0,0 +1,3 @@
+"""
+Benchmarks del gestor sobre directorios de Brave sintéticos
+"""
\ No newline at end of file
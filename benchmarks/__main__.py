@@ -0,0 +1,71 @@
+"""
+Ejecuta los benchmarks: python -m benchmarks [--scale medium] [--compare latest]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks.harness import BenchmarkHarness, Operations
+from benchmarks.profile_generator import BenchmarkScale
+from utils.json_backend import JsonBackend
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Mide las operaciones del gestor sobre un User Data sintético")
+    parser.add_argument("--scale", choices=list(BenchmarkScale.PRESETS), default="small",
+                        help="Tamaño predefinido del árbol (por defecto small)")
+    parser.add_argument("--profiles", type=int, help="Cantidad de perfiles")
+    parser.add_argument("--files", type=int, dest="files_per_profile", help="Archivos de datos por perfil")
+    parser.add_argument("--avg-file-kb", type=int, help="Tamaño medio de esos archivos")
+    parser.add_argument("--cache-mb", type=int, dest="cache_mb_per_profile", help="MB de cachés por perfil")
+    parser.add_argument("--prefs-kb", type=int, help="Tamaño de cada Preferences")
+    parser.add_argument("--seed", type=int, help="Semilla del generador")
+    parser.add_argument("--ops", help=f"Operaciones separadas por coma (de: {', '.join(Operations.ALL)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Corridas por operación (se informa la mediana)")
+    parser.add_argument("--workdir", type=Path,
+                        help="Carpeta para el árbol y las corridas (por defecto un temporal que se borra)")
+    parser.add_argument("--output", type=Path, help="Carpeta de resultados (por defecto benchmarks/results/)")
+    parser.add_argument("--no-save", action="store_true", help="No guardar los resultados")
+    parser.add_argument("--compare", metavar="ARCHIVO",
+                        help='Resultados contra los que comparar ("latest": la última corrida guardada)')
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida de las operaciones")
+    args = parser.parse_args()
+    
+    scale = BenchmarkScale.preset(args.scale, profiles=args.profiles, files_per_profile=args.files_per_profile,
+                                  avg_file_kb=args.avg_file_kb, cache_mb_per_profile=args.cache_mb_per_profile,
+                                  prefs_kb=args.prefs_kb, seed=args.seed)
+    operations = [name.strip() for name in args.ops.split(",") if name.strip()] if args.ops else None
+    
+    baseline_path = None
+    if args.compare == "latest":
+        baseline_path = BenchmarkHarness.latest(args.output)
+        if baseline_path is None:
+            print("⚠️ No hay resultados anteriores para comparar")
+    elif args.compare:
+        baseline_path = Path(args.compare)
+    
+    try:
+        results = BenchmarkHarness.run(scale, operations, max(1, args.repeat), args.workdir, args.verbose)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if not args.no_save:
+        print(f"💾 Resultados: {BenchmarkHarness.save(results, args.output)}")
+    
+    if baseline_path:
+        comparison = BenchmarkHarness.compare(JsonBackend.load(baseline_path), results)
+        print(f"\n📊 Comparación con {baseline_path.name}:")
+        for name, row in comparison.items():
+            mark = "🔴" if row["regression"] else "🟢" if row["change"] < -BenchmarkHarness.REGRESSION_THRESHOLD else "⚪"
+            print(f"   {mark} {name:<27} {row['old_s'] * 1000:>10.1f} → {row['new_s'] * 1000:>10.1f} ms "
+                  f"({row['change'] * 100:+.1f}%)")
+        if any(row["regression"] for row in comparison.values()):
+            return 1
+    
+    failed = [name for name, summary in results["results"].items() if "error" in summary]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
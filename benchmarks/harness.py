@@ -0,0 +1,422 @@
+"""
+Harness de benchmarks: mide cada operación en un proceso aparte
+"""
+import contextlib
+import datetime
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de memoria
+    resource = None
+
+from benchmarks.profile_generator import BenchmarkScale, ProfileGenerator
+from utils.json_backend import JsonBackend
+
+
+class Operations:
+    """
+    Operaciones medidas. Cada una tiene una preparación (no se mide) y una
+    ejecución que devuelve (archivos, bytes) procesados para calcular el
+    throughput. Corren con el directorio de trabajo en una carpeta nueva: el
+    backup/, saved_configs/ y .cache/ del gestor empiezan vacíos.
+    """
+    
+    @staticmethod
+    def _backup_workload(user_data: Path) -> Tuple[int, int]:
+        """Archivos y bytes que entran en un backup por defecto (sin cachés ni volátiles)"""
+        from storage.copy_engine import CopyEngine
+        from storage.exclusion_rules import ExclusionRules
+        
+        files = total = 0
+        for kind, path, _ in CopyEngine.walk_tree(user_data, ExclusionRules.for_backup()):
+            if kind == "file":
+                files += 1
+                total += os.stat(path).st_size
+        return files, total
+    
+    @staticmethod
+    def _profile_dirs(user_data: Path) -> List[Path]:
+        from core.profile_handler import ProfileHandler
+        return ProfileHandler.list_profile_dirs(user_data)
+    
+    @staticmethod
+    def _backup(user_data: Path, **kwargs) -> Path:
+        from storage.backup_manager import BackupManager
+        backup_path = BackupManager.create_backup(brave_config=user_data, **kwargs)
+        if backup_path is None:
+            raise RuntimeError("create_backup devolvió None")
+        return backup_path
+    
+    @staticmethod
+    def detect_profiles(user_data: Path, _) -> Tuple[int, int]:
+        from core.profile_handler import ProfileHandler
+        return len(ProfileHandler.detect_profiles(user_data)), 0
+    
+    @staticmethod
+    def profile_from_path(user_data: Path, dirs: List[Path]) -> Tuple[int, int]:
+        from models.profile import Profile
+        for path in dirs:
+            Profile.from_path(path)
+        return len(dirs), 0
+    
+    @staticmethod
+    def profile_size(user_data: Path, dirs: List[Path]) -> Tuple[int, int]:
+        from models.profile import Profile
+        return len(dirs), sum(Profile.from_path(path).size for path in dirs)
+    
+    @staticmethod
+    def extract_settings(user_data: Path, dirs: List[Path]) -> Tuple[int, int]:
+        from core.extraction_engine import ExtractionEngine
+        for path in dirs:
+            if ExtractionEngine.extract_settings(path) is None:
+                raise RuntimeError(f"extract_settings falló en {path.name}")
+        return len(dirs), sum((path / "Preferences").stat().st_size for path in dirs)
+    
+    @staticmethod
+    def create_backup(user_data: Path, workload: Tuple[int, int]) -> Tuple[int, int]:
+        Operations._backup(user_data)
+        return workload
+    
+    @staticmethod
+    def create_backup_archive(user_data: Path, workload: Tuple[int, int]) -> Tuple[int, int]:
+        Operations._backup(user_data, archive=True)
+        return workload
+    
+    @staticmethod
+    def _prepare_incremental(user_data: Path) -> Tuple[int, int]:
+        """Backup completo y después cambia un 5% de los archivos del backup"""
+        from storage.copy_engine import CopyEngine
+        from storage.exclusion_rules import ExclusionRules
+        
+        Operations._backup(user_data)
+        # El nombre del backup tiene resolución de segundos
+        time.sleep(1.1)
+        for index, (kind, path, _) in enumerate(CopyEngine.walk_tree(user_data, ExclusionRules.for_backup())):
+            if kind == "file" and index % 20 == 0 and not path.endswith("Preferences"):
+                with open(path, "ab") as f:
+                    f.write(b"\0" * 64)
+        return Operations._backup_workload(user_data)
+    
+    @staticmethod
+    def create_backup_incremental(user_data: Path, workload: Tuple[int, int]) -> Tuple[int, int]:
+        Operations._backup(user_data, incremental=True)
+        return workload
+    
+    @staticmethod
+    def restore_backup(user_data: Path, backup_path: Path) -> Tuple[int, int]:
+        from storage.backup_manager import BackupManager
+        stats = BackupManager.restore_backup(backup_path, Path.cwd() / "restored")
+        return stats.files, stats.bytes
+    
+    @staticmethod
+    def restore_directory(user_data: Path, _) -> Tuple[int, int]:
+        from storage.backup_manager import BackupManager
+        stats = BackupManager.restore_directory(user_data, Path.cwd() / "restored")
+        return stats.files, stats.bytes
+    
+    # operación: método de preparación (recibe el User Data y su resultado se pasa a la operación)
+    ALL: Dict[str, Optional[str]] = {
+        "detect_profiles": None,
+        "profile_from_path": "_profile_dirs",
+        "profile_size": "_profile_dirs",
+        "extract_settings": "_profile_dirs",
+        "create_backup": "_backup_workload",
+        "create_backup_incremental": "_prepare_incremental",
+        "create_backup_archive": "_backup_workload",
+        "restore_backup": "_backup",
+        "restore_directory": None,
+    }
+
+
+class BenchmarkHarness:
+    """
+    Genera un User Data sintético y mide las operaciones del gestor sobre él.
+    
+    Cada corrida de cada operación es un proceso nuevo (spawn), con su
+    propio directorio de trabajo: sin cachés en memoria ni en disco de la
+    corrida anterior y con un pico de memoria que es solo suyo. En Linux el
+    pico se mide desde el inicio de la operación (se reinicia VmHWM después
+    de la preparación); en otros sistemas incluye la preparación.
+    
+    Los resultados se guardan como JSON en benchmarks/results/ con la
+    versión (commit) del código, y compare() los contrasta con una corrida
+    anterior para ver regresiones.
+    """
+    
+    RESULTS_DIR = Path(__file__).resolve().parent / "results"
+    RESULTS_VERSION = 1
+    # Diferencia de tiempo a partir de la cual compare() marca una regresión
+    REGRESSION_THRESHOLD = 0.10
+    # ...y que además supere esto en segundos (las operaciones de pocos ms tienen mucho ruido)
+    REGRESSION_MIN_SECONDS = 0.005
+    
+    @staticmethod
+    def _reset_peak_rss() -> bool:
+        """Reinicia el pico de memoria del proceso (solo Linux)"""
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            return True
+        except OSError:
+            return False
+    
+    @staticmethod
+    def _peak_rss(reset: bool) -> Optional[int]:
+        """Pico de memoria residente en bytes (incluye procesos hijos ya terminados)"""
+        if reset:
+            try:
+                with open("/proc/self/status") as f:
+                    for line in f:
+                        if line.startswith("VmHWM:"):
+                            own = int(line.split()[1]) * 1024
+                            break
+                    else:
+                        own = None
+            except OSError:
+                own = None
+            if own is not None:
+                children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024 if resource else 0
+                return max(own, children)
+        if resource is None:
+            return None
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        unit = 1 if sys.platform == "darwin" else 1024
+        return max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) * unit
+    
+    @staticmethod
+    def _child(name: str, user_data: str, workdir: str, repo_root: str, verbose: bool, queue):
+        """Cuerpo del proceso que mide una corrida (corre con spawn)"""
+        if repo_root not in sys.path:
+            sys.path.insert(0, repo_root)
+        os.chdir(workdir)
+        prepare = Operations.ALL[name]
+        try:
+            with contextlib.ExitStack() as stack:
+                if not verbose:
+                    devnull = stack.enter_context(open(os.devnull, "w"))
+                    stack.enter_context(contextlib.redirect_stdout(devnull))
+                    stack.enter_context(contextlib.redirect_stderr(devnull))
+                source = Path(user_data)
+                context = getattr(Operations, prepare)(source) if prepare else None
+                reset = BenchmarkHarness._reset_peak_rss()
+                started = time.perf_counter()
+                files, size = getattr(Operations, name)(source, context)
+                wall = time.perf_counter() - started
+            queue.put({"ok": True, "wall_s": wall, "files": files, "bytes": size,
+                       "peak_rss": BenchmarkHarness._peak_rss(reset)})
+        except BaseException:
+            queue.put({"ok": False, "error": traceback.format_exc()})
+    
+    @staticmethod
+    def run_once(name: str, user_data: Path, workroot: Path, verbose: bool = False) -> Dict[str, Any]:
+        """
+        Mide una corrida de una operación en un proceso nuevo
+        
+        Args:
+            name: Operación (clave de Operations.ALL)
+            user_data: User Data sintético
+            workroot: Carpeta donde crear el directorio de trabajo de la corrida
+            verbose: Mostrar la salida de la operación
+        
+        Returns:
+            Diccionario con wall_s, files, bytes y peak_rss (o ok=False y error)
+        """
+        workdir = workroot / f"run_{name}_{time.monotonic_ns()}"
+        workdir.mkdir(parents=True)
+        # La copia de user_data que modifica el incremental no debe afectar a las demás operaciones
+        source = user_data
+        if name == "create_backup_incremental":
+            source = workdir / "User Data"
+            shutil.copytree(user_data, source, symlinks=True)
+        
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        repo_root = str(Path(__file__).resolve().parent.parent)
+        process = ctx.Process(target=BenchmarkHarness._child,
+                              args=(name, str(source), str(workdir), repo_root, verbose, queue))
+        process.start()
+        try:
+            result = queue.get()
+        finally:
+            process.join()
+            shutil.rmtree(workdir, ignore_errors=True)
+        return result
+    
+    @staticmethod
+    def _summary(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Mediana de tiempo y throughput de las corridas de una operación"""
+        wall = statistics.median(run["wall_s"] for run in runs)
+        files = runs[0]["files"]
+        size = runs[0]["bytes"]
+        peaks = [run["peak_rss"] for run in runs if run.get("peak_rss")]
+        return {
+            "wall_s": round(wall, 6),
+            "wall_min_s": round(min(run["wall_s"] for run in runs), 6),
+            "files": files,
+            "bytes": size,
+            "files_per_s": round(files / wall, 1) if wall > 0 else None,
+            "mb_per_s": round(size / (1024 * 1024) / wall, 2) if wall > 0 and size else None,
+            "peak_rss_mb": round(max(peaks) / (1024 * 1024), 1) if peaks else None,
+            "runs": [round(run["wall_s"], 6) for run in runs],
+        }
+    
+    @staticmethod
+    def _git_version(repo_root: Path) -> Dict[str, Any]:
+        """Commit actual y si hay cambios sin commitear (vacío si no hay git)"""
+        def git(*args) -> Optional[str]:
+            try:
+                out = subprocess.run(["git", *args], cwd=repo_root, capture_output=True, text=True, timeout=10)
+            except (OSError, subprocess.SubprocessError):
+                return None
+            return out.stdout.strip() if out.returncode == 0 else None
+        
+        commit = git("rev-parse", "--short", "HEAD")
+        if commit is None:
+            return {}
+        return {"commit": commit, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    
+    @staticmethod
+    def run(scale: BenchmarkScale, operations: Optional[List[str]] = None, repeat: int = 3,
+            workroot: Optional[Path] = None, verbose: bool = False) -> Dict[str, Any]:
+        """
+        Genera el árbol sintético y mide las operaciones
+        
+        Args:
+            scale: Tamaño del User Data a generar
+            operations: Operaciones a medir (por defecto todas)
+            repeat: Corridas por operación (se informa la mediana)
+            workroot: Carpeta temporal (por defecto una nueva en el temporal del sistema)
+            verbose: Mostrar la salida de las operaciones
+        
+        Returns:
+            Resultados en el formato que guarda save()
+        """
+        import tempfile
+        
+        operations = operations or list(Operations.ALL)
+        unknown = [name for name in operations if name not in Operations.ALL]
+        if unknown:
+            raise ValueError(f"Operaciones desconocidas: {', '.join(unknown)}")
+        
+        own_root = workroot is None
+        workroot = Path(tempfile.mkdtemp(prefix="brave_cm_bench_")) if own_root else Path(workroot)
+        try:
+            user_data = workroot / "User Data"
+            if user_data.exists():
+                shutil.rmtree(user_data)
+            print(f"🏗️ Generando User Data sintético en {user_data}...")
+            started = time.perf_counter()
+            files, size = ProfileGenerator.generate(user_data, scale)
+            print(f"   {files} archivos, {size / (1024 * 1024):.1f} MB en {time.perf_counter() - started:.1f}s")
+            
+            results = {}
+            for name in operations:
+                runs = []
+                for attempt in range(repeat):
+                    run = BenchmarkHarness.run_once(name, user_data, workroot, verbose)
+                    if not run["ok"]:
+                        print(f"❌ {name}: falló\n{run['error']}")
+                        break
+                    runs.append(run)
+                if runs:
+                    results[name] = BenchmarkHarness._summary(runs)
+                    BenchmarkHarness._print_row(name, results[name])
+                else:
+                    results[name] = {"error": run["error"].strip().splitlines()[-1]}
+        finally:
+            if own_root:
+                shutil.rmtree(workroot, ignore_errors=True)
+        
+        repo_root = Path(__file__).resolve().parent.parent
+        return {
+            "version": BenchmarkHarness.RESULTS_VERSION,
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "code": BenchmarkHarness._git_version(repo_root),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "json_codec": JsonBackend.name,
+            "scale": scale.to_dict(),
+            "tree": {"files": files, "bytes": size},
+            "repeat": repeat,
+            "results": results,
+        }
+    
+    @staticmethod
+    def _print_row(name: str, summary: Dict[str, Any]):
+        rate = f"{summary['files_per_s']:>10.0f} arch/s" if summary["files_per_s"] else " " * 17
+        mb = f"{summary['mb_per_s']:>8.1f} MB/s" if summary["mb_per_s"] else " " * 13
+        rss = f"{summary['peak_rss_mb']:>7.1f} MB RSS" if summary["peak_rss_mb"] else ""
+        print(f"   {name:<27} {summary['wall_s'] * 1000:>10.1f} ms {rate} {mb} {rss}")
+    
+    @staticmethod
+    def save(results: Dict[str, Any], results_dir: Optional[Path] = None) -> Path:
+        """
+        Guarda los resultados como JSON (nombre con fecha y commit)
+        
+        Args:
+            results: Resultado de run()
+            results_dir: Carpeta destino (por defecto benchmarks/results/)
+        
+        Returns:
+            Path al archivo escrito
+        """
+        results_dir = Path(results_dir or BenchmarkHarness.RESULTS_DIR)
+        results_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.datetime.fromisoformat(results["created_at"]).strftime("%Y%m%d_%H%M%S")
+        commit = results.get("code", {}).get("commit")
+        path = results_dir / (f"{stamp}_{commit}.json" if commit else f"{stamp}.json")
+        JsonBackend.dump(results, path)
+        return path
+    
+    @staticmethod
+    def latest(results_dir: Optional[Path] = None, exclude: Optional[Path] = None) -> Optional[Path]:
+        """Último archivo de resultados guardado (el nombre empieza con la fecha)"""
+        results_dir = Path(results_dir or BenchmarkHarness.RESULTS_DIR)
+        candidates = sorted(path for path in results_dir.glob("*.json") if path != exclude) \
+            if results_dir.is_dir() else []
+        return candidates[-1] if candidates else None
+    
+    @staticmethod
+    def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Compara dos corridas operación por operación
+        
+        Los tiempos solo son comparables con la misma escala: si difieren se
+        avisa, pero igual se compara.
+        
+        Args:
+            baseline: Resultados de referencia
+            current: Resultados nuevos
+        
+        Returns:
+            {operación: {"old_s", "new_s", "change", "regression"}} para las
+            operaciones medidas en ambas
+        """
+        if baseline.get("scale") != current.get("scale"):
+            print("⚠️ Las corridas usan escalas distintas: los tiempos no son comparables del todo")
+        comparison = {}
+        for name, summary in current["results"].items():
+            old = baseline.get("results", {}).get(name)
+            if not old or "wall_s" not in old or "wall_s" not in summary:
+                continue
+            change = (summary["wall_s"] - old["wall_s"]) / old["wall_s"] if old["wall_s"] else 0.0
+            comparison[name] = {
+                "old_s": old["wall_s"],
+                "new_s": summary["wall_s"],
+                "change": round(change, 4),
+                "regression": (change > BenchmarkHarness.REGRESSION_THRESHOLD and
+                               summary["wall_s"] - old["wall_s"] > BenchmarkHarness.REGRESSION_MIN_SECONDS),
+            }
+        return comparison
\ No newline at end of file
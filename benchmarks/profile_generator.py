@@ -0,0 +1,164 @@
+"""
+Generador de directorios User Data sintéticos para benchmarks
+"""
+import copy
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from core.diff_engine import DiffEngine
+from utils.json_backend import JsonBackend
+
+
+@dataclass
+class BenchmarkScale:
+    """Tamaño del directorio de Brave a generar"""
+    profiles: int = 3
+    files_per_profile: int = 500
+    avg_file_kb: int = 16
+    cache_mb_per_profile: int = 20
+    prefs_kb: int = 200
+    seed: int = 1
+    
+    PRESETS = {
+        "small": dict(profiles=2, files_per_profile=200, avg_file_kb=8, cache_mb_per_profile=5, prefs_kb=100),
+        "medium": dict(profiles=4, files_per_profile=1500, avg_file_kb=16, cache_mb_per_profile=40, prefs_kb=400),
+        "large": dict(profiles=10, files_per_profile=5000, avg_file_kb=24, cache_mb_per_profile=150, prefs_kb=1500),
+    }
+    
+    @classmethod
+    def preset(cls, name: str, **overrides) -> 'BenchmarkScale':
+        """Escala predefinida ("small", "medium", "large") con campos sobrescritos (los None se ignoran)"""
+        values = dict(cls.PRESETS[name])
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**values)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario para el JSON de resultados"""
+        return asdict(self)
+
+
+class ProfileGenerator:
+    """
+    Arma un árbol con la forma de un User Data de Brave real.
+    
+    - Local State con profile.info_cache (nombres de todos los perfiles)
+    - Por perfil: Preferences construido a partir de una configuración
+      guardada (Linux/Dayvis/Default.json) y rellenado con extensiones
+      hasta el tamaño pedido
+    - Archivos chicos repartidos como en un perfil real (LevelDB,
+      IndexedDB, extensiones) y cachés regenerables en Cache/ y Code Cache/
+    - Archivos de bloqueo en la raíz, como con Brave abierto
+    
+    Todo sale de un random.Random con semilla: la misma escala genera
+    siempre el mismo árbol, así los resultados entre versiones son comparables.
+    """
+    
+    SEED_CONFIG = Path(__file__).resolve().parent.parent / "Linux" / "Dayvis" / "Default.json"
+    
+    # Carpetas donde se reparten los archivos de un perfil (peso relativo)
+    DATA_DIRS = (
+        ("Local Storage/leveldb", 3),
+        ("IndexedDB/https_example.com_0.indexeddb.leveldb", 2),
+        ("Session Storage", 1),
+        ("Extensions", 3),
+        ("Local Extension Settings", 1),
+        ("Sync Data/LevelDB", 1),
+    )
+    CACHE_FILE_KB = 256
+    
+    @staticmethod
+    def _seed_preferences() -> Dict[str, Any]:
+        """Preferences mínimo a partir de la configuración de ejemplo del repo"""
+        if ProfileGenerator.SEED_CONFIG.exists():
+            return DiffEngine.config_view(JsonBackend.load(ProfileGenerator.SEED_CONFIG))
+        return {"brave": {}, "shortcuts": {}}
+    
+    @staticmethod
+    def _preferences(rng: random.Random, base: Dict[str, Any], name: str, target_bytes: int) -> bytes:
+        """Preferences del perfil rellenado con extensiones falsas hasta target_bytes"""
+        prefs = copy.deepcopy(base)
+        prefs.setdefault("profile", {})["name"] = name
+        settings = prefs.setdefault("extensions", {}).setdefault("settings", {})
+        
+        data = JsonBackend.dumpb(prefs, compact=True)
+        while len(data) < target_bytes:
+            # Se agregan en tandas y se re-serializa: el tamaño final queda cerca del pedido
+            missing = target_bytes - len(data)
+            for _ in range(max(1, missing // 600)):
+                ext_id = "".join(rng.choice("abcdefghijklmnop") for _ in range(32))
+                settings[ext_id] = {
+                    "active_permissions": {"api": ["storage", "tabs"], "explicit_host": [], "manifest_permissions": []},
+                    "creation_flags": rng.randint(1, 64),
+                    "first_install_time": str(13300000000000000 + rng.randint(0, 10 ** 12)),
+                    "location": rng.choice((1, 4, 10)),
+                    "path": f"{ext_id}/{rng.randint(1, 9)}.{rng.randint(0, 99)}.0_0",
+                    "state": 1,
+                    "was_installed_by_default": False,
+                }
+            data = JsonBackend.dumpb(prefs, compact=True)
+        return data
+    
+    @staticmethod
+    def _write(path: Path, size: int, rng: random.Random) -> int:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Mitad aleatoria y mitad repetida: comprime como los datos reales, ni todo ni nada
+        half = size // 2
+        path.write_bytes(rng.randbytes(half) + bytes(size - half))
+        return size
+    
+    @staticmethod
+    def generate(root: Path, scale: BenchmarkScale, seed_prefs: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+        """
+        Genera un directorio User Data en root (que no debe existir)
+        
+        Args:
+            root: Carpeta a crear
+            scale: Cantidad de perfiles, archivos, cachés y tamaño de Preferences
+            seed_prefs: Preferences base (por defecto el de la configuración de ejemplo)
+        
+        Returns:
+            (archivos, bytes) generados
+        """
+        rng = random.Random(scale.seed)
+        base = seed_prefs if seed_prefs is not None else ProfileGenerator._seed_preferences()
+        root.mkdir(parents=True)
+        files = total = 0
+        
+        names = ["Default"] + [f"Profile {i}" for i in range(1, scale.profiles)]
+        info_cache = {}
+        weights = [weight for _, weight in ProfileGenerator.DATA_DIRS]
+        
+        for index, folder in enumerate(names):
+            display = f"Perfil {index + 1}"
+            info_cache[folder] = {"name": display, "is_using_default_name": False}
+            profile = root / folder
+            
+            prefs = ProfileGenerator._preferences(rng, base, display, scale.prefs_kb * 1024)
+            profile.mkdir()
+            (profile / "Preferences").write_bytes(prefs)
+            (profile / "Secure Preferences").write_bytes(b'{"protection":{}}')
+            files += 2
+            total += len(prefs) + 17
+            
+            for n in range(scale.files_per_profile):
+                directory = rng.choices(ProfileGenerator.DATA_DIRS, weights)[0][0]
+                if directory == "Extensions":
+                    directory = f"Extensions/ext{n % 40:02d}/1.0.{n % 7}_0"
+                # Tamaños sesgados: muchos archivos chicos y pocos grandes
+                size = int(rng.expovariate(1 / (scale.avg_file_kb * 1024))) + 1
+                total += ProfileGenerator._write(profile / directory / f"{n:06d}.ldb", size, rng)
+                files += 1
+            
+            for n in range(scale.cache_mb_per_profile * 1024 // ProfileGenerator.CACHE_FILE_KB):
+                directory = "Cache/Cache_Data" if n % 4 else "Code Cache/js"
+                total += ProfileGenerator._write(profile / directory / f"f_{n:06x}",
+                                                 ProfileGenerator.CACHE_FILE_KB * 1024, rng)
+                files += 1
+        
+        local_state = JsonBackend.dumpb({"profile": {"info_cache": info_cache, "last_used": "Default"}}, compact=True)
+        (root / "Local State").write_bytes(local_state)
+        (root / "SingletonLock").write_bytes(b"")
+        (root / "lockfile.lock").write_bytes(b"")
+        return files + 3, total + len(local_state)
\ No newline at end of file
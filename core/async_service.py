@@ -0,0 +1,303 @@
+"""
+Servicio asíncrono: detectar, extraer, respaldar y restaurar en paralelo
+"""
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from core.extraction_engine import ExtractionEngine
+from core.extraction_spec import ExtractionSpec
+from core.profile_handler import ProfileHandler
+from models.profile import ExtractionResult, Profile
+from storage.backup_manager import BackupManager
+from storage.catalog import Catalog
+from storage.copy_engine import CopyEngine, CopyStats, OperationCancelled
+
+
+class AsyncService:
+    """
+    Corrutinas sobre las operaciones bloqueantes de core/ y storage/.
+    
+    Cada operación corre en un executor y devuelve el control al event
+    loop, así varias pueden solaparse: respaldar un perfil mientras se
+    extrae otro, o restaurar en un disco mientras se respalda en otro. Los
+    menús y el CLI por lotes usan el mismo servicio con run(), que ejecuta
+    una corrutina hasta el final.
+    
+    - E/O de árboles (backup, restauración): pool de hilos, con un límite
+      de operaciones simultáneas por disco (st_dev de origen y destino), para
+      que dos copias grandes no se peleen el mismo dispositivo
+    - Extracción: pool de procesos (el parseo de JSON ocupa CPU y el GIL),
+      sin límite por disco porque solo lee un Preferences. Los procesos se
+      crean con forkserver (spawn donde no existe), nunca con fork: el pool
+      arranca cuando ya hay hilos trabajando y un fork copiaría locks
+      tomados (ej. el de Tracer)
+    - Cancelación: cancel() (o Ctrl+C dentro de run()) corta todas las
+      operaciones en curso en su próximo archivo; cancelar la tarea asyncio
+      de una operación corta solo esa. En ambos casos se espera a que la
+      operación limpie lo que dejó a medias antes de seguir.
+    """
+    
+    DEFAULT_PER_DEVICE = 2
+    
+    def __init__(self, max_workers: Optional[int] = None, per_device: int = DEFAULT_PER_DEVICE,
+                 extract_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: Hilos para las operaciones de E/O (por defecto CopyEngine.default_workers())
+            per_device: Operaciones de árbol simultáneas por disco
+            extract_workers: Procesos de extracción (por defecto uno por CPU)
+        """
+        self.per_device = max(1, per_device)
+        self.max_workers = max_workers or CopyEngine.default_workers()
+        self._threads = self._thread_pool()
+        self._extract_workers = extract_workers or os.cpu_count() or 1
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._cancelled = threading.Event()
+        self._active: Set[threading.Event] = set()
+        self._active_lock = threading.Lock()
+        self._limits: Dict[int, asyncio.Semaphore] = {}
+        self._limits_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @staticmethod
+    def _mp_context() -> multiprocessing.context.BaseContext:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return multiprocessing.get_context(method)
+    
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="async-service")
+    
+    def __enter__(self) -> 'AsyncService':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+        return False
+    
+    def close(self):
+        """Espera las operaciones en curso y libera los pools"""
+        self._threads.shutdown(wait=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+            self._processes = None
+    
+    # --- cancelación y límites ---
+    
+    @property
+    def cancelled(self) -> bool:
+        """Si se llamó a cancel()"""
+        return self._cancelled.is_set()
+    
+    def cancel(self):
+        """Cancela todas las operaciones en curso y las que se pidan después"""
+        self._cancelled.set()
+        with self._active_lock:
+            for event in self._active:
+                event.set()
+    
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise OperationCancelled("Operación cancelada")
+    
+    @staticmethod
+    def _device(path: Path) -> int:
+        """Dispositivo de path, o del primer ancestro que exista (un destino que todavía no se creó)"""
+        path = Path(path).absolute()
+        for candidate in (path, *path.parents):
+            try:
+                return os.stat(candidate).st_dev
+            except OSError:
+                continue
+        return 0
+    
+    def _limit(self, device: int) -> asyncio.Semaphore:
+        # Los semáforos de asyncio quedan atados al loop donde se usan: uno nuevo por cada run()
+        loop = asyncio.get_running_loop()
+        if self._limits_loop is not loop:
+            self._limits = {}
+            self._limits_loop = loop
+        if device not in self._limits:
+            self._limits[device] = asyncio.Semaphore(self.per_device)
+        return self._limits[device]
+    
+    @contextlib.asynccontextmanager
+    async def _devices(self, paths: Tuple[Path, ...]):
+        """Toma un lugar en cada disco involucrado (siempre en el mismo orden, sin deadlocks)"""
+        async with contextlib.AsyncExitStack() as stack:
+            for device in sorted({self._device(path) for path in paths}):
+                await stack.enter_async_context(self._limit(device))
+            yield
+    
+    def _call(self, event: threading.Event, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        """Corre fn en el hilo del pool con su Event de cancelación"""
+        with CopyEngine.cancel_scope(event):
+            return fn(*args, **kwargs)
+    
+    async def _run(self, paths: Tuple[Path, ...], fn: Callable, *args, **kwargs) -> Any:
+        """
+        Corre una operación bloqueante en el pool de hilos
+        
+        Args:
+            paths: Rutas que lee o escribe (para el límite por disco)
+            fn: Función bloqueante
+        """
+        self._check_cancelled()
+        async with self._devices(paths):
+            self._check_cancelled()
+            event = threading.Event()
+            with self._active_lock:
+                self._active.add(event)
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._threads, self._call, event, fn, args, kwargs)
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Pedirle al hilo que corte y esperarlo: no dejar un backup o staging a medio borrar
+                event.set()
+                await asyncio.wait([future])
+                raise
+            finally:
+                with self._active_lock:
+                    self._active.discard(event)
+            if event.is_set():
+                raise OperationCancelled("Operación cancelada")
+            return result
+    
+    # --- operaciones ---
+    
+    async def detect_profiles(self, brave_path: Optional[Path] = None) -> List[Profile]:
+        """Corrutina de ProfileHandler.detect_profiles (sin límite por disco: solo metadatos)"""
+        self._check_cancelled()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._threads, ProfileHandler.detect_profiles,
+                                          brave_path or ProfileHandler.get_brave_config_path())
+    
+    async def extract(self, profile: Profile, output_path: Path,
+                      spec: Optional[ExtractionSpec] = None) -> ExtractionResult:
+        """
+        Extrae un perfil y lo guarda en output_path, en un proceso del pool
+        
+        Args:
+            profile: Perfil a extraer
+            output_path: JSON destino
+            spec: Qué rutas de Preferences extraer
+        
+        Returns:
+            ExtractionResult (ok=False con el error si falló)
+        """
+        self._check_cancelled()
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self._extract_workers, mp_context=self._mp_context())
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._processes, ExtractionEngine._extract_to_file,
+                                              profile.path, output_path, spec)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # el proceso murió
+            return ExtractionResult(folder_name=profile.folder_name, error=f"{type(e).__name__}: {e}")
+    
+    async def save(self, profiles: List[Profile], saved_path: Path,
+                   spec: Optional[ExtractionSpec] = None) -> List[ExtractionResult]:
+        """
+        Extrae varios perfiles en paralelo como <carpeta>.json (como ExtractionEngine.extract_batch)
+        
+        Returns:
+            Un ExtractionResult por perfil, en el mismo orden que profiles
+        """
+        results = await asyncio.gather(*(self.extract(profile, saved_path / f"{profile.folder_name}.json", spec)
+                                         for profile in profiles))
+        if any(result.ok for result in results):
+            await self._run((saved_path,), Catalog.record, saved_path)
+        return list(results)
+    
+    async def backup(self, brave_config: Optional[Path] = None, **options) -> Optional[Path]:
+        """
+        Corrutina de BackupManager.create_backup
+        
+        Args:
+            brave_config: Directorio a respaldar (por defecto el del usuario actual)
+            **options: Resto de los argumentos de create_backup (incremental, archive, scope...)
+        
+        Returns:
+            Path al backup creado o None si hubo un error
+        """
+        brave_config = brave_config or ProfileHandler.get_brave_config_path()
+        return await self._run((brave_config, BackupManager.get_backups_dir()), BackupManager.create_backup,
+                               brave_config=brave_config, **options)
+    
+    async def restore_backup(self, backup_path: Path, target: Path, allow_partial: bool = False) -> CopyStats:
+        """Corrutina de BackupManager.restore_backup"""
+        return await self._run((backup_path, target), BackupManager.restore_backup, backup_path, target,
+                               allow_partial)
+    
+    async def restore_directory(self, source: Path, target: Path, allow_partial: bool = False) -> CopyStats:
+        """Corrutina de BackupManager.restore_directory"""
+        return await self._run((source, target), BackupManager.restore_directory, source, target, allow_partial)
+    
+    async def save_with_backup(self, profiles: List[Profile], saved_path: Path,
+                               spec: Optional[ExtractionSpec] = None,
+                               brave_config: Optional[Path] = None,
+                               **backup_options) -> Tuple[List[ExtractionResult], Optional[Path]]:
+        """
+        Respalda y extrae al mismo tiempo (el backup no depende de la extracción ni al revés)
+        
+        Returns:
+            (resultados de save, backup creado o None)
+        """
+        backup_task = asyncio.ensure_future(self.backup(brave_config, **backup_options))
+        try:
+            results = await self.save(profiles, saved_path, spec)
+        except BaseException:
+            backup_task.cancel()
+            await asyncio.gather(backup_task, return_exceptions=True)
+            raise
+        return results, await backup_task
+    
+    # --- uso desde código sincrónico ---
+    
+    def run(self, awaitable: Awaitable) -> Any:
+        """
+        Ejecuta una corrutina del servicio hasta que termine
+        
+        Ctrl+C cancela lo que esté en curso, espera a que limpie y lanza
+        OperationCancelled.
+        
+        Args:
+            awaitable: Corrutina (ej. service.backup())
+        
+        Returns:
+            Su resultado
+        """
+        async def main():
+            return await awaitable
+        
+        try:
+            return asyncio.run(main())
+        except KeyboardInterrupt:
+            self.cancel()
+            # Los hilos ya vieron el Event: esperar a que limpien y dejar el servicio listo para otra operación
+            self._threads.shutdown(wait=True)
+            self._threads = self._thread_pool()
+            self._cancelled.clear()
+            raise OperationCancelled("Operación cancelada por el usuario")
+    
+    @staticmethod
+    def run_once(operation: Callable[['AsyncService'], Awaitable], **options) -> Any:
+        """
+        Crea un servicio, ejecuta operation(servicio) y lo cierra
+        
+        Args:
+            operation: Función que recibe el servicio y devuelve la corrutina
+            **options: Argumentos de AsyncService
+        
+        Returns:
+            El resultado de la corrutina
+        """
+        with AsyncService(**options) as service:
+            return service.run(operation(service))
\ No newline at end of file
@@ -0,0 +1,402 @@
+"""
+Vigilancia de perfiles: guarda la configuración cada vez que cambia de verdad
+"""
+import ctypes
+import ctypes.util
+import datetime
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.diff_engine import DiffEngine
+from core.extraction_engine import ExtractionEngine
+from core.extraction_spec import ExtractionSpec
+from core.profile_handler import ProfileHandler
+from core.profile_names import ProfileNameResolver
+from models.profile import Configuration
+from storage.backup_manager import BackupManager
+from utils.json_backend import JsonBackend
+from utils.system_utils import SystemUtils
+
+
+class _Inotify:
+    """inotify(7) por ctypes, sin dependencias (solo Linux)"""
+    
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (seguido de len bytes de nombre)
+    READ_SIZE = 64 * 1024
+    
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify solo existe en Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            self._raise("inotify_init1")
+    
+    @staticmethod
+    def _raise(what: str):
+        err = ctypes.get_errno()
+        raise OSError(err, f"{what}: {os.strerror(err)}")
+    
+    def add(self, path: Path, mask: int) -> int:
+        """Agrega (o actualiza) la vigilancia de path y devuelve su descriptor"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), ctypes.c_uint32(mask))
+        if wd < 0:
+            self._raise(f"inotify_add_watch {path}")
+        return wd
+    
+    def remove(self, wd: int):
+        """Deja de vigilar (el kernel ya lo hizo si la carpeta se borró)"""
+        self._libc.inotify_rm_watch(self.fd, wd)
+    
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        """
+        Espera eventos hasta timeout segundos
+        
+        Returns:
+            Lista de (descriptor, máscara, nombre); vacía si no hubo eventos
+        """
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, self.READ_SIZE)
+        except BlockingIOError:
+            return []
+        
+        events = []
+        offset = 0
+        while offset + self._EVENT.size <= len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = data[offset:offset + length].split(b"\0", 1)[0]
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+    
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """
+    Proceso de larga duración que guarda un snapshot de la configuración de
+    cada perfil cuando su Preferences cambia.
+    
+    Con inotify no hay trabajo mientras Brave no escribe: se vigila la
+    carpeta de cada perfil (Brave reemplaza Preferences con un rename, así
+    que vigilar el archivo perdería el evento) y la raíz del User Data, donde
+    Local State y las carpetas nuevas o borradas avisan que cambió el
+    conjunto de perfiles. Sin inotify (macOS, Windows) se hace un stat por
+    perfil cada poll_interval segundos.
+    
+    Los eventos de un perfil se agrupan: la extracción corre cuando pasan
+    debounce segundos sin escrituras (o a lo sumo MAX_DELAY_FACTOR veces eso
+    desde la primera, si Brave no para de escribir). El Configuration
+    extraído se hashea sin sus metadatos y solo se guarda si el hash difiere
+    del último snapshot de ese perfil. Los hashes se persisten en .cache/,
+    así reiniciar el proceso no repite snapshots.
+    
+    La memoria queda acotada por la cantidad de perfiles: por perfil se
+    guarda un hash, un plazo pendiente y un descriptor de inotify.
+    """
+    
+    STATE_FILENAME = "watcher_state.json"
+    STATE_VERSION = 1
+    DEBOUNCE_SECONDS = 2.0
+    POLL_SECONDS = 5.0
+    MAX_DELAY_FACTOR = 10
+    # Cada cuánto, como máximo, se revisa el Event de parada mientras no llegan eventos
+    STOP_CHECK_SECONDS = 1.0
+    
+    _PROFILE_MASK = _Inotify.IN_CLOSE_WRITE | _Inotify.IN_MOVED_TO | _Inotify.IN_ONLYDIR
+    _ROOT_MASK = (_Inotify.IN_CLOSE_WRITE | _Inotify.IN_MOVED_TO | _Inotify.IN_CREATE |
+                  _Inotify.IN_DELETE | _Inotify.IN_MOVED_FROM | _Inotify.IN_ONLYDIR)
+    
+    def __init__(self, brave_path: Path,
+                 saved_dir: Optional[Path] = None,
+                 spec: Optional[ExtractionSpec] = None,
+                 profiles: Optional[List[str]] = None,
+                 name: str = "brave_watch",
+                 debounce: float = DEBOUNCE_SECONDS,
+                 poll_interval: float = POLL_SECONDS,
+                 use_inotify: bool = True,
+                 on_snapshot: Optional[Callable[[str, Path], None]] = None):
+        """
+        Args:
+            brave_path: Directorio User Data a vigilar
+            saved_dir: Dónde crear los snapshots (por defecto saved_configs/)
+            spec: Qué rutas de Preferences extraer (por defecto ExtractionSpec.preset())
+            profiles: Carpetas de perfil a vigilar (por defecto todas, incluso las nuevas)
+            name: Prefijo de las carpetas de snapshot (<name>_AAAAMMDD_HHMMSS)
+            debounce: Segundos sin escrituras antes de extraer
+            poll_interval: Segundos entre revisiones si no hay inotify
+            use_inotify: Usar inotify si está disponible
+            on_snapshot: Función (carpeta_perfil, json_guardado) por cada snapshot
+        """
+        self.brave_path = Path(brave_path)
+        self.saved_dir = Path(saved_dir) if saved_dir else BackupManager.get_saved_configs_dir()
+        self.spec = spec
+        self.profiles = set(profiles) if profiles else None
+        self.name = name
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.on_snapshot = on_snapshot
+        self.mode: Optional[str] = None
+        self.stats = {"events": 0, "checks": 0, "snapshots": 0, "errors": 0}
+        
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, str] = {}            # descriptor → carpeta ("" es la raíz)
+        self._pending: Dict[str, List[float]] = {}    # carpeta → [primer evento, plazo]
+        self._stamps: Dict[str, Tuple[int, int]] = {}  # carpeta → (mtime_ns, tamaño) de Preferences, sin inotify
+        self._digests = self._load_state()
+    
+    @staticmethod
+    def get_state_path() -> Path:
+        """Archivo con el hash del último snapshot de cada perfil"""
+        return SystemUtils.get_cache_dir() / ConfigWatcher.STATE_FILENAME
+    
+    def _load_state(self) -> Dict[str, str]:
+        try:
+            data = JsonBackend.load(self.get_state_path())
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != self.STATE_VERSION:
+            return {}
+        return {path: digest for path, digest in data.get("digests", {}).items()
+                if Path(path).parent == self.brave_path}
+    
+    def _save_state(self):
+        # Se conservan los hashes de otros directorios de Brave vigilados desde el mismo repo
+        try:
+            data = JsonBackend.load(self.get_state_path())
+            digests = data.get("digests", {}) if data.get("version") == self.STATE_VERSION else {}
+        except (OSError, ValueError):
+            digests = {}
+        digests = {path: digest for path, digest in digests.items() if Path(path).parent != self.brave_path}
+        digests.update(self._digests)
+        JsonBackend.dump_atomic({"version": self.STATE_VERSION, "digests": digests}, self.get_state_path(),
+                                compact=True)
+    
+    @staticmethod
+    def config_digest(config: Configuration) -> str:
+        """
+        Hash del contenido de una configuración (sin la fecha ni otros metadatos)
+        
+        Args:
+            config: Configuración extraída
+        
+        Returns:
+            Hash en hexadecimal
+        """
+        data = config.to_dict()
+        data.pop("extraction_metadata", None)
+        return DiffEngine.subtree_hash(data)
+    
+    def _profile_dirs(self) -> Dict[str, Path]:
+        return {path.name: path for path in ProfileHandler.list_profile_dirs(self.brave_path)
+                if self.profiles is None or path.name in self.profiles}
+    
+    def check(self, folder: str) -> Optional[Path]:
+        """
+        Extrae un perfil y guarda un snapshot si la configuración cambió
+        
+        Args:
+            folder: Carpeta del perfil
+        
+        Returns:
+            JSON guardado, o None si no hubo cambios o no se pudo extraer
+        """
+        self.stats["checks"] += 1
+        profile_path = self.brave_path / folder
+        config = ExtractionEngine.extract_settings(profile_path, self.spec)
+        if config is None:
+            # Preferences borrado o a medio escribir: el próximo evento lo reintenta
+            self.stats["errors"] += 1
+            return None
+        
+        digest = self.config_digest(config)
+        key = str(profile_path)
+        if self._digests.get(key) == digest:
+            return None
+        
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        snapshot_dir = self.saved_dir / f"{self.name}_{timestamp}"
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        output = snapshot_dir / f"{folder}.json"
+        if not ExtractionEngine.save_configuration(config, output):
+            self.stats["errors"] += 1
+            return None
+        
+        self._digests[key] = digest
+        self._save_state()
+        self.stats["snapshots"] += 1
+        print(f"📸 {folder}: configuración cambiada → {snapshot_dir.name}/{output.name}")
+        if self.on_snapshot:
+            self.on_snapshot(folder, output)
+        return output
+    
+    def _schedule(self, folder: str, now: float):
+        """Posterga la extracción de folder hasta que paren las escrituras (con un máximo)"""
+        pending = self._pending.get(folder)
+        if pending is None:
+            self._pending[folder] = [now, now + self.debounce]
+        else:
+            pending[1] = min(now + self.debounce, pending[0] + self.debounce * self.MAX_DELAY_FACTOR)
+    
+    def _run_due(self, now: float):
+        for folder in [folder for folder, (_, deadline) in self._pending.items() if deadline <= now]:
+            del self._pending[folder]
+            if (self.brave_path / folder).is_dir():
+                self.check(folder)
+    
+    def _timeout(self, now: float, limit: float) -> float:
+        """Cuánto esperar eventos: hasta el próximo plazo, sin pasar de limit"""
+        if not self._pending:
+            return limit
+        return max(0.0, min(limit, min(deadline for _, deadline in self._pending.values()) - now))
+    
+    # --- inotify ---
+    
+    def _sync_watches(self, now: float):
+        """Vigila los perfiles que aparecieron y suelta los que ya no están"""
+        current = self._profile_dirs()
+        watched = {folder: wd for wd, folder in self._watches.items() if folder}
+        for folder, wd in watched.items():
+            if folder not in current:
+                self._inotify.remove(wd)
+                del self._watches[wd]
+                self._pending.pop(folder, None)
+        for folder, path in current.items():
+            if folder not in watched:
+                try:
+                    self._watches[self._inotify.add(path, self._PROFILE_MASK)] = folder
+                except OSError as e:
+                    print(f"⚠️ No se puede vigilar {folder}: {e}")
+                    continue
+                self._schedule(folder, now)
+    
+    def _handle(self, wd: int, mask: int, name: str, now: float):
+        self.stats["events"] += 1
+        if mask & _Inotify.IN_Q_OVERFLOW:
+            # Se perdieron eventos: revisar todo (el hash evita snapshots de más)
+            self._sync_watches(now)
+            for folder in self._profile_dirs():
+                self._schedule(folder, now)
+            return
+        
+        folder = self._watches.get(wd)
+        if folder is None:
+            return
+        if mask & _Inotify.IN_IGNORED:
+            del self._watches[wd]
+            return
+        if folder == "":
+            # Raíz: Local State o carpetas de perfil nuevas o borradas cambian el conjunto de perfiles
+            if name == ProfileNameResolver.LOCAL_STATE_FILENAME or mask & _Inotify.IN_ISDIR:
+                self._sync_watches(now)
+        elif name == "Preferences":
+            self._schedule(folder, now)
+    
+    def _run_inotify(self, stop: threading.Event):
+        self._watches[self._inotify.add(self.brave_path, self._ROOT_MASK)] = ""
+        self._sync_watches(time.monotonic())
+        while not stop.is_set():
+            now = time.monotonic()
+            self._run_due(now)
+            events = self._inotify.read(self._timeout(now, self.STOP_CHECK_SECONDS))
+            now = time.monotonic()
+            for wd, mask, name in events:
+                self._handle(wd, mask, name, now)
+    
+    # --- sondeo ---
+    
+    def _poll(self, now: float):
+        """Un stat de Preferences por perfil: si cambió, se agenda la extracción"""
+        current = self._profile_dirs()
+        for folder in list(self._stamps):
+            if folder not in current:
+                del self._stamps[folder]
+                self._pending.pop(folder, None)
+        for folder, path in current.items():
+            try:
+                st = os.stat(path / "Preferences")
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            if self._stamps.get(folder) != stamp:
+                self._stamps[folder] = stamp
+                self.stats["events"] += 1
+                self._schedule(folder, now)
+    
+    def _run_polling(self, stop: threading.Event):
+        next_poll = time.monotonic()
+        while not stop.is_set():
+            now = time.monotonic()
+            if now >= next_poll:
+                self._poll(now)
+                next_poll = now + self.poll_interval
+            self._run_due(now)
+            stop.wait(self._timeout(now, max(0.0, next_poll - now)))
+    
+    def run(self, stop: Optional[threading.Event] = None) -> dict:
+        """
+        Vigila hasta que stop se active (o hasta Ctrl+C)
+        
+        Al arrancar se revisan todos los perfiles: si alguno cambió desde el
+        último snapshot (o nunca tuvo uno), se guarda.
+        
+        Args:
+            stop: Event para terminar desde otro hilo o un manejador de señales
+        
+        Returns:
+            Estadísticas: modo, eventos, extracciones, snapshots y errores
+        """
+        if not self.brave_path.is_dir():
+            raise FileNotFoundError(f"No existe el directorio de Brave {self.brave_path}")
+        stop = stop or threading.Event()
+        
+        self._inotify = None
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except OSError as e:
+                print(f"⚠️ inotify no disponible ({e}), se revisa cada {self.poll_interval:g}s")
+        self.mode = "inotify" if self._inotify else "polling"
+        print(f"👀 Vigilando {self.brave_path} ({self.mode}, debounce {self.debounce:g}s)")
+        
+        try:
+            if self._inotify:
+                self._run_inotify(stop)
+            else:
+                self._run_polling(stop)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+            self._watches.clear()
+            # Lo que quedó pendiente se revisa antes de salir
+            self._run_due(float("inf"))
+        
+        return {"mode": self.mode, **self.stats}
\ No newline at end of file
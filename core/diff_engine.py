@@ -0,0 +1,344 @@
+"""
+Diferencias estructurales entre configuraciones
+"""
+import hashlib
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.extraction_spec import ExtractionSpec
+from models.profile import ConfigDiff
+from utils.json_backend import JsonBackend
+
+
+class DiffEngine:
+    """
+    Compara diccionarios anidados y reporta rutas agregadas, borradas y cambiadas.
+    
+    Cada subárbol se hashea una sola vez, de abajo hacia arriba, y la
+    comparación solo baja por las claves cuyo hash difiere: dos
+    configuraciones iguales se resuelven comparando un hash, y un cambio en
+    una hoja cuesta lo que mide su camino desde la raíz. Las listas se
+    comparan como valores completos (un cambio dentro de una lista reporta la
+    lista entera).
+    """
+    
+    @staticmethod
+    def _hash(value: Any, memo: Dict[int, bytes]) -> bytes:
+        """Hash estructural de un valor (memo evita rehashear subárboles)"""
+        key = id(value)
+        cached = memo.get(key)
+        if cached is not None:
+            return cached
+        
+        h = hashlib.blake2b(digest_size=16)
+        if isinstance(value, dict):
+            h.update(b"d")
+            for k in sorted(value):
+                h.update(k.encode('utf-8', 'surrogatepass'))
+                h.update(b"\0")
+                h.update(DiffEngine._hash(value[k], memo))
+        elif isinstance(value, list):
+            h.update(b"l")
+            for item in value:
+                h.update(DiffEngine._hash(item, memo))
+        else:
+            # El tipo entra en el hash: True y 1 son valores distintos en JSON
+            h.update(type(value).__name__.encode())
+            h.update(repr(value).encode('utf-8', 'surrogatepass'))
+        digest = h.digest()
+        
+        # Solo se memorizan contenedores: sus id() son estables mientras dure la comparación
+        if isinstance(value, (dict, list)):
+            memo[key] = digest
+        return digest
+    
+    @staticmethod
+    def subtree_hash(value: Any) -> str:
+        """
+        Hash estructural de un valor JSON (independiente del orden de las claves)
+        
+        Args:
+            value: Valor a hashear
+        
+        Returns:
+            Hash en hexadecimal
+        """
+        return DiffEngine._hash(value, {}).hex()
+    
+    _SPLIT_RE = re.compile(r"(?<!\\)\.")
+    
+    # Lo que Brave administra por su cuenta: se extrae y se compara, pero un parche nunca lo escribe
+    READ_ONLY = ExtractionSpec(["extensions.settings.*.manifest"])
+    
+    @staticmethod
+    def _join(prefix: str, key: str) -> str:
+        key = key.replace(".", "\\.")
+        return f"{prefix}.{key}" if prefix else key
+    
+    @staticmethod
+    def split_path(path: str) -> List[str]:
+        """Separa una ruta del diff en claves (inversa de la notación con "\\.")"""
+        return [segment.replace("\\.", ".") for segment in DiffEngine._SPLIT_RE.split(path)]
+    
+    @staticmethod
+    def key_paths(value: Dict[str, Any]) -> Iterator[str]:
+        """
+        Recorre todas las rutas de claves de un diccionario anidado
+        
+        Incluye las rutas intermedias (ej. "brave", "brave.shields",
+        "brave.shields.stats"); no entra en listas.
+        
+        Args:
+            value: Diccionario a recorrer
+        
+        Yields:
+            Rutas en la misma notación que diff ("\\." para un punto literal)
+        """
+        stack = [("", value)]
+        while stack:
+            prefix, node = stack.pop()
+            for key, child in node.items():
+                path = DiffEngine._join(prefix, key)
+                yield path
+                if isinstance(child, dict):
+                    stack.append((path, child))
+    
+    @staticmethod
+    def diff(old: Dict[str, Any], new: Dict[str, Any]) -> ConfigDiff:
+        """
+        Compara dos diccionarios anidados
+        
+        Args:
+            old: Versión de referencia
+            new: Versión a comparar
+        
+        Returns:
+            ConfigDiff con rutas (separadas por punto, "\\." para un punto literal)
+        """
+        result = ConfigDiff()
+        memo_old: Dict[int, bytes] = {}
+        memo_new: Dict[int, bytes] = {}
+        stack = [("", old, new)]
+        
+        while stack:
+            path, a, b = stack.pop()
+            if a is b or DiffEngine._hash(a, memo_old) == DiffEngine._hash(b, memo_new):
+                continue
+            
+            if not (isinstance(a, dict) and isinstance(b, dict)):
+                result.changed[path] = {"old": a, "new": b}
+                continue
+            
+            for key in a.keys() - b.keys():
+                result.removed[DiffEngine._join(path, key)] = a[key]
+            for key in b.keys() - a.keys():
+                result.added[DiffEngine._join(path, key)] = b[key]
+            for key in a.keys() & b.keys():
+                stack.append((DiffEngine._join(path, key), a[key], b[key]))
+        
+        return result
+    
+    @staticmethod
+    def config_view(config_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convierte una configuración guardada a la estructura de Preferences
+        
+        Args:
+            config_data: Diccionario en formato Configuration.to_dict
+        
+        Returns:
+            Diccionario con brave, shortcuts, profile.name y extra_settings
+            en sus rutas originales (sin metadatos de extracción)
+        """
+        view = dict(config_data.get("extra_settings") or {})
+        view["brave"] = config_data.get("brave_settings", {})
+        view["shortcuts"] = config_data.get("keyboard_shortcuts", {})
+        if config_data.get("profile_name") is not None:
+            profile = dict(view.get("profile") or {})
+            profile["name"] = config_data["profile_name"]
+            view["profile"] = profile
+        return view
+    
+    @staticmethod
+    def spec_of(config_data: Dict[str, Any]) -> ExtractionSpec:
+        """Especificación con la que se extrajo una configuración guardada"""
+        saved_spec = (config_data.get("extraction_metadata") or {}).get("extraction_spec")
+        if saved_spec:
+            return ExtractionSpec(saved_spec.get("include", []), saved_spec.get("exclude", []))
+        return ExtractionSpec.preset()
+    
+    @staticmethod
+    def load_side(path: Path, profile: Optional[str] = None,
+                  spec: Optional[ExtractionSpec] = None) -> Dict[str, Any]:
+        """
+        Carga un lado de la comparación como diccionario en formato Configuration
+        
+        Args:
+            path: JSON de configuración, carpeta guardada o carpeta de perfil con Preferences
+            profile: En una carpeta guardada con varios perfiles, cuál usar
+            spec: Especificación para extraer de un perfil en vivo
+        
+        Returns:
+            Diccionario en formato Configuration.to_dict
+        """
+        from core.extraction_engine import ExtractionEngine
+        
+        path = Path(path)
+        if path.is_dir() and (path / "Preferences").exists():
+            prefs = (spec or ExtractionSpec.preset()).extract_file(path / "Preferences")
+            return ExtractionEngine._config_from_prefs(prefs, spec).to_dict()
+        
+        if path.is_dir():
+            config_json = ExtractionEngine.find_config_json(path, profile)
+            if not config_json:
+                raise FileNotFoundError(f"{path} no tiene configuración JSON")
+            path = config_json
+        
+        data = JsonBackend.load(path)
+        if path.name == "Preferences" or "brave_settings" not in data:
+            # Preferences crudo: extraer igual que de un perfil
+            return ExtractionEngine._config_from_prefs(data, spec).to_dict()
+        return data
+    
+    @staticmethod
+    def diff_configs(old_data: Dict[str, Any], new_data: Dict[str, Any]) -> ConfigDiff:
+        """
+        Compara dos configuraciones (formato Configuration.to_dict)
+        
+        Args:
+            old_data: Configuración de referencia
+            new_data: Configuración a comparar
+        
+        Returns:
+            ConfigDiff sobre las rutas de Preferences
+        """
+        return DiffEngine.diff(DiffEngine.config_view(old_data), DiffEngine.config_view(new_data))
+    
+    @staticmethod
+    def diff_saved_vs_profile(config_data: Dict[str, Any], profile_path: Path) -> ConfigDiff:
+        """
+        Compara una configuración guardada con el estado actual de un perfil
+        
+        El perfil se extrae con la misma especificación que la configuración
+        guardada, así solo se comparan las rutas que ésta contiene.
+        
+        Args:
+            config_data: Configuración guardada
+            profile_path: Carpeta del perfil
+        
+        Returns:
+            ConfigDiff de guardado → perfil actual
+        """
+        live = DiffEngine.load_side(profile_path, spec=DiffEngine.spec_of(config_data))
+        return DiffEngine.diff_configs(config_data, live)
+    
+    @staticmethod
+    def build_patch(config_data: Dict[str, Any], prefs: Dict[str, Any]) -> ConfigDiff:
+        """
+        Calcula el parche mínimo para llevar un Preferences a una configuración guardada
+        
+        Solo se consideran las secciones que la configuración trae (y nunca
+        profile.name, que identifica al perfil destino). Dentro de ellas, lo
+        que falta o cambió se escribe y lo que sobra se borra: el resultado es
+        el mismo que reemplazar esas secciones enteras. Las excepciones son
+        las entradas elegidas por comodín, que solo se tocan si existen de los
+        dos lados (ExtractionSpec.common_entries: una extensión instalada o
+        quitada después de guardar no se borra ni se crea), y las rutas de
+        READ_ONLY, que nunca se escriben.
+        
+        Args:
+            config_data: Configuración guardada (formato Configuration.to_dict)
+            prefs: Preferences actual ya parseado
+        
+        Returns:
+            ConfigDiff de Preferences actual → configuración guardada
+        """
+        from core.extraction_engine import ExtractionEngine
+        
+        spec = DiffEngine.spec_of(config_data)
+        target = DiffEngine.config_view(config_data)
+        if "brave_settings" not in config_data:
+            target.pop("brave", None)
+        if "keyboard_shortcuts" not in config_data:
+            target.pop("shortcuts", None)
+        
+        # El parche escribe en "shortcuts": no comparar contra el nombre alternativo
+        live_prefs = {key: value for key, value in prefs.items() if key != "keyboard_shortcuts"}
+        live_config = ExtractionEngine._config_from_prefs(live_prefs, spec).to_dict()
+        current = DiffEngine.config_view(live_config)
+        current = {key: value for key, value in current.items() if key in target}
+        
+        for view in (target, current):
+            profile = view.get("profile")
+            if isinstance(profile, dict) and "name" in profile:
+                profile = {key: value for key, value in profile.items() if key != "name"}
+                if profile:
+                    view["profile"] = profile
+                else:
+                    del view["profile"]
+        
+        current, target = spec.common_entries(current, target)
+        patch = DiffEngine.diff(current, target)
+        for changes in (patch.removed, patch.added, patch.changed):
+            for path in [path for path in changes if DiffEngine.READ_ONLY.matches(DiffEngine.split_path(path))]:
+                del changes[path]
+        return patch
+    
+    @staticmethod
+    def _remove_selected(node: Dict[str, Any], key: str, selected: Any):
+        """Borra de node[key] solo lo que la especificación había extraído (selected)"""
+        actual = node.get(key)
+        if not (isinstance(actual, dict) and isinstance(selected, dict)) or actual == selected:
+            node.pop(key, None)
+            return
+        # Subárbol podado por la especificación: el resto de sus claves no es nuestro
+        for child_key, child_selected in selected.items():
+            DiffEngine._remove_selected(actual, child_key, child_selected)
+    
+    @staticmethod
+    def _merge_selected(node: Dict[str, Any], key: str, value: Any):
+        """Escribe value en node[key] combinando diccionarios (no pisa claves no extraídas)"""
+        if isinstance(value, dict) and isinstance(node.get(key), dict):
+            for child_key, child_value in value.items():
+                DiffEngine._merge_selected(node[key], child_key, child_value)
+        else:
+            node[key] = value
+    
+    @staticmethod
+    def _parent(prefs: Dict[str, Any], parents: List[str], create: bool) -> Optional[Dict[str, Any]]:
+        node = prefs
+        for segment in parents:
+            if not isinstance(node.get(segment), dict):
+                if not create:
+                    return None
+                node[segment] = {}
+            node = node[segment]
+        return node
+    
+    @staticmethod
+    def apply_patch(prefs: Dict[str, Any], patch: ConfigDiff):
+        """
+        Aplica un parche de build_patch sobre un Preferences parseado (lo modifica)
+        
+        Las rutas borradas o agregadas pueden ser subárboles podados por la
+        especificación de extracción: solo se tocan las claves que ésta
+        selecciona, nunca el resto del subárbol real.
+        
+        Args:
+            prefs: Preferences a modificar
+            patch: Parche a aplicar
+        """
+        for path, selected in patch.removed.items():
+            *parents, key = DiffEngine.split_path(path)
+            node = DiffEngine._parent(prefs, parents, create=False)
+            if node is not None:
+                DiffEngine._remove_selected(node, key, selected)
+        
+        for path, value in patch.added.items():
+            *parents, key = DiffEngine.split_path(path)
+            DiffEngine._merge_selected(DiffEngine._parent(prefs, parents, create=True), key, value)
+        
+        for path, change in patch.changed.items():
+            *parents, key = DiffEngine.split_path(path)
+            DiffEngine._parent(prefs, parents, create=True)[key] = change["new"]
@@ -1,24 +1,34 @@
 """
 Motor de extracción de configuraciones de Brave
 """
-import json
 import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
-from models.profile import Configuration
+from core.diff_engine import DiffEngine
+from core.extraction_spec import ExtractionSpec
+from models.profile import ConfigDiff, Configuration, ExtractionResult, Profile
+from storage.catalog import Catalog
+from utils.json_backend import JsonBackend
+from utils.json_stream import JsonStream
+from utils.tracing import Tracer
 
 
 class ExtractionEngine:
     """Motor principal para extraer configuraciones de Brave"""
     
     @staticmethod
-    def extract_settings(profile_path: Path) -> Optional[Configuration]:
+    @Tracer.traced("extract_settings")
+    def extract_settings(profile_path: Path, spec: Optional[ExtractionSpec] = None) -> Optional[Configuration]:
         """
         Extrae configuración pura de un perfil
         
         Args:
             profile_path: Path al perfil de Brave
+            spec: Qué rutas de Preferences extraer (por defecto ExtractionSpec.preset())
             
         Returns:
             Configuration con los datos extraídos o None si hay error
@@ -33,7 +43,7 @@ class ExtractionEngine:
             
             # Leer configuración
             if prefs_file.exists():
-                config_data = ExtractionEngine._extract_from_preferences(prefs_file)
+                config_data = ExtractionEngine._extract_from_preferences(prefs_file, spec)
             else:
                 config_data = ExtractionEngine._extract_from_json(json_files[0])
             
@@ -44,34 +54,57 @@ class ExtractionEngine:
             return None
     
     @staticmethod
-    def _extract_from_preferences(prefs_file: Path) -> Configuration:
+    def _extract_from_preferences(prefs_file: Path, spec: Optional[ExtractionSpec] = None) -> Configuration:
         """Extrae desde archivo Preferences estándar"""
-        with open(prefs_file, 'r', encoding='utf-8') as f:
-            prefs = json.load(f)
+        spec = spec or ExtractionSpec.preset()
+        # Solo lo que pide la especificación (los Preferences enormes se recorren por bloques)
+        prefs = spec.extract_file(prefs_file)
         
+        return ExtractionEngine._config_from_prefs(prefs, spec)
+    
+    @staticmethod
+    def _config_from_prefs(prefs: dict, spec: Optional[ExtractionSpec] = None) -> Configuration:
+        """Arma la Configuration a partir de un Preferences ya parseado"""
+        spec = spec or ExtractionSpec.preset()
         config = Configuration.create_empty()
         
+        # Solo las rutas de la especificación (los subárboles se comparten con prefs, no se copian)
+        selected = spec.extract(prefs)
+        
         # Extraer configuraciones de Brave
-        if 'brave' in prefs:
-            config.brave_settings = prefs['brave']
+        if 'brave' in selected:
+            config.brave_settings = selected['brave']
         
         # Extraer atajos de teclado
-        if 'shortcuts' in prefs:
-            config.keyboard_shortcuts = prefs['shortcuts']
-        elif 'keyboard_shortcuts' in prefs:
-            config.keyboard_shortcuts = prefs['keyboard_shortcuts']
+        if 'shortcuts' in selected:
+            config.keyboard_shortcuts = selected['shortcuts']
+        elif 'keyboard_shortcuts' in selected:
+            config.keyboard_shortcuts = selected['keyboard_shortcuts']
         
         # Extraer nombre del perfil
-        if 'profile' in prefs and 'name' in prefs['profile']:
-            config.profile_name = prefs['profile']['name']
+        profile = selected.get('profile', {})
+        if 'name' in profile:
+            config.profile_name = profile['name']
+        
+        # El resto de lo pedido va a extra_settings con la estructura de Preferences
+        extra = {key: value for key, value in selected.items()
+                 if key not in ('brave', 'shortcuts', 'keyboard_shortcuts', 'profile')}
+        profile_rest = {key: value for key, value in profile.items() if key != 'name'}
+        if profile_rest:
+            extra['profile'] = profile_rest
+        config.extra_settings = extra
+        
+        if not spec.is_default:
+            config.extraction_metadata["extraction_spec"] = spec.to_dict()
+            if extra:
+                config.extraction_metadata["sections_extracted"].append("extra_settings")
         
         return config
     
     @staticmethod
     def _extract_from_json(json_file: Path) -> Configuration:
         """Extrae desde JSON existente (ya está en formato correcto)"""
-        with open(json_file, 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
+        existing_data = JsonBackend.load(json_file)
         
         config = Configuration.from_dict(existing_data)
         
@@ -82,6 +115,7 @@ class ExtractionEngine:
         return config
     
     @staticmethod
+    @Tracer.traced("save_configuration")
     def save_configuration(config: Configuration, output_path: Path) -> bool:
         """
         Guarda configuración como JSON
@@ -96,11 +130,229 @@ class ExtractionEngine:
         try:
             config_dict = config.to_dict()
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(config_dict, f, indent=2, ensure_ascii=False)
+            JsonBackend.dump(config_dict, output_path)
+            Catalog.record(Path(output_path).parent)
             
             return True
             
         except Exception as e:
             print(f"❌ Error al guardar configuración: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def _extract_to_file(profile_path: Path, output_path: Path,
+                         spec: Optional[ExtractionSpec] = None) -> ExtractionResult:
+        """
+        Extrae un perfil y lo guarda, midiendo cada etapa (se ejecuta en un proceso del pool)
+        
+        Args:
+            profile_path: Carpeta del perfil
+            output_path: JSON destino
+            spec: Qué rutas de Preferences extraer
+        
+        Returns:
+            ExtractionResult con tiempos de read, parse, extract y write
+        """
+        result = ExtractionResult(folder_name=profile_path.name)
+        timings = result.timings
+        try:
+            prefs_file = profile_path / "Preferences"
+            started = time.perf_counter()
+            if prefs_file.exists() and JsonStream.should_stream(prefs_file):
+                # Por bloques: lectura y parseo van juntos y solo se parsea lo que pide la especificación
+                prefs = (spec or ExtractionSpec.preset()).extract_file(prefs_file)
+                timings["parse"] = time.perf_counter() - started
+                
+                started = time.perf_counter()
+                config = ExtractionEngine._config_from_prefs(prefs, spec)
+                timings["extract"] = time.perf_counter() - started
+            elif prefs_file.exists():
+                with open(prefs_file, 'rb') as f:
+                    raw = f.read()
+                timings["read"] = time.perf_counter() - started
+                
+                started = time.perf_counter()
+                prefs = JsonBackend.loads(raw)
+                timings["parse"] = time.perf_counter() - started
+                
+                started = time.perf_counter()
+                config = ExtractionEngine._config_from_prefs(prefs, spec)
+                timings["extract"] = time.perf_counter() - started
+            else:
+                json_files = list(profile_path.glob("*.json"))
+                if not json_files:
+                    result.error = "No hay Preferences ni JSON de configuración"
+                    return result
+                config = ExtractionEngine._extract_from_json(json_files[0])
+                timings["extract"] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            JsonBackend.dump(config.to_dict(), output_path)
+            timings["write"] = time.perf_counter() - started
+            
+            result.output_path = output_path
+            result.ok = True
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+    
+    @staticmethod
+    @Tracer.traced("extract_batch")
+    def extract_batch(profiles: List[Profile], saved_path: Path, max_workers: Optional[int] = None,
+                      spec: Optional[ExtractionSpec] = None) -> List[ExtractionResult]:
+        """
+        Extrae y guarda varios perfiles en paralelo como <carpeta>.json
+        
+        El parseo de JSON ocupa CPU, así que cada perfil va a un proceso del
+        pool: el total tarda aproximadamente lo que el perfil más pesado.
+        
+        Args:
+            profiles: Perfiles a guardar
+            saved_path: Carpeta destino (debe existir)
+            max_workers: Procesos en paralelo (por defecto uno por CPU)
+            spec: Qué rutas de Preferences extraer (por defecto ExtractionSpec.preset())
+        
+        Returns:
+            Un ExtractionResult por perfil, en el mismo orden que profiles
+        """
+        jobs = [(profile.path, saved_path / f"{profile.folder_name}.json", spec) for profile in profiles]
+        workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+        
+        # Con un solo perfil (o una sola CPU) no vale la pena levantar procesos
+        if workers <= 1:
+            results = [ExtractionEngine._extract_to_file(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(ExtractionEngine._extract_to_file, *job) for job in jobs]
+                results = []
+                for (profile_path, _, _), future in zip(jobs, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:  # el proceso murió
+                        results.append(ExtractionResult(folder_name=profile_path.name,
+                                                        error=f"{type(e).__name__}: {e}"))
+        
+        if any(result.ok for result in results):
+            Catalog.record(saved_path)
+        return results
+    
+    @staticmethod
+    def save_profiles(profiles: List[Profile], saved_path: Path, max_workers: Optional[int] = None,
+                      spec: Optional[ExtractionSpec] = None) -> Tuple[List[str], List[str]]:
+        """
+        Extrae y guarda la configuración de varios perfiles como <carpeta>.json
+        
+        Args:
+            profiles: Perfiles a guardar
+            saved_path: Carpeta destino (debe existir)
+            max_workers: Procesos en paralelo (ver extract_batch)
+            spec: Qué rutas de Preferences extraer
+        
+        Returns:
+            (carpetas guardadas, carpetas que fallaron)
+        """
+        results = ExtractionEngine.extract_batch(profiles, saved_path, max_workers, spec)
+        saved = [result.folder_name for result in results if result.ok]
+        failed = [result.folder_name for result in results if not result.ok]
+        return saved, failed
+    
+    @staticmethod
+    def find_config_json(saved_dir: Path, preferred: Optional[str] = None) -> Optional[Path]:
+        """
+        Busca el JSON de configuración dentro de una carpeta guardada
+        
+        Args:
+            saved_dir: Carpeta de configuración guardada
+            preferred: Nombre de perfil o archivo a preferir (ej. "Default" o "Default.json")
+        
+        Returns:
+            Path al JSON, o None si la carpeta no tiene ninguno
+        """
+        if preferred:
+            candidate = saved_dir / (preferred if preferred.endswith('.json') else f"{preferred}.json")
+            if candidate.is_file():
+                return candidate
+        
+        for item in sorted(saved_dir.iterdir()):
+            if item.is_file() and item.suffix == '.json':
+                return item
+        
+        return None
+    
+    @staticmethod
+    def patch_preferences(config_data: dict, prefs_file: Path) -> Optional[ConfigDiff]:
+        """
+        Aplica una configuración guardada sobre el Preferences de un perfil
+        
+        Solo se escriben las claves que difieren (ver DiffEngine.build_patch);
+        el resto de Preferences queda tal cual, incluso lo que Brave haya
+        cambiado mientras tanto. Si no hay diferencias el archivo no se toca, y
+        si las hay se reemplaza de forma atómica.
+        
+        Args:
+            config_data: Diccionario de configuración (formato Configuration.to_dict)
+            prefs_file: Archivo Preferences del perfil destino
+        
+        Returns:
+            El parche aplicado (vacío si no hacía falta escribir) o None si hay error
+        """
+        try:
+            if JsonStream.should_stream(prefs_file):
+                return ExtractionEngine._patch_preferences_stream(config_data, prefs_file)
+            
+            # Leer Preferences actual del perfil
+            current_prefs = {}
+            if prefs_file.exists():
+                current_prefs = JsonBackend.load(prefs_file)
+            
+            patch = DiffEngine.build_patch(config_data, current_prefs)
+            if patch.is_empty:
+                return patch
+            
+            DiffEngine.apply_patch(current_prefs, patch)
+            
+            # Guardar configuración actualizada (compacto, como lo escribe Brave)
+            JsonBackend.dump_atomic(current_prefs, prefs_file, compact=True)
+            
+            return patch
+            
+        except Exception as e:
+            print(f"❌ Error al aplicar configuración: {e}")
+            return None
+    
+    @staticmethod
+    def _patch_preferences_stream(config_data: dict, prefs_file: Path) -> ConfigDiff:
+        """
+        patch_preferences para un Preferences enorme, sin cargarlo entero
+        
+        El parche se calcula sobre lo que selecciona la especificación de la
+        configuración; después se leen solo las secciones de primer nivel que
+        toca, se les aplica y el archivo se reescribe copiando el resto byte a
+        byte (JsonStream.splice).
+        """
+        current_prefs = DiffEngine.spec_of(config_data).extract_file(prefs_file)
+        patch = DiffEngine.build_patch(config_data, current_prefs)
+        if patch.is_empty:
+            return patch
+        
+        sections = {DiffEngine.split_path(path)[0]
+                    for changes in (patch.removed, patch.added, patch.changed) for path in changes}
+        touched = JsonStream.read_keys(prefs_file, sections)
+        DiffEngine.apply_patch(touched, patch)
+        JsonStream.splice(prefs_file, touched, deleted=sections - touched.keys())
+        
+        return patch
+    
+    @staticmethod
+    def apply_to_preferences(config_data: dict, prefs_file: Path) -> bool:
+        """
+        Aplica una configuración guardada sobre el Preferences de un perfil
+        
+        Args:
+            config_data: Diccionario de configuración (formato Configuration.to_dict)
+            prefs_file: Archivo Preferences del perfil destino
+        
+        Returns:
+            True si éxito, False si error
+        """
+        return ExtractionEngine.patch_preferences(config_data, prefs_file) is not None
\ No newline at end of file
@@ -0,0 +1,318 @@
+"""
+Especificación declarativa de qué partes de Preferences extraer
+"""
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.json_backend import JsonBackend
+from utils.json_stream import JsonStream
+
+
+class _SpecNode:
+    """Nodo del trie compilado: un segmento de ruta"""
+    __slots__ = ("children", "wildcard", "include", "exclude")
+    
+    def __init__(self):
+        self.children: Dict[str, "_SpecNode"] = {}
+        self.wildcard: Optional["_SpecNode"] = None
+        self.include = False
+        self.exclude = False
+
+
+class ExtractionSpec:
+    """
+    Filtro de rutas JSON con comodines, compilado una vez en un trie.
+    
+    Las rutas usan punto como separador y * como comodín de un segmento
+    (ej. "extensions.settings.*.manifest.name"); un punto literal se escribe
+    "\\." y una clave que sea solo "*" como "\\*". include elige subárboles
+    completos y exclude recorta partes de ellos.
+    
+    Al extraer solo se recorren las claves que aparecen en el trie: si un
+    nivel no tiene comodines se consultan directamente sus claves literales,
+    sin iterar el resto del diccionario, y los subárboles incluidos sin
+    exclusiones debajo se toman enteros sin copiarlos.
+    """
+    
+    WILDCARD = "*"
+    
+    PRESETS = {
+        # Lo que siempre extrajo la herramienta
+        "default": {
+            "include": ["brave", "shortcuts", "keyboard_shortcuts", "profile.name"],
+            "exclude": []
+        },
+        # Solo ajustes visibles: JSONs mucho más chicos
+        "compact": {
+            "include": [
+                "brave.shields",
+                "brave.new_tab_page",
+                "brave.tabs",
+                "brave.sidebar",
+                "brave.brave_search",
+                "brave.location_bar_is_wide",
+                "brave.show_bookmarks_button",
+                "browser.theme",
+                "extensions.theme",
+                "shortcuts",
+                "keyboard_shortcuts",
+                "profile.name"
+            ],
+            "exclude": []
+        }
+    }
+    
+    _SPLIT_RE = re.compile(r"(?<!\\)\.")
+    
+    _MISSING = object()
+    _presets_cache: Dict[str, "ExtractionSpec"] = {}
+    
+    def __init__(self, include: Sequence[str], exclude: Sequence[str] = ()):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self._root = _SpecNode()
+        for path in self.include:
+            self._add(path).include = True
+        for path in self.exclude:
+            self._add(path).exclude = True
+    
+    def _add(self, path: str) -> _SpecNode:
+        """Agrega una ruta al trie y devuelve su nodo final"""
+        if not path.strip():
+            raise ValueError("Ruta vacía en la especificación de extracción")
+        node = self._root
+        for segment in self._SPLIT_RE.split(path.strip()):
+            if segment == self.WILDCARD:
+                if node.wildcard is None:
+                    node.wildcard = _SpecNode()
+                node = node.wildcard
+            else:
+                key = "*" if segment == "\\*" else segment.replace("\\.", ".")
+                node = node.children.setdefault(key, _SpecNode())
+        return node
+    
+    @classmethod
+    def preset(cls, name: str = "default") -> "ExtractionSpec":
+        """
+        Obtiene una especificación predefinida (compilada una sola vez)
+        
+        Args:
+            name: Nombre en PRESETS
+        
+        Returns:
+            ExtractionSpec compilada
+        """
+        if name not in cls.PRESETS:
+            raise ValueError(f"Especificación desconocida: {name} (disponibles: {', '.join(cls.PRESETS)})")
+        if name not in cls._presets_cache:
+            cls._presets_cache[name] = cls(**cls.PRESETS[name])
+        return cls._presets_cache[name]
+    
+    @classmethod
+    def from_file(cls, path: Path) -> "ExtractionSpec":
+        """
+        Carga una especificación desde un JSON {"include": [...], "exclude": [...]}
+        
+        Args:
+            path: Archivo JSON
+        
+        Returns:
+            ExtractionSpec compilada
+        """
+        data = JsonBackend.load(path)
+        if not isinstance(data.get("include"), list):
+            raise ValueError(f"{path}: falta la lista 'include'")
+        return cls(data["include"], data.get("exclude", []))
+    
+    @classmethod
+    def resolve(cls, spec: Optional[str] = None) -> "ExtractionSpec":
+        """
+        Interpreta el argumento --spec: nombre de preset o ruta a un JSON
+        
+        Args:
+            spec: Nombre o ruta (None para el preset default)
+        
+        Returns:
+            ExtractionSpec compilada
+        """
+        if not spec:
+            return cls.preset()
+        if spec in cls.PRESETS:
+            return cls.preset(spec)
+        return cls.from_file(Path(spec))
+    
+    @property
+    def is_default(self) -> bool:
+        """Indica si reproduce la extracción clásica"""
+        return self.include == self.PRESETS["default"]["include"] and not self.exclude
+    
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Convierte a diccionario para JSON"""
+        return {"include": self.include, "exclude": self.exclude}
+    
+    def extract(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extrae de data solo las rutas incluidas
+        
+        Args:
+            data: Diccionario de origen (ej. Preferences parseado)
+        
+        Returns:
+            Diccionario con la misma estructura que data, podado. Los
+            subárboles sin exclusiones se comparten con data (no se copian).
+        """
+        result = self._apply(data, [self._root], False)
+        return {} if result is self._MISSING else result
+    
+    def _apply(self, value: Any, nodes: List[_SpecNode], included: bool) -> Any:
+        if any(node.exclude for node in nodes):
+            return self._MISSING
+        included = included or any(node.include for node in nodes)
+        
+        if not isinstance(value, dict):
+            return value if included else self._MISSING
+        
+        # Subárbol incluido sin nada más abajo en el trie: se toma entero
+        if included and not any(node.children or node.wildcard for node in nodes):
+            return value
+        
+        result = {}
+        wildcards = [node.wildcard for node in nodes if node.wildcard is not None]
+        
+        if included or wildcards:
+            keys = value.keys()
+        else:
+            # Solo claves literales: se buscan directo, sin recorrer el resto del nivel
+            keys = [key for key in dict.fromkeys(k for node in nodes for k in node.children) if key in value]
+        
+        for key in keys:
+            child_nodes = [node.children[key] for node in nodes if key in node.children] + wildcards
+            
+            if not child_nodes and not included:
+                continue
+            selected = self._apply(value[key], child_nodes, included)
+            if selected is not self._MISSING:
+                result[key] = selected
+        
+        if not result and not included:
+            return self._MISSING
+        return result
+    
+    def extract_file(self, path: Path) -> Dict[str, Any]:
+        """
+        Lee un JSON (ej. Preferences) y extrae solo las rutas incluidas
+        
+        Si el archivo supera JsonStream.STREAM_THRESHOLD se recorre por
+        bloques y solo se parsean los subárboles elegidos: la memoria depende
+        de lo extraído, no del tamaño del archivo. Los más chicos se parsean
+        enteros, que es más rápido.
+        
+        Args:
+            path: Archivo JSON con un objeto
+        
+        Returns:
+            Lo mismo que extract() sobre el archivo parseado
+        """
+        if not JsonStream.should_stream(path):
+            return self.extract(JsonBackend.load(path))
+        with JsonStream.open(path) as stream:
+            result = self._apply_stream(stream, [self._root], False)
+        return {} if result is self._MISSING else result
+    
+    def _apply_stream(self, stream: JsonStream, nodes: List[_SpecNode], included: bool) -> Any:
+        """Como _apply, pero sobre el próximo valor de stream (lo que no se elige se saltea sin parsear)"""
+        if any(node.exclude for node in nodes):
+            stream.skip()
+            return self._MISSING
+        included = included or any(node.include for node in nodes)
+        
+        if stream.peek_type() != "object" or (included and not any(node.children or node.wildcard
+                                                                    for node in nodes)):
+            if included:
+                return stream.read()
+            stream.skip()
+            return self._MISSING
+        
+        result = {}
+        wildcards = [node.wildcard for node in nodes if node.wildcard is not None]
+        
+        for key in stream.iter_object():
+            child_nodes = [node.children[key] for node in nodes if key in node.children] + wildcards
+            
+            if not child_nodes and not included:
+                stream.skip()
+                continue
+            selected = self._apply_stream(stream, child_nodes, included)
+            if selected is not self._MISSING:
+                result[key] = selected
+        
+        if not included and not wildcards:
+            # Mismo orden de claves que _apply (el del trie), así el JSON guardado no depende del camino
+            order = dict.fromkeys(k for node in nodes for k in node.children)
+            result = {key: result[key] for key in order if key in result}
+        
+        if not result and not included:
+            return self._MISSING
+        return result
+    
+    def matches(self, keys: Sequence[str]) -> bool:
+        """
+        Indica si una ruta cae dentro de lo que elige la especificación
+        
+        Args:
+            keys: Ruta ya separada en claves (ej. ["brave", "shields", "stats"])
+        """
+        nodes, included = [self._root], False
+        for key in keys:
+            if any(node.exclude for node in nodes):
+                return False
+            included = included or any(node.include for node in nodes)
+            nodes = [node.children[key] for node in nodes if key in node.children] + \
+                    [node.wildcard for node in nodes if node.wildcard is not None]
+            if not nodes:
+                return included
+        return not any(node.exclude for node in nodes) and (included or any(node.include for node in nodes))
+    
+    def common_entries(self, a: Dict[str, Any], b: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Poda dos extracciones a las entradas elegidas por comodín que existen en ambas
+        
+        Un comodín elige entradas que Brave agrega y quita por su cuenta (ej.
+        las extensiones en "extensions.settings.*"): si una está de un solo
+        lado no es un ajuste que haya que escribir ni borrar. Las claves
+        literales y los subárboles incluidos enteros quedan como están.
+        
+        Args:
+            a: Extracción de un lado (ej. el perfil actual)
+            b: Extracción del otro lado (ej. la configuración guardada)
+        
+        Returns:
+            (a, b) podados; los subárboles que no se podan se comparten, no se copian
+        """
+        return self._common(a, b, [self._root], False)
+    
+    def _common(self, a: Any, b: Any, nodes: List[_SpecNode], included: bool) -> Tuple[Any, Any]:
+        """Como common_entries sobre un nivel (_MISSING del lado donde la clave no existe)"""
+        included = included or any(node.include for node in nodes)
+        if included or not all(isinstance(value, dict) or value is self._MISSING for value in (a, b)):
+            return a, b
+        
+        wildcards = [node.wildcard for node in nodes if node.wildcard is not None]
+        a_dict = {} if a is self._MISSING else a
+        b_dict = {} if b is self._MISSING else b
+        result_a, result_b = {}, {}
+        
+        for key in dict.fromkeys([*a_dict, *b_dict]):
+            literal = [node.children[key] for node in nodes if key in node.children]
+            if not literal and wildcards and (key not in a_dict or key not in b_dict):
+                continue
+            children = self._common(a_dict.get(key, self._MISSING), b_dict.get(key, self._MISSING),
+                                    literal + wildcards, included)
+            for result, original, child in zip((result_a, result_b), (a_dict, b_dict), children):
+                # Un contenedor que quedó vacío por la poda no existe de ese lado
+                if child is not self._MISSING and (child != {} or not original[key]):
+                    result[key] = child
+        
+        return (self._MISSING if a is self._MISSING else result_a,
+                self._MISSING if b is self._MISSING else result_b)
@@ -0,0 +1,183 @@
+"""
+Modo flota: guarda y respalda la configuración de Brave de muchos usuarios
+"""
+import contextlib
+import datetime
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core.extraction_engine import ExtractionEngine
+from core.extraction_spec import ExtractionSpec
+from core.profile_handler import ProfileHandler
+
+
+class FleetManager:
+    """
+    Procesa varias carpetas personales en paralelo, un proceso por usuario.
+    
+    Cada usuario trabaja en su propia carpeta <salida>/<usuario>-<hash>/ (con
+    sus backup/ y saved_configs/), así los nombres con timestamp no chocan y
+    un usuario con permisos rotos o un Preferences corrupto solo marca su
+    propio resultado como fallido. El hash es de la ruta completa:
+    /home/alice y /srv/home/alice no comparten carpeta.
+    """
+    
+    DEFAULT_ROOTS = [Path("/home")]
+    LOG_TAIL_LINES = 20
+    
+    @staticmethod
+    def discover_homes(roots: List[Path]) -> List[Path]:
+        """
+        Encuentra las carpetas personales que tienen configuración de Brave
+        
+        Args:
+            roots: Carpetas personales o carpetas que las contienen (ej. /home)
+        
+        Returns:
+            Lista de carpetas personales, sin duplicados y ordenada
+        """
+        homes = set()
+        for root in roots:
+            root = Path(root).expanduser()
+            if ProfileHandler.get_brave_config_path(root).is_dir():
+                homes.add(root.resolve())
+                continue
+            try:
+                children = list(root.iterdir())
+            except OSError:
+                continue
+            for child in children:
+                try:
+                    if child.is_dir() and ProfileHandler.get_brave_config_path(child).is_dir():
+                        homes.add(child.resolve())
+                except OSError:
+                    continue
+        return sorted(homes)
+    
+    @staticmethod
+    def user_dir_name(home: Path) -> str:
+        """Carpeta de salida de un usuario: su nombre más un hash corto de la ruta completa"""
+        digest = hashlib.sha1(os.fsencode(str(home))).hexdigest()[:8]
+        return f"{home.name}-{digest}"
+    
+    @staticmethod
+    def process_home(home: Path, output_dir: Path, save: bool = True, backup: bool = True,
+                     backup_options: Optional[dict] = None, spec: Optional[ExtractionSpec] = None) -> Dict:
+        """
+        Guarda y respalda la configuración de un usuario (se ejecuta en un proceso del pool)
+        
+        Args:
+            home: Carpeta personal del usuario
+            output_dir: Carpeta raíz de la flota; se usa <output_dir>/<usuario>-<hash>/ (ver user_dir_name)
+            save: Extraer la configuración de todos los perfiles
+            backup: Crear un backup del directorio de Brave
+            backup_options: Argumentos extra para BackupManager.create_backup
+            spec: Qué rutas de Preferences extraer
+        
+        Returns:
+            Resultado del usuario (nunca lanza excepciones)
+        """
+        from storage.backup_manager import BackupManager
+        
+        started = time.monotonic()
+        brave_path = ProfileHandler.get_brave_config_path(home)
+        user_dir = Path(output_dir) / FleetManager.user_dir_name(home)
+        result = {"user": home.name, "home": str(home), "brave_path": str(brave_path), "output": str(user_dir),
+                  "ok": False, "saved": [], "failed": [], "backup": None, "error": None}
+        log = io.StringIO()
+        
+        try:
+            user_dir.mkdir(parents=True, exist_ok=True)
+            # get_backups_dir / get_saved_configs_dir son relativos al directorio actual
+            os.chdir(user_dir)
+            
+            with contextlib.redirect_stdout(log):
+                if save:
+                    profiles = ProfileHandler.detect_profiles(brave_path)
+                    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                    saved_path = BackupManager.get_saved_configs_dir() / f"brave_all_profiles_config_{timestamp}"
+                    saved_path.mkdir(parents=True, exist_ok=True)
+                    # El paralelismo ya está entre usuarios: dentro de cada uno, perfiles en serie
+                    result["saved"], result["failed"] = ExtractionEngine.save_profiles(profiles, saved_path,
+                                                                                       max_workers=1, spec=spec)
+                
+                if backup:
+                    backup_path = BackupManager.create_backup(brave_config=brave_path, **(backup_options or {}))
+                    if backup_path:
+                        result["backup"] = str(backup_path)
+                    else:
+                        result["error"] = "No se pudo crear el backup"
+            
+            result["ok"] = not result["failed"] and not result["error"]
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        
+        result["elapsed"] = round(time.monotonic() - started, 3)
+        result["log"] = log.getvalue().splitlines()[-FleetManager.LOG_TAIL_LINES:]
+        return result
+    
+    @staticmethod
+    def run(homes: List[Path], output_dir: Path, workers: Optional[int] = None, save: bool = True,
+            backup: bool = True, backup_options: Optional[dict] = None,
+            spec: Optional[ExtractionSpec] = None) -> Dict:
+        """
+        Procesa todas las carpetas personales en un pool de procesos
+        
+        Args:
+            homes: Carpetas personales (ver discover_homes)
+            output_dir: Carpeta raíz donde queda lo de cada usuario
+            workers: Procesos en paralelo (por defecto uno por CPU)
+            save: Extraer la configuración de los perfiles
+            backup: Crear backups
+            backup_options: Argumentos extra para BackupManager.create_backup
+            spec: Qué rutas de Preferences extraer
+        
+        Returns:
+            Resumen con totales y la lista de resultados por usuario
+        """
+        output_dir = Path(output_dir).resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        started = time.monotonic()
+        results = []
+        
+        if homes:
+            print(f"🔄 Procesando {len(homes)} usuarios con {workers or os.cpu_count()} procesos...")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(FleetManager.process_home, home, output_dir, save, backup, backup_options, spec): home
+                    for home in homes
+                }
+                for future in as_completed(futures):
+                    home = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:  # el proceso murió (BrokenProcessPool, memoria, etc.)
+                        result = {"user": home.name, "home": str(home), "ok": False,
+                                  "error": f"{type(e).__name__}: {e}"}
+                    results.append(result)
+                    status = "✅" if result["ok"] else "❌"
+                    detail = result.get("error") or f"{len(result.get('saved', []))} perfiles guardados"
+                    if result.get("failed"):
+                        detail += f", fallaron: {', '.join(result['failed'])}"
+                    print(f"   {status} {result['user']}: {detail}")
+        
+        results.sort(key=lambda r: (r["user"], r["home"]))
+        ok_count = sum(1 for r in results if r["ok"])
+        summary = {
+            "users": len(results),
+            "ok": ok_count,
+            "failed": len(results) - ok_count,
+            "profiles_saved": sum(len(r.get("saved", [])) for r in results),
+            "backups": sum(1 for r in results if r.get("backup")),
+            "elapsed": round(time.monotonic() - started, 3),
+            "output_dir": str(output_dir)
+        }
+        print(f"📊 Flota: {summary['ok']}/{summary['users']} usuarios OK, "
+              f"{summary['profiles_saved']} perfiles guardados, {summary['backups']} backups "
+              f"en {summary['elapsed']:.1f}s")
+        return {"summary": summary, "results": results}
\ No newline at end of file
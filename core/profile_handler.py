@@ -7,24 +7,37 @@ from pathlib import Path
 from typing import List, Optional
 
 from models.profile import Profile
+from utils.tracing import Tracer
 
 
 class ProfileHandler:
     """Gestiona la detección y manejo de perfiles de Brave"""
     
     @staticmethod
-    def get_brave_config_path() -> Path:
-        """Obtiene la ruta de configuración de Brave según el SO"""
+    def get_brave_config_path(home: Optional[Path] = None) -> Path:
+        """
+        Obtiene la ruta de configuración de Brave según el SO
+        
+        Args:
+            home: Carpeta personal del usuario (por defecto la del usuario actual)
+        
+        Returns:
+            Path al directorio de configuración de Brave
+        """
         os_name = platform.system().lower()
         if os_name == "windows":
             import os
-            return Path(os.environ.get("LOCALAPPDATA", "")) / "BraveSoftware" / "Brave-Browser" / "User Data"
-        elif os_name == "darwin":
-            return Path.home() / "Library" / "Application Support" / "BraveSoftware" / "Brave-Browser" / "User Data"
+            local_app_data = Path(home) / "AppData" / "Local" if home else Path(os.environ.get("LOCALAPPDATA", ""))
+            return local_app_data / "BraveSoftware" / "Brave-Browser" / "User Data"
+        
+        home = Path(home) if home else Path.home()
+        if os_name == "darwin":
+            return home / "Library" / "Application Support" / "BraveSoftware" / "Brave-Browser" / "User Data"
         else:  # Linux
-            return Path.home() / ".config" / "BraveSoftware" / "Brave-Browser"
+            return home / ".config" / "BraveSoftware" / "Brave-Browser"
     
     @staticmethod
+    @Tracer.traced("detect_profiles")
     def detect_profiles(brave_path: Path) -> List[Profile]:
         """
         Detecta los perfiles disponibles en Brave
@@ -35,20 +48,30 @@ class ProfileHandler:
         Returns:
             Lista de perfiles detectados
         """
-        profiles = []
-        
-        if not brave_path.exists():
-            return profiles
-        
-        # Buscar carpetas de perfiles
-        for item in brave_path.iterdir():
-            if item.is_dir() and item.name.startswith(("Profile ", "Default", "Guest Profile")):
-                profile = Profile.from_path(item)
-                profiles.append(profile)
+        profiles = [Profile.from_path(item) for item in ProfileHandler.list_profile_dirs(brave_path)]
         
         # Ordenar por nombre de carpeta
         return sorted(profiles, key=lambda p: p.folder_name)
     
+    @staticmethod
+    def list_profile_dirs(brave_path: Path) -> List[Path]:
+        """
+        Lista las carpetas de perfiles sin leer su contenido
+        
+        Args:
+            brave_path: Path a la configuración de Brave
+        
+        Returns:
+            Lista de carpetas de perfiles
+        """
+        if not brave_path.exists():
+            return []
+        
+        return [
+            item for item in brave_path.iterdir()
+            if item.is_dir() and item.name.startswith(("Profile ", "Default", "Guest Profile"))
+        ]
+    
     @staticmethod
     def find_brave_configurations(current_dir: Path) -> List[Path]:
         """
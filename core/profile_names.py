@@ -0,0 +1,135 @@
+"""
+Resolución rápida de nombres visibles de perfiles
+"""
+import atexit
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.json_backend import JsonBackend
+from utils.json_stream import JsonStream
+from utils.system_utils import SystemUtils
+
+
+class ProfileNameResolver:
+    """
+    Obtiene el nombre visible de un perfil sin abrir su Preferences.
+    
+    Brave guarda el nombre de todos los perfiles en profile.info_cache de
+    Local State: se lee una vez por directorio de Brave y sirve para todos los
+    perfiles. Solo si un perfil no figura ahí se lee su Preferences. Ambos
+    resultados se guardan en una caché en disco indexada por mtime, así las
+    siguientes ejecuciones resuelven los nombres con un stat por archivo.
+    """
+    
+    CACHE_FILENAME = "profile_names.json"
+    CACHE_VERSION = 1
+    LOCAL_STATE_FILENAME = "Local State"
+    
+    _lock = threading.Lock()
+    _cache: Optional[Dict[str, dict]] = None
+    _dirty = False
+    
+    @staticmethod
+    def get_cache_path() -> Path:
+        """Obtiene la ruta del archivo de caché"""
+        return SystemUtils.get_cache_dir() / ProfileNameResolver.CACHE_FILENAME
+    
+    @staticmethod
+    def _load() -> Dict[str, dict]:
+        """Carga la caché desde disco (una sola vez por proceso)"""
+        if ProfileNameResolver._cache is None:
+            cache = {}
+            cache_path = ProfileNameResolver.get_cache_path()
+            if cache_path.exists():
+                try:
+                    data = JsonBackend.load(cache_path)
+                    if data.get("version") == ProfileNameResolver.CACHE_VERSION:
+                        cache = data
+                except Exception:
+                    cache = {}
+            cache.setdefault("local_state", {})
+            cache.setdefault("preferences", {})
+            ProfileNameResolver._cache = cache
+            atexit.register(ProfileNameResolver.save)
+        return ProfileNameResolver._cache
+    
+    @staticmethod
+    def save():
+        """Persiste la caché si hubo cambios"""
+        with ProfileNameResolver._lock:
+            if not ProfileNameResolver._dirty or ProfileNameResolver._cache is None:
+                return
+            cache_path = ProfileNameResolver.get_cache_path()
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            try:
+                data = dict(ProfileNameResolver._cache, version=ProfileNameResolver.CACHE_VERSION)
+                JsonBackend.dump(data, tmp_path, compact=True)
+                os.replace(tmp_path, cache_path)
+                ProfileNameResolver._dirty = False
+            except OSError:
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+    
+    @staticmethod
+    def _cached(section: str, path: Path, reader) -> Optional[object]:
+        """Devuelve el valor cacheado de path si su mtime no cambió; si cambió, lo recalcula con reader"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        
+        key = str(path.absolute())
+        stamp = [st.st_mtime_ns, st.st_size]
+        entries = ProfileNameResolver._load()[section]
+        cached = entries.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        
+        try:
+            value = reader(path)
+        except (OSError, ValueError, AttributeError):
+            value = None
+        entries[key] = [stamp, value]
+        ProfileNameResolver._dirty = True
+        return value
+    
+    @staticmethod
+    def _read_local_state_names(local_state: Path) -> Dict[str, str]:
+        """Lee {carpeta: nombre} de profile.info_cache"""
+        info_cache = JsonStream.get(local_state, ("profile", "info_cache"), {})
+        return {folder: info["name"] for folder, info in info_cache.items()
+                if isinstance(info, dict) and info.get("name")}
+    
+    @staticmethod
+    def _read_preferences_name(prefs_file: Path) -> Optional[str]:
+        """Lee profile.name del Preferences de un perfil (sin parsear el resto si es enorme)"""
+        return JsonStream.get(prefs_file, ("profile", "name"))
+    
+    @staticmethod
+    def get_display_name(profile_path: Path) -> str:
+        """
+        Obtiene el nombre visible de un perfil
+        
+        Args:
+            profile_path: Carpeta del perfil (ej. .../Brave-Browser/Default)
+        
+        Returns:
+            Nombre del perfil, o el nombre de la carpeta si no se encuentra
+        """
+        profile_path = Path(profile_path)
+        with ProfileNameResolver._lock:
+            names = ProfileNameResolver._cached(
+                "local_state", profile_path.parent / ProfileNameResolver.LOCAL_STATE_FILENAME,
+                ProfileNameResolver._read_local_state_names
+            )
+            if names and names.get(profile_path.name):
+                return names[profile_path.name]
+            
+            name = ProfileNameResolver._cached(
+                "preferences", profile_path / "Preferences", ProfileNameResolver._read_preferences_name
+            )
+        return name or profile_path.name
\ No newline at end of file
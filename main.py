@@ -5,12 +5,16 @@ Sistema escalable para gestionar configuraciones de Brave Browser
 """
 
 import argparse
+import sys
 from pathlib import Path
 
 # Importaciones modulares
 from core.profile_handler import ProfileHandler
+from ui.batch_cli import BatchCLI
 from ui.menus import MenuManager
+from utils.status_cache import StatusCache
 from utils.system_utils import SystemUtils
+from utils.tracing import Tracer
 
 
 class BraveConfigManager:
@@ -20,12 +24,13 @@ class BraveConfigManager:
         self.profile_handler = ProfileHandler()
         self.menu_manager = MenuManager()
         self.system_utils = SystemUtils()
+        self.status_cache = StatusCache()
     
     def run_interactive(self):
         """Ejecuta el modo interactivo"""
         while True:
-            # Obtener estado actual
-            status = self.system_utils.get_status_info()
+            # Obtener estado actual (cacheado mientras no cambien los directorios)
+            status = self.status_cache.get_status()
             
             # Mostrar menú principal
             self.menu_manager.show_main_menu(status)
@@ -35,18 +40,21 @@ class BraveConfigManager:
                 
                 if main_choice == "1":
                     # Guardar configuración actual
-                    profiles = ProfileHandler.detect_profiles(ProfileHandler.get_brave_config_path())
-                    success = self.menu_manager.show_save_menu(profiles)
+                    with Tracer.span("menu.save"):
+                        profiles = ProfileHandler.detect_profiles(ProfileHandler.get_brave_config_path())
+                        success = self.menu_manager.show_save_menu(profiles)
                     self._handle_operation_result(success, "guardar configuración")
                     
                 elif main_choice == "2":
                     # Restaurar configuración
-                    success = self.menu_manager.show_restore_menu()
+                    with Tracer.span("menu.restore"):
+                        success = self.menu_manager.show_restore_menu()
                     self._handle_operation_result(success, "restaurar configuración")
                     
                 elif main_choice == "3":
                     # Reemplazar configuración local
-                    success = self.menu_manager.show_replace_menu()
+                    with Tracer.span("menu.replace"):
+                        success = self.menu_manager.show_replace_menu()
                     self._handle_operation_result(success, "reemplazar configuración")
                     
                 elif main_choice == "4":
@@ -70,6 +78,9 @@ class BraveConfigManager:
         else:
             input(f"\n❌ Error en {operation}. Presioná Enter para continuar...")
         
+        # Las operaciones pueden cambiar perfiles, backups o configs guardadas
+        self.status_cache.invalidate()
+        
         # Limpiar pantalla para siguiente operación
         self.system_utils.clear_screen()
     
@@ -82,6 +93,27 @@ class BraveConfigManager:
   --interactive, -i    Modo interactivo (default)
   --help, -h          Muestra esta ayuda
 
+⚙️ Subcomandos no interactivos (salida JSON en stdout):
+  status               Estado del sistema
+  list                 Perfiles, backups y configuraciones guardadas
+  save                 Extrae la configuración de los perfiles (--spec default|compact|ARCHIVO, --backup)
+  backup               Crea un backup (--incremental, --archive, --profile, --include-caches, --exclude)
+  restore              Restaura (--backup NOMBRE|latest o --saved NOMBRE [--profile CARPETA], --allow-partial)
+  diff OLD NEW         Diferencias entre configuraciones guardadas o perfiles
+  prune                Borra backups viejos (--keep-last/hourly/daily/weekly/monthly N, --max-total-size)
+  search               Busca en el catálogo (--since, --until, --profile, --key, --min-size)
+  fleet [HOME ...]     Guarda y respalda a todos los usuarios (--workers N, --output DIR)
+  watch                Guarda la configuración cada vez que cambia (--debounce SEG, --poll, --profile)
+  
+  Opciones comunes: --brave-path DIR, --repo DIR
+  save, backup y restore: --per-disk N (copias simultáneas por disco)
+  
+  Traza de tiempos (antes del subcomando, reporte en stderr al salir):
+  --trace              Spans y contadores por operación (o BRAVE_CM_TRACE=text|json[,profile])
+  --trace-format json  Reporte en JSON
+  --trace-profile      Suma el top de cProfile al reporte
+  --trace-output FILE  Escribe el reporte en un archivo
+
 📁 Estructura modular:
   core/                Lógica de negocio principal
   ui/                  Menús e interfaz
@@ -98,6 +130,7 @@ class BraveConfigManager:
 
 💡 Uso recomendado:
   python3 main.py --interactive
+  python3 main.py backup --incremental --brave-path /home/usuario/.config/BraveSoftware/Brave-Browser
 
         """)
 
@@ -121,8 +154,44 @@ def main():
         version="🦁 Brave Config Manager v2.0.0 - Modular Edition"
     )
     
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Medir tiempos por operación y mostrar el reporte al salir"
+    )
+    
+    parser.add_argument(
+        "--trace-format",
+        choices=Tracer.FORMATS,
+        default="text",
+        help="Formato del reporte de --trace (por defecto text)"
+    )
+    
+    parser.add_argument(
+        "--trace-profile",
+        action="store_true",
+        help="Con --trace, sumar el top de cProfile al reporte"
+    )
+    
+    parser.add_argument(
+        "--trace-output",
+        type=Path,
+        metavar="ARCHIVO",
+        help="Con --trace, escribir el reporte en un archivo en vez de stderr"
+    )
+    
+    subparsers = parser.add_subparsers(dest="command", metavar="COMANDO")
+    BatchCLI.register_commands(subparsers)
+    
     args = parser.parse_args()
     
+    if args.trace:
+        Tracer.configure(True, args.trace_format, args.trace_profile, args.trace_output)
+    
+    # Subcomandos: sin menús, resultado en JSON
+    if args.command in BatchCLI.COMMANDS:
+        sys.exit(BatchCLI.run(args))
+    
     # Crear instancia del gestor
     manager = BraveConfigManager()
     
@@ -1,11 +1,13 @@
 """
 Modelos de datos para Brave Configuration Manager
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from utils.tracing import Tracer
+
 
 @dataclass
 class Profile:
@@ -13,37 +15,30 @@ class Profile:
     path: Path
     folder_name: str
     display_name: str
-    size: int = 0
+    _size: Optional[int] = field(default=None, repr=False, compare=False)
     
     @classmethod
+    @Tracer.traced("profile.from_path")
     def from_path(cls, path: Path) -> 'Profile':
-        """Crea un Profile desde un path"""
-        folder_name = path.name
-        display_name = folder_name
+        """Crea un Profile desde un path (el tamaño se calcula recién al consultarlo)"""
+        from core.profile_names import ProfileNameResolver
         
-        # Intentar obtener nombre real desde Preferences
-        prefs_file = path / "Preferences"
-        if prefs_file.exists():
-            try:
-                import json
-                with open(prefs_file, 'r', encoding='utf-8') as f:
-                    prefs = json.load(f)
-                    if 'profile' in prefs and 'name' in prefs['profile']:
-                        display_name = prefs['profile']['name']
-            except:
-                pass
+        folder_name = path.name
+        # Nombre real desde Local State o Preferences, cacheado por mtime
+        display_name = ProfileNameResolver.get_display_name(path)
         
-        # Calcular tamaño
-        size = 0
-        if path.exists():
+        return cls(path=path, folder_name=folder_name, display_name=display_name)
+    
+    @property
+    def size(self) -> int:
+        """Tamaño en bytes, calculado de forma perezosa con el índice de tamaños"""
+        if self._size is None:
+            from storage.size_index import SizeIndex
             try:
-                for f in path.rglob('*'):
-                    if f.is_file():
-                        size += f.stat().st_size
-            except:
-                pass
-        
-        return cls(path=path, folder_name=folder_name, display_name=display_name, size=size)
+                self._size = SizeIndex.get_tree_size(self.path)
+            except Exception:
+                self._size = 0
+        return self._size
     
     @property
     def size_mb(self) -> float:
@@ -58,6 +53,7 @@ class Configuration:
     keyboard_shortcuts: Dict[str, Any]
     profile_name: Optional[str] = None
     extraction_metadata: Optional[Dict[str, Any]] = None
+    extra_settings: Dict[str, Any] = field(default_factory=dict)
     
     @classmethod
     def create_empty(cls) -> 'Configuration':
@@ -86,6 +82,10 @@ class Configuration:
         if self.extraction_metadata:
             result["extraction_metadata"] = self.extraction_metadata
         
+        # Otras rutas de Preferences pedidas por la especificación de extracción
+        if self.extra_settings:
+            result["extra_settings"] = self.extra_settings
+        
         return result
     
     @classmethod
@@ -95,10 +95,60 @@ class Configuration:
             brave_settings=data.get("brave_settings", {}),
             keyboard_shortcuts=data.get("keyboard_shortcuts", {}),
             profile_name=data.get("profile_name"),
-            extraction_metadata=data.get("extraction_metadata")
+            extraction_metadata=data.get("extraction_metadata"),
+            extra_settings=data.get("extra_settings", {})
         )
 
 
+@dataclass
+class ExtractionResult:
+    """Resultado de extraer y guardar la configuración de un perfil"""
+    folder_name: str
+    output_path: Optional[Path] = None
+    ok: bool = False
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    
+    @property
+    def total_time(self) -> float:
+        """Segundos totales (lectura + parseo + extracción + escritura)"""
+        return sum(self.timings.values())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario para JSON"""
+        return {
+            "folder": self.folder_name,
+            "output": str(self.output_path) if self.output_path else None,
+            "ok": self.ok,
+            "error": self.error,
+            "timings": {stage: round(seconds, 4) for stage, seconds in self.timings.items()}
+        }
+
+
+@dataclass
+class ConfigDiff:
+    """Diferencias entre dos configuraciones, por ruta de clave"""
+    added: Dict[str, Any] = field(default_factory=dict)
+    removed: Dict[str, Any] = field(default_factory=dict)
+    changed: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    
+    @property
+    def is_empty(self) -> bool:
+        """Indica si no hay ninguna diferencia"""
+        return not (self.added or self.removed or self.changed)
+    
+    @property
+    def total(self) -> int:
+        """Cantidad de rutas con diferencias"""
+        return len(self.added) + len(self.removed) + len(self.changed)
+    
+    def to_dict(self, include_values: bool = True) -> Dict[str, Any]:
+        """Convierte a diccionario para JSON (sin valores: solo listas de rutas)"""
+        if include_values:
+            return {"added": self.added, "removed": self.removed, "changed": self.changed}
+        return {"added": sorted(self.added), "removed": sorted(self.removed), "changed": sorted(self.changed)}
+
+
 @dataclass
 class Backup:
     """Representa un backup de configuración"""
@@ -120,4 +170,169 @@ class Backup:
             except:
                 pass
         
-        return cls(path=path, name=name, timestamp=timestamp)
\ No newline at end of file
+        return cls(path=path, name=name, timestamp=timestamp)
+
+@dataclass
+class BackupManifest:
+    """
+    Describe un backup deduplicado: qué blobs del almacén forman cada archivo
+    
+    En un backup incremental (kind="incremental") files solo tiene los archivos
+    nuevos o modificados respecto de base, y deleted los que ya no existen.
+    """
+    created_at: str
+    source: str
+    files: Dict[str, Dict[str, Any]]
+    dirs: List[str]
+    symlinks: Dict[str, str]
+    kind: str = "full"
+    base: Optional[str] = None
+    deleted: List[str] = field(default_factory=list)
+    version: int = 1
+    
+    @classmethod
+    def create(cls, source: Path) -> 'BackupManifest':
+        """Crea un manifiesto vacío para un backup de source"""
+        return cls(
+            created_at=datetime.now().isoformat(),
+            source=str(source),
+            files={},
+            dirs=[],
+            symlinks={}
+        )
+    
+    @property
+    def total_size(self) -> int:
+        """Tamaño lógico de los archivos del manifiesto en bytes"""
+        return sum(entry["size"] for entry in self.files.values())
+    
+    @property
+    def is_incremental(self) -> bool:
+        """Indica si depende de otro backup"""
+        return self.kind == "incremental" and bool(self.base)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario para JSON"""
+        result = {
+            "version": self.version,
+            "kind": self.kind,
+            "created_at": self.created_at,
+            "source": self.source,
+            "dirs": self.dirs,
+            "symlinks": self.symlinks,
+            "files": self.files
+        }
+        
+        if self.base:
+            result["base"] = self.base
+            result["deleted"] = self.deleted
+        
+        return result
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BackupManifest':
+        """Crea desde diccionario"""
+        return cls(
+            created_at=data.get("created_at", ""),
+            source=data.get("source", ""),
+            files=data.get("files", {}),
+            dirs=data.get("dirs", []),
+            symlinks=data.get("symlinks", {}),
+            kind=data.get("kind", "full"),
+            base=data.get("base"),
+            deleted=data.get("deleted", []),
+            version=data.get("version", 1)
+        )
+
+@dataclass
+class RetentionPolicy:
+    """
+    Qué backups conservar
+    
+    keep_last guarda los N más recientes; keep_hourly/daily/weekly/monthly
+    guardan el más reciente de cada una de las últimas N horas, días,
+    semanas o meses que tengan backups. Estas reglas cuentan por separado
+    cada origen y alcance (los backups de algunos perfiles no compiten con
+    los del directorio completo). max_total_bytes es un tope para lo
+    que ocupan los backups conservados. Sin ninguna regla se conserva todo.
+    """
+    keep_last: int = 0
+    keep_hourly: int = 0
+    keep_daily: int = 0
+    keep_weekly: int = 0
+    keep_monthly: int = 0
+    max_total_bytes: Optional[int] = None
+    
+    @property
+    def is_empty(self) -> bool:
+        """Indica si no hay ninguna regla (no se borra nada)"""
+        return not (self.keep_last or self.keep_hourly or self.keep_daily or self.keep_weekly
+                    or self.keep_monthly or self.max_total_bytes)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario para JSON"""
+        return {
+            "keep_last": self.keep_last,
+            "keep_hourly": self.keep_hourly,
+            "keep_daily": self.keep_daily,
+            "keep_weekly": self.keep_weekly,
+            "keep_monthly": self.keep_monthly,
+            "max_total_bytes": self.max_total_bytes
+        }
+
+
+@dataclass
+class RetentionPlan:
+    """Resultado de aplicar una RetentionPolicy: qué se conserva (y por qué) y qué se borra"""
+    keep: Dict[str, List[str]] = field(default_factory=dict)
+    delete: List[str] = field(default_factory=list)
+    freed_bytes: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario para JSON"""
+        return {"keep": self.keep, "delete": self.delete, "freed_bytes": self.freed_bytes}
+
+
+@dataclass
+class BackupScope:
+    """
+    Qué parte del directorio de Brave respalda un backup
+    
+    Sin perfiles se respalda todo el directorio; con perfiles, solo esas
+    carpetas y (si local_state) el archivo Local State, que tiene la lista
+    de perfiles y sus nombres. exclude_caches omite las cachés regenerables
+    (ver ExclusionRules.CACHE_PATTERNS) y exclude agrega patrones estilo
+    .gitignore propios.
+    """
+    profiles: List[str] = field(default_factory=list)
+    local_state: bool = True
+    exclude_caches: bool = True
+    exclude: List[str] = field(default_factory=list)
+    
+    @property
+    def is_default(self) -> bool:
+        """Indica si es el alcance de un backup común (directorio completo sin cachés)"""
+        return not self.profiles and self.exclude_caches and not self.exclude
+    
+    @property
+    def top_level(self) -> List[str]:
+        """Entradas de la raíz que incluye (vacío si no se limita a perfiles)"""
+        if not self.profiles:
+            return []
+        return self.profiles + (["Local State"] if self.local_state else [])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario para JSON"""
+        return {"profiles": self.profiles, "local_state": self.local_state,
+                "exclude_caches": self.exclude_caches, "exclude": self.exclude}
+    
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'BackupScope':
+        """Crea desde diccionario (None es el alcance por defecto)"""
+        data = data or {}
+        return cls(
+            profiles=list(data.get("profiles", [])),
+            local_state=data.get("local_state", True),
+            exclude_caches=data.get("exclude_caches", True),
+            exclude=list(data.get("exclude", []))
+        )
@@ -0,0 +1,330 @@
+"""
+Backups como archivo tar comprimido con índice de acceso aleatorio
+"""
+import io
+import lzma
+import os
+import tarfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from storage.copy_engine import CopyEngine, CopyProgress, CopyStats
+from storage.exclusion_rules import ExclusionRules
+from utils.json_backend import JsonBackend
+from utils.tracing import Tracer
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional: sin él se usa xz de la biblioteca estándar
+    zstandard = None
+
+
+class _XzCodec:
+    """Compresión xz (lzma de la biblioteca estándar)"""
+    name = "xz"
+    extension = "tar.xz"
+    
+    def __init__(self, level: int = 1):
+        self.level = level
+    
+    def compressor(self):
+        return lzma.LZMACompressor(format=lzma.FORMAT_XZ, preset=self.level)
+    
+    def reader(self, raw):
+        return lzma.LZMAFile(raw)
+
+
+class _ZstdCodec:
+    """Compresión zstd (requiere el paquete zstandard)"""
+    name = "zstd"
+    extension = "tar.zst"
+    
+    def __init__(self, level: int = 3):
+        self.level = level
+    
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+    
+    def reader(self, raw):
+        return zstandard.ZstdDecompressor().stream_reader(raw)
+
+
+class _FrameWriter(io.RawIOBase):
+    """
+    Destino del tar que comprime en frames independientes
+    
+    tarfile escribe a través de este objeto sin saber nada de la compresión;
+    al cerrar un frame se termina el stream comprimido actual y se anota su
+    posición en el archivo. La concatenación de frames sigue siendo un
+    .tar.xz / .tar.zst válido para las herramientas estándar.
+    """
+    
+    def __init__(self, out, codec):
+        self._out = out
+        self._codec = codec
+        self._compressor = codec.compressor()
+        self._position = 0
+        self._frame_start = 0
+        self._frame_offset = 0
+        self.frames: List[List[int]] = []
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._out.write(self._compressor.compress(bytes(data)))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    @property
+    def frame_size(self) -> int:
+        """Bytes sin comprimir del frame en curso"""
+        return self._position - self._frame_start
+    
+    def end_frame(self):
+        """Cierra el frame en curso (si tiene datos) y empieza uno nuevo"""
+        if self.frame_size == 0:
+            return
+        self._out.write(self._compressor.flush())
+        end = self._out.tell()
+        self.frames.append([self._frame_offset, end - self._frame_offset])
+        self._frame_offset = end
+        self._frame_start = self._position
+        self._compressor = self._codec.compressor()
+
+
+class _SliceReader(io.RawIOBase):
+    """Lee solo un rango de bytes de un archivo"""
+    
+    def __init__(self, f, offset: int, length: int):
+        self._f = f
+        self._f.seek(offset)
+        self._remaining = length
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        n = self._f.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+
+
+class _ExactReader:
+    """Entrega exactamente size bytes (rellena con ceros si el archivo se achicó al leerlo)"""
+    
+    def __init__(self, f, size: int):
+        self._f = f
+        self._remaining = size
+    
+    def read(self, n: int = -1) -> bytes:
+        if n < 0 or n > self._remaining:
+            n = self._remaining
+        data = self._f.read(n)
+        if len(data) < n:
+            data += b"\0" * (n - len(data))
+        self._remaining -= len(data)
+        return data
+
+
+class ArchiveStore:
+    """
+    Escribe y lee backups en formato tar comprimido en un solo paso.
+    
+    El tar se comprime en frames de ~FRAME_SIZE bytes que nunca cortan un
+    archivo ni mezclan dos carpetas de la raíz (perfiles). El índice
+    archive_index.json guarda la posición de cada frame y en qué frame está
+    cada archivo, así restaurar un perfil o un archivo solo descomprime sus
+    frames.
+    """
+    
+    ARCHIVE_BASENAME = "archive"
+    INDEX_FILENAME = "archive_index.json"
+    FRAME_SIZE = 4 * 1024 * 1024
+    
+    @staticmethod
+    def get_codec(name: Optional[str] = None):
+        """
+        Obtiene el codec de compresión
+        
+        Args:
+            name: "zstd" o "xz"; por defecto zstd si está instalado, si no xz
+        
+        Returns:
+            Codec a usar
+        """
+        if name == "zstd" or (name is None and zstandard is not None):
+            if zstandard is None:
+                raise RuntimeError("zstd requiere el paquete 'zstandard' (pip install zstandard)")
+            return _ZstdCodec()
+        return _XzCodec()
+    
+    @staticmethod
+    def is_archive(backup_path: Path) -> bool:
+        """Indica si el backup está en formato archivo comprimido"""
+        return (backup_path / ArchiveStore.INDEX_FILENAME).exists()
+    
+    @staticmethod
+    def load_index(backup_path: Path) -> dict:
+        """Lee el índice de un backup comprimido"""
+        return JsonBackend.load(backup_path / ArchiveStore.INDEX_FILENAME)
+    
+    @staticmethod
+    @Tracer.traced("write_archive")
+    def write_archive(src: Path, backup_path: Path, codec_name: Optional[str] = None,
+                      exclude: Optional[ExclusionRules] = None, show_progress: bool = True) -> CopyStats:
+        """
+        Escribe un árbol como tar comprimido, sin copias intermedias en disco
+        
+        Args:
+            src: Directorio a respaldar
+            backup_path: Carpeta del backup (se crea si no existe)
+            codec_name: "zstd" o "xz" (por defecto el mejor disponible)
+            exclude: Reglas de exclusión (por defecto ExclusionRules.volatile())
+            show_progress: Mostrar progreso en bytes/seg
+        
+        Returns:
+            CopyStats de lo archivado
+        """
+        codec = ArchiveStore.get_codec(codec_name)
+        backup_path.mkdir(parents=True, exist_ok=True)
+        archive_file = backup_path / f"{ArchiveStore.ARCHIVE_BASENAME}.{codec.extension}"
+        stats = CopyStats()
+        progress = CopyProgress(show_progress)
+        files: Dict[str, int] = {}
+        started = time.monotonic()
+        current_top = None
+        
+        def record_error(rel: str, e: Exception):
+            stats.errors.append(f"{rel}: {e}")
+        
+        with open(archive_file, 'wb') as out:
+            writer = _FrameWriter(out, codec)
+            tar = tarfile.open(fileobj=writer, mode='w', format=tarfile.PAX_FORMAT)
+            
+            for kind, path, rel in CopyEngine.walk_tree(src, exclude, on_error=record_error):
+                CopyEngine.check_cancelled()
+                if not rel:
+                    continue
+                arcname = Path(rel).as_posix()
+                
+                # Un frame nunca mezcla dos carpetas de la raíz ni supera FRAME_SIZE
+                # (los archivos sueltos de la raíz, como Local State, van juntos)
+                top = arcname.split("/", 1)[0] if kind == "dir" or "/" in arcname else ""
+                if top != current_top or writer.frame_size >= ArchiveStore.FRAME_SIZE:
+                    writer.end_frame()
+                    current_top = top
+                
+                try:
+                    if kind == "file":
+                        with open(path, 'rb') as f:
+                            tarinfo = tar.gettarinfo(arcname=arcname, fileobj=f)
+                            tar.addfile(tarinfo, _ExactReader(f, tarinfo.size))
+                        files[arcname] = len(writer.frames)
+                        progress.add(tarinfo.size)
+                    else:
+                        tar.addfile(tar.gettarinfo(path, arcname=arcname))
+                except OSError as e:
+                    record_error(rel, e)
+            
+            tar.close()
+            writer.end_frame()
+        
+        index = {
+            "version": 1,
+            "codec": codec.name,
+            "archive": archive_file.name,
+            "frames": writer.frames,
+            "files": files
+        }
+        tmp_index = backup_path / f"{ArchiveStore.INDEX_FILENAME}.tmp"
+        JsonBackend.dump(index, tmp_index, compact=True)
+        os.replace(tmp_index, backup_path / ArchiveStore.INDEX_FILENAME)
+        
+        progress.finish()
+        stats.files = progress.files
+        stats.bytes = progress.bytes
+        stats.elapsed = time.monotonic() - started
+        Tracer.count("files", stats.files)
+        Tracer.count("bytes", stats.bytes)
+        return stats
+    
+    @staticmethod
+    @Tracer.traced("extract_archive")
+    def extract(backup_path: Path, target: Path, only: Optional[str] = None,
+                show_progress: bool = True) -> CopyStats:
+        """
+        Extrae un backup comprimido, descomprimiendo solo los frames necesarios
+        
+        Args:
+            backup_path: Carpeta del backup
+            target: Directorio destino (se crea si no existe)
+            only: Ruta relativa de un archivo o carpeta (ej. "Default"); None extrae todo
+            show_progress: Mostrar progreso en bytes/seg
+        
+        Returns:
+            CopyStats de lo extraído
+        """
+        index = ArchiveStore.load_index(backup_path)
+        codec = ArchiveStore.get_codec(index["codec"])
+        frames = index["frames"]
+        stats = CopyStats()
+        progress = CopyProgress(show_progress)
+        started = time.monotonic()
+        prefix = Path(only).as_posix().rstrip("/") if only else None
+        
+        def wanted(name: str) -> bool:
+            return prefix is None or name == prefix or name.startswith(prefix + "/")
+        
+        if prefix is None:
+            frame_ids = range(len(frames))
+        else:
+            frame_ids = sorted({frame for name, frame in index["files"].items() if wanted(name)})
+            if not frame_ids:
+                # Carpetas vacías o enlaces: buscar en los frames de su carpeta de la raíz
+                frame_ids = range(len(frames))
+        
+        extract_kwargs = {"filter": "tar"} if hasattr(tarfile, "data_filter") else {}
+        target.mkdir(parents=True, exist_ok=True)
+        directories = []
+        
+        with open(backup_path / index["archive"], 'rb') as archive:
+            for frame_id in frame_ids:
+                offset, length = frames[frame_id]
+                stream = codec.reader(_SliceReader(archive, offset, length))
+                with tarfile.open(fileobj=stream, mode='r|') as tar:
+                    for member in tar:
+                        CopyEngine.check_cancelled()
+                        if not wanted(member.name):
+                            continue
+                        try:
+                            if member.isdir():
+                                directories.append(member)
+                                (target / member.name).mkdir(parents=True, exist_ok=True)
+                                continue
+                            tar.extract(member, target, **extract_kwargs)
+                            if member.isfile():
+                                progress.add(member.size)
+                        except (OSError, tarfile.TarError) as e:
+                            stats.errors.append(f"{member.name}: {e}")
+        
+        # Fechas de carpetas al final (extraer archivos dentro las modifica)
+        for member in reversed(directories):
+            try:
+                os.utime(target / member.name, (member.mtime, member.mtime))
+            except OSError:
+                pass
+        
+        progress.finish()
+        stats.files = progress.files
+        stats.bytes = progress.bytes
+        stats.elapsed = time.monotonic() - started
+        Tracer.count("files", stats.files)
+        Tracer.count("bytes", stats.bytes)
+        return stats
\ No newline at end of file
@@ -2,17 +2,34 @@
 Gestión de backups de configuraciones de Brave
 """
 import datetime
-import platform
+import os
 import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from core.profile_handler import ProfileHandler
+from models.profile import BackupManifest, BackupScope
+from storage.archive_store import ArchiveStore
+from storage.catalog import Catalog
+from storage.copy_engine import CopyEngine, CopyProgress, CopyStats
+from storage.exclusion_rules import ExclusionRules
+from storage.object_store import ObjectStore
+from storage.restore_engine import RestoreEngine, RestoreIncomplete
+from utils.json_backend import JsonBackend
+from utils.tracing import Tracer
 
 
 class BackupManager:
     """Gestiona creación y restauración de backups"""
     
+    MANIFEST_FILENAME = "backup_manifest.json"
+    INFO_FILENAME = "backup_info.json"
+    OBJECTS_DIRNAME = "objects"
+    
     @staticmethod
     def get_backups_dir() -> Path:
         """Obtiene el directorio de backups"""
@@ -31,51 +48,50 @@ class BackupManager:
     
     @staticmethod
     def list_available_backups() -> List[Path]:
-        """Lista backups disponibles"""
-        backups_dir = BackupManager.get_backups_dir()
-        backups = []
-        
-        if backups_dir.exists():
-            for item in backups_dir.iterdir():
-                if item.is_dir() and item.name.startswith("brave_backup_"):
-                    backups.append(item)
-        
-        return sorted(backups, key=lambda x: x.stat().st_mtime, reverse=True)
+        """Lista backups disponibles (desde el catálogo, más recientes primero)"""
+        return Catalog.list_paths(Catalog.KIND_BACKUP)
     
     @staticmethod
     def list_saved_configurations() -> List[Path]:
-        """Lista configuraciones guardadas"""
-        saved = []
-        
-        # Buscar en saved_configs/
-        saved_dir = BackupManager.get_saved_configs_dir()
-        if saved_dir.exists():
-            for item in saved_dir.iterdir():
-                if item.is_dir() and any(f.suffix == '.json' for f in item.iterdir() if f.is_file()):
-                    saved.append(item)
-        
-        # Buscar en Linux/ (configs guardadas manualmente)
-        current_dir = Path.cwd()
-        linux_dir = current_dir / "Linux"
-        if linux_dir.exists():
-            for item in linux_dir.iterdir():
-                if item.is_dir():
-                    # Revisar si tiene archivos JSON
-                    has_json = any(f.suffix == '.json' for f in item.iterdir() if f.is_file())
-                    if has_json:
-                        saved.append(item)
-        
-        return sorted(saved, key=lambda x: x.stat().st_mtime, reverse=True)
+        """Lista configuraciones guardadas (desde el catálogo, más recientes primero)"""
+        return Catalog.list_paths(Catalog.KIND_SAVED)
     
     @staticmethod
-    def create_backup() -> Optional[Path]:
+    @Tracer.traced("create_backup")
+    def create_backup(incremental: bool = False, verify_hash: bool = False,
+                      archive: bool = False, codec: Optional[str] = None,
+                      brave_config: Optional[Path] = None,
+                      scope: Optional[BackupScope] = None) -> Optional[Path]:
         """
         Crea un backup completo con timestamp
         
+        El backup es un manifiesto que referencia blobs del almacén de objetos
+        en backup/objects/: los archivos que no cambiaron entre backups se
+        guardan una sola vez.
+        
+        En modo incremental se compara el árbol con el índice del backup
+        anterior (ruta, tamaño y mtime): los archivos sin cambios no se leen y
+        el manifiesto solo registra altas, modificaciones y borrados.
+        
+        Con un scope se respaldan solo algunos perfiles (más Local State) y/o
+        se omiten las cachés: es lo que conviene antes de tocar un perfil.
+        
+        Args:
+            incremental: Basarse en el último backup deduplicado del mismo origen
+            verify_hash: En modo incremental, hashear también los archivos con
+                         igual tamaño y mtime para detectar cambios invisibles
+            archive: Guardar como un único tar comprimido con índice (siempre completo)
+            codec: Compresión del archivo: "zstd" o "xz" (por defecto el mejor disponible)
+            brave_config: Directorio de Brave a respaldar (por defecto el del usuario actual)
+            scope: Perfiles a respaldar y si omitir cachés (por defecto todo el directorio)
+        
         Returns:
             Path al backup creado o None si hay error
         """
-        brave_config = ProfileHandler.get_brave_config_path()
+        brave_config = brave_config or ProfileHandler.get_brave_config_path()
+        if scope is not None and scope.is_default:
+            scope = None
+        exclude = ExclusionRules.for_backup(scope)
         
         if not brave_config.exists():
             print("❌ No existe configuración actual de Brave para hacer backup")
@@ -92,41 +108,544 @@ class BackupManager:
             print(f"❌ Ya existe un backup con el nombre: {backup_name}")
             return None
         
-        print(f"🔄 Creando backup: {backup_name}")
+        if archive:
+            if incremental:
+                print("⚠️ Los backups comprimidos son siempre completos, se ignora el modo incremental")
+            return BackupManager._create_archive_backup(brave_config, backup_path, codec, scope)
+        
+        # La retención toma el almacén en exclusiva: no borra la base ni los blobs que este backup reusa
+        with BackupManager.get_object_store().lock():
+            return BackupManager._create_manifest_backup(brave_config, backup_path, incremental, verify_hash,
+                                                         scope, exclude)
+    
+    @staticmethod
+    def _create_manifest_backup(brave_config: Path, backup_path: Path, incremental: bool, verify_hash: bool,
+                                scope: Optional[BackupScope], exclude: ExclusionRules) -> Optional[Path]:
+        """Crea un backup deduplicado (ver create_backup); se llama con el almacén bloqueado"""
+        backup_name = backup_path.name
+        # Índice del backup anterior para el modo incremental (del mismo alcance)
+        base_path = BackupManager.find_latest_manifest_backup(brave_config, scope) if incremental else None
+        previous_files = BackupManager.resolve_manifest(base_path).files if base_path else {}
+        
+        if base_path:
+            print(f"🔄 Creando backup incremental: {backup_name} (base: {base_path.name})")
+        else:
+            print(f"🔄 Creando backup: {backup_name}")
+        if scope:
+            print(f"   🎯 Alcance: {BackupManager._describe_scope(scope)}")
         
         try:
             backup_path.mkdir(exist_ok=True)
             
-            # Excluir archivos problemáticos
-            exclude_files = {
-                'SingletonLock', 'SingletonSocket', 'SingletonCookie',
-                '.org.chromium.*', '*.tmp', '*.lock'
-            }
-            
-            # Copiar archivos excluyendo problemáticos
-            for item in brave_config.iterdir():
-                if (item.name.startswith('.') or 
-                    item.name in exclude_files or
-                    'Singleton' in item.name or
-                    item.name.endswith('.tmp') or
-                    item.name.endswith('.lock')):
-                    continue
+            store = BackupManager.get_object_store()
+            manifest = BackupManifest.create(brave_config)
+            if base_path:
+                manifest.kind = "incremental"
+                manifest.base = base_path.name
+            manifest_lock = threading.Lock()
+            seen = set()
+            failed = []  # archivos o carpetas que no se pudieron leer
+            totals = {"stored": 0, "changed": 0, "size": 0}
+            
+            def add_dir(path: str, rel: str):
+                if rel:
+                    manifest.dirs.append(Path(rel).as_posix())
+            
+            def add_symlink(path: str, rel: str):
+                manifest.symlinks[Path(rel).as_posix()] = os.readlink(path)
+            
+            def add_file(path: str, rel: str) -> int:
+                rel = Path(rel).as_posix()
+                st = os.stat(path)
+                previous = previous_files.get(rel)
+                unchanged = (previous is not None and
+                             previous["size"] == st.st_size and
+                             previous["mtime_ns"] == st.st_mtime_ns)
                 
-                try:
-                    if item.is_file():
-                        shutil.copy2(item, backup_path / item.name)
-                    elif item.is_dir() and not item.name.startswith('.'):
-                        def ignore_files(dir, files):
-                            return [f for f in files if f.startswith('.') or 'Singleton' in f or f.endswith('.tmp')]
-                        
-                        shutil.copytree(item, backup_path / item.name, ignore=ignore_files)
-                except Exception as e:
-                    print(f"⚠️ No se pudo copiar {item.name}: {e}")
-                    continue
+                if unchanged and not verify_hash:
+                    with manifest_lock:
+                        seen.add(rel)
+                        totals["size"] += st.st_size
+                    return 0
+                
+                digest, is_new = store.put_file(path)
+                entry = {
+                    "digest": digest,
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "mode": stat.S_IMODE(st.st_mode)
+                }
+                with manifest_lock:
+                    seen.add(rel)
+                    totals["size"] += st.st_size
+                    if previous != entry:
+                        manifest.files[rel] = entry
+                        totals["changed"] += 1
+                    if is_new:
+                        totals["stored"] += st.st_size
+                return st.st_size
+            
+            # Hashear en paralelo excluyendo volátiles (Singleton*, *.tmp, *.lock, ocultos) y cachés
+            stats = CopyEngine.process_tree(brave_config, add_file, on_dir=add_dir, on_symlink=add_symlink,
+                                            exclude=exclude, on_error=lambda rel, e: failed.append(rel))
+            
+            for error in stats.errors:
+                print(f"⚠️ No se pudo copiar {error}")
+            
+            if base_path:
+                # Lo que no se pudo leer sigue existiendo: conserva la versión del backup base, no se borra
+                failed_rels = {Path(rel).as_posix() for rel in failed}
+                failed_prefixes = tuple(f"{rel}/" for rel in failed_rels)
+                manifest.deleted = sorted(rel for rel in previous_files
+                                          if rel not in seen and rel not in failed_rels
+                                          and not rel.startswith(failed_prefixes) and "." not in failed_rels)
+            
+            BackupManager.save_manifest(manifest, backup_path)
+            BackupManager.save_backup_info(backup_path, {
+                "kind": manifest.kind,
+                "base": manifest.base,
+                "created_at": manifest.created_at,
+                "source": manifest.source,
+                "files": len(seen),
+                "size": totals["size"],
+                "stored_bytes": totals["stored"],
+                **({"scope": scope.to_dict()} if scope else {})
+            })
+            
+            summary = f"{len(seen)} archivos, {totals['size'] / (1024 * 1024):.1f} MB"
+            if base_path:
+                summary += f", {totals['changed']} modificados, {len(manifest.deleted)} borrados"
+            summary += f", {totals['stored'] / (1024 * 1024):.1f} MB nuevos"
+            print(f"✅ Backup creado: {backup_name} ({summary}, "
+                  f"{stats.bytes_per_sec / (1024 * 1024):.1f} MB/s)")
+            Catalog.record(backup_path)
+            return backup_path
+            
+        except Exception as e:
+            print(f"❌ Error al crear backup: {e}")
+            shutil.rmtree(backup_path, ignore_errors=True)
+            return None
+    
+    @staticmethod
+    def _create_archive_backup(brave_config: Path, backup_path: Path, codec: Optional[str],
+                               scope: Optional[BackupScope] = None) -> Optional[Path]:
+        """Crea un backup como tar comprimido en streaming (ver ArchiveStore)"""
+        print(f"🔄 Creando backup comprimido: {backup_path.name}")
+        if scope:
+            print(f"   🎯 Alcance: {BackupManager._describe_scope(scope)}")
+        
+        try:
+            stats = ArchiveStore.write_archive(brave_config, backup_path, codec,
+                                               exclude=ExclusionRules.for_backup(scope))
             
-            print(f"✅ Backup creado: {backup_name}")
+            for error in stats.errors:
+                print(f"⚠️ No se pudo copiar {error}")
+            
+            index = ArchiveStore.load_index(backup_path)
+            compressed = (backup_path / index["archive"]).stat().st_size
+            BackupManager.save_backup_info(backup_path, {
+                "kind": "archive",
+                "base": None,
+                "created_at": datetime.datetime.now().isoformat(),
+                "source": str(brave_config),
+                "files": stats.files,
+                "size": stats.bytes,
+                "stored_bytes": compressed,
+                "codec": index["codec"],
+                **({"scope": scope.to_dict()} if scope else {})
+            })
+            
+            ratio = compressed / stats.bytes * 100 if stats.bytes else 0
+            print(f"✅ Backup creado: {backup_path.name} ({stats.files} archivos, {stats.mb:.1f} MB → "
+                  f"{compressed / (1024 * 1024):.1f} MB {index['codec']} ({ratio:.0f}%), "
+                  f"{stats.bytes_per_sec / (1024 * 1024):.1f} MB/s)")
+            Catalog.record(backup_path)
             return backup_path
             
         except Exception as e:
             print(f"❌ Error al crear backup: {e}")
-            return None
\ No newline at end of file
+            shutil.rmtree(backup_path, ignore_errors=True)
+            return None
+    
+    @staticmethod
+    def _describe_scope(scope: BackupScope) -> str:
+        parts = [", ".join(scope.top_level) if scope.profiles else "directorio completo"]
+        parts.append("sin cachés" if scope.exclude_caches else "con cachés")
+        if scope.exclude:
+            parts.append(f"excluye {', '.join(scope.exclude)}")
+        return " · ".join(parts)
+    
+    @staticmethod
+    def get_scope(backup_path: Path) -> Optional[BackupScope]:
+        """
+        Obtiene el alcance de un backup
+        
+        Args:
+            backup_path: Carpeta del backup
+        
+        Returns:
+            BackupScope, o None si respalda todo el directorio
+        """
+        info = BackupManager.load_backup_info(backup_path) or {}
+        return BackupScope.from_dict(info["scope"]) if info.get("scope") else None
+    
+    @staticmethod
+    def _find_latest(source: Path, matches: Callable[[dict], bool]) -> Optional[Path]:
+        """
+        Busca el backup más reciente de un origen cuyos metadatos cumplan matches
+        
+        En un repo compartido hay backups de otras máquinas o usuarios: solo
+        se consideran los que registran source; los clásicos no lo tienen.
+        """
+        for backup in BackupManager.list_available_backups():
+            info = BackupManager.load_backup_info(backup)
+            if info and info.get("source") == str(source) and matches(info):
+                return backup
+        return None
+    
+    @staticmethod
+    def find_latest_manifest_backup(source: Path, scope: Optional[BackupScope] = None) -> Optional[Path]:
+        """
+        Busca el backup deduplicado más reciente de un origen
+        
+        Args:
+            source: Directorio de Brave respaldado
+            scope: Alcance que debe tener (None: directorio completo)
+        
+        Returns:
+            Path al backup o None si no hay ninguno
+        """
+        wanted_scope = scope.to_dict() if scope else None
+        return BackupManager._find_latest(
+            source, lambda info: info.get("kind") != "archive" and info.get("scope") == wanted_scope)
+    
+    @staticmethod
+    def find_latest_backup(source: Path) -> Optional[Path]:
+        """
+        Busca el backup completo más reciente de un origen (de cualquier tipo)
+        
+        Los que respaldan solo algunos perfiles no cuentan: no son una copia
+        del directorio completo.
+        
+        Args:
+            source: Directorio de Brave respaldado
+        
+        Returns:
+            Path al backup o None si no hay ninguno
+        """
+        return BackupManager._find_latest(source, lambda info: not (info.get("scope") or {}).get("profiles"))
+    
+    @staticmethod
+    def load_backup_info(backup_path: Path) -> Optional[dict]:
+        """
+        Lee los metadatos resumidos de un backup (sin abrir el manifiesto)
+        
+        Args:
+            backup_path: Carpeta del backup
+        
+        Returns:
+            Diccionario con kind, base, created_at, source, files, size y
+            stored_bytes; None si es un backup clásico
+        """
+        info_file = backup_path / BackupManager.INFO_FILENAME
+        if not info_file.exists():
+            return None
+        
+        try:
+            return JsonBackend.load(info_file)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def save_backup_info(backup_path: Path, info: dict):
+        """Escribe los metadatos resumidos de un backup"""
+        JsonBackend.dump(info, backup_path / BackupManager.INFO_FILENAME)
+    
+    @staticmethod
+    def get_backup_chain(backup_path: Path) -> List[Path]:
+        """
+        Obtiene la cadena de backups de los que depende uno incremental
+        
+        Lanza ValueError si la cadena es circular y FileNotFoundError si
+        falta algún backup base.
+        
+        Args:
+            backup_path: Carpeta del backup
+        
+        Returns:
+            Lista desde el backup completo de base hasta backup_path inclusive
+        """
+        chain = [backup_path]
+        current = backup_path
+        while True:
+            info = BackupManager.load_backup_info(current)
+            if not info or not info.get("base"):
+                break
+            current = backup_path.parent / info["base"]
+            if current in chain:
+                raise ValueError(f"Cadena de backups circular en {backup_path.name}")
+            if not current.exists():
+                raise FileNotFoundError(f"Falta el backup base {current.name}")
+            chain.append(current)
+        return list(reversed(chain))
+    
+    @staticmethod
+    def describe_backup(backup_path: Path) -> str:
+        """
+        Descripción corta del tipo de backup para los listados
+        
+        Args:
+            backup_path: Carpeta del backup
+        
+        Returns:
+            Texto como "incremental ← brave_backup_X (cadena de 3)" o "" si es completo
+        """
+        info = BackupManager.load_backup_info(backup_path)
+        if not info or not info.get("base"):
+            return ""
+        try:
+            chain = BackupManager.get_backup_chain(backup_path)
+        except (OSError, ValueError):
+            # Un backup_info.json dañado no debe romper el listado entero
+            return f"incremental ← {info['base']} (cadena rota)"
+        return f"incremental ← {info['base']} (cadena de {len(chain)})"
+    
+    @staticmethod
+    def resolve_manifest(backup_path: Path) -> Optional[BackupManifest]:
+        """
+        Obtiene el manifiesto completo de un backup, aplicando su cadena
+        
+        Args:
+            backup_path: Carpeta del backup
+        
+        Returns:
+            BackupManifest completo (kind="full"), o None si es un backup clásico
+        """
+        resolved = None
+        for link in BackupManager.get_backup_chain(backup_path):
+            manifest = BackupManager.load_manifest(link)
+            if manifest is None:
+                if link != backup_path:
+                    raise FileNotFoundError(f"Falta el backup base {link.name}")
+                return None
+            
+            if resolved is None or not manifest.is_incremental:
+                resolved = manifest
+                continue
+            
+            for rel in manifest.deleted:
+                resolved.files.pop(rel, None)
+            resolved.files.update(manifest.files)
+            resolved.dirs = manifest.dirs
+            resolved.symlinks = manifest.symlinks
+            resolved.created_at = manifest.created_at
+        
+        resolved.kind = "full"
+        resolved.base = None
+        resolved.deleted = []
+        return resolved
+    
+    @staticmethod
+    def get_object_store() -> ObjectStore:
+        """Obtiene el almacén de objetos compartido por los backups deduplicados"""
+        return ObjectStore(BackupManager.get_backups_dir() / BackupManager.OBJECTS_DIRNAME)
+    
+    @staticmethod
+    def load_manifest(backup_path: Path) -> Optional[BackupManifest]:
+        """
+        Lee el manifiesto de un backup
+        
+        Args:
+            backup_path: Carpeta del backup
+        
+        Returns:
+            BackupManifest, o None si es un backup clásico (copia completa)
+        """
+        manifest_file = backup_path / BackupManager.MANIFEST_FILENAME
+        if not manifest_file.exists():
+            return None
+        
+        return BackupManifest.from_dict(JsonBackend.load(manifest_file))
+    
+    @staticmethod
+    def save_manifest(manifest: BackupManifest, backup_path: Path):
+        """Escribe el manifiesto de un backup de forma atómica"""
+        manifest_file = backup_path / BackupManager.MANIFEST_FILENAME
+        tmp_file = manifest_file.with_suffix(".tmp")
+        JsonBackend.dump(manifest.to_dict(), tmp_file, compact=True)
+        os.replace(tmp_file, manifest_file)
+    
+    @staticmethod
+    @Tracer.traced("materialize_backup")
+    def materialize_backup(backup_path: Path, target: Path, allow_hardlink: bool = False,
+                           only: Optional[str] = None) -> CopyStats:
+        """
+        Reconstruye el contenido de un backup en target
+        
+        Los backups deduplicados se arman desde el almacén de objetos
+        (reflink si el sistema de archivos lo permite, hardlink si se habilita,
+        o copia); los incrementales se resuelven antes contra su cadena de
+        bases. Los comprimidos descomprimen solo los frames necesarios. Los
+        backups clásicos se copian tal cual.
+        
+        Args:
+            backup_path: Carpeta del backup
+            target: Directorio destino (se crea si no existe)
+            allow_hardlink: Permitir hardlinks a los blobs. Solo para destinos que
+                nadie va a modificar: escribir en un hardlink cambia el blob
+                (los blobs son de solo lectura, pero root igual puede escribirlos)
+            only: Restaurar solo esta ruta relativa (un perfil o un archivo)
+        
+        Returns:
+            CopyStats de la reconstrucción
+        """
+        prefix = Path(only).as_posix().rstrip("/") if only else None
+        
+        def wanted(rel: str) -> bool:
+            return prefix is None or rel == prefix or rel.startswith(prefix + "/")
+        
+        if ArchiveStore.is_archive(backup_path):
+            return ArchiveStore.extract(backup_path, target, only)
+        
+        manifest = BackupManager.resolve_manifest(backup_path)
+        if manifest is None:
+            source = backup_path / prefix if prefix else backup_path
+            if source.is_file():
+                (target / prefix).parent.mkdir(parents=True, exist_ok=True)
+                size = CopyEngine.copy_file(str(source), str(target / prefix))
+                return CopyStats(files=1, bytes=size)
+            destination = target / prefix if prefix else target
+            return CopyEngine.copy_tree(source, destination, exclude=ExclusionRules.none(),
+                                        clone=True, allow_hardlink=allow_hardlink)
+        
+        if prefix:
+            manifest.files = {rel: entry for rel, entry in manifest.files.items() if wanted(rel)}
+            manifest.dirs = [rel for rel in manifest.dirs if wanted(rel)]
+            manifest.symlinks = {rel: link for rel, link in manifest.symlinks.items() if wanted(rel)}
+        
+        store = BackupManager.get_object_store()
+        stats = CopyStats()
+        progress = CopyProgress()
+        started = time.monotonic()
+        
+        target.mkdir(parents=True, exist_ok=True)
+        for rel in sorted(manifest.dirs):
+            (target / rel).mkdir(parents=True, exist_ok=True)
+        for rel in manifest.files:
+            (target / rel).parent.mkdir(parents=True, exist_ok=True)
+        
+        for rel, link_target in manifest.symlinks.items():
+            try:
+                os.symlink(link_target, target / rel)
+            except OSError as e:
+                stats.errors.append(f"{rel}: {e}")
+        
+        cancel = CopyEngine.cancel_event()
+        
+        def export_one(rel: str, entry: dict):
+            if cancel is not None and cancel.is_set():
+                return
+            dst = str(target / rel)
+            try:
+                method = store.export(entry["digest"], dst, allow_hardlink)
+                if method != "hardlink":
+                    os.chmod(dst, entry["mode"])
+                    os.utime(dst, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                progress.add(entry["size"])
+            except Exception as e:
+                stats.errors.append(f"{rel}: {e}")
+        
+        export = Tracer.bind(export_one)
+        with ThreadPoolExecutor(max_workers=CopyEngine.default_workers()) as pool:
+            for rel, entry in manifest.files.items():
+                pool.submit(export, rel, entry)
+        
+        progress.finish()
+        CopyEngine.check_cancelled(cancel)
+        stats.files = progress.files
+        stats.bytes = progress.bytes
+        stats.elapsed = time.monotonic() - started
+        Tracer.count("files", stats.files)
+        Tracer.count("bytes", stats.bytes)
+        return stats
+    
+    @staticmethod
+    @Tracer.traced("restore_backup")
+    def restore_backup(backup_path: Path, target: Path, allow_partial: bool = False) -> CopyStats:
+        """
+        Reemplaza target por el contenido de un backup de forma atómica
+        
+        El backup se reconstruye en un staging hermano de target y se
+        intercambia de una vez (ver RestoreEngine): si algo falla a mitad de
+        camino, target queda como estaba.
+        
+        Un backup de algunos perfiles reemplaza solo esas carpetas (y Local
+        State): el resto de target no se toca. Nunca se usan hardlinks al
+        almacén: Brave escribe en target, y escribir en un hardlink corrompe
+        el blob (o, sin permisos de root, deja el perfil de solo lectura).
+        
+        Args:
+            backup_path: Carpeta del backup
+            target: Directorio a reemplazar
+            allow_partial: Reemplazar aunque falten archivos (por defecto se lanza
+                RestoreIncomplete y target no se toca)
+        
+        Returns:
+            CopyStats de la reconstrucción
+        """
+        scope = BackupManager.get_scope(backup_path)
+        if scope and scope.profiles:
+            return BackupManager._restore_scoped(backup_path, target, scope, allow_partial)
+        
+        return RestoreEngine.swap_in(
+            target, lambda staging: BackupManager.materialize_backup(backup_path, staging), allow_partial
+        )
+    
+    @staticmethod
+    def _restore_scoped(backup_path: Path, target: Path, scope: BackupScope,
+                        allow_partial: bool = False) -> CopyStats:
+        """Restaura un backup de algunos perfiles intercambiando solo esas carpetas"""
+        target.mkdir(parents=True, exist_ok=True)
+        # Dentro de target: mismo sistema de archivos, así cada perfil entra con un rename
+        staging_root = target / f".{backup_path.name}{RestoreEngine.STAGING_MARKER}{os.getpid()}"
+        shutil.rmtree(staging_root, ignore_errors=True)
+        
+        try:
+            stats = BackupManager.materialize_backup(backup_path, staging_root)
+            if stats.errors and not allow_partial:
+                raise RestoreIncomplete(stats)
+            for name in scope.profiles:
+                prepared = staging_root / name
+                if not prepared.is_dir():
+                    print(f"⚠️ El backup no tiene el perfil {name}, se deja como está")
+                    continue
+                RestoreEngine.swap_in(target / name, lambda staging, prepared=prepared: os.rename(prepared, staging))
+            if scope.local_state and (staging_root / "Local State").is_file():
+                os.replace(staging_root / "Local State", target / "Local State")
+        finally:
+            shutil.rmtree(staging_root, ignore_errors=True)
+        return stats
+    
+    @staticmethod
+    @Tracer.traced("restore_directory")
+    def restore_directory(source: Path, target: Path, allow_partial: bool = False) -> CopyStats:
+        """
+        Reemplaza target por una copia de source de forma atómica
+        
+        Los archivos se clonan con reflink cuando el sistema de archivos lo
+        permite; nunca con hardlinks, para que editar uno no modifique el otro.
+        Los archivos de bloqueo y temporales de source no se copian.
+        
+        Args:
+            source: Directorio a copiar (configuración guardada)
+            target: Directorio a reemplazar
+            allow_partial: Reemplazar aunque algún archivo no se haya podido copiar
+        
+        Returns:
+            CopyStats de la copia
+        """
+        return RestoreEngine.swap_in(
+            target, lambda staging: CopyEngine.copy_tree(source, staging, exclude=ExclusionRules.volatile(),
+                                                         clone=True),
+            allow_partial
+        )
\ No newline at end of file
@@ -0,0 +1,570 @@
+"""
+Catálogo persistente de configuraciones guardadas y backups
+"""
+import datetime
+import fnmatch
+import hashlib
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from core.diff_engine import DiffEngine
+from utils.json_backend import JsonBackend
+from utils.system_utils import SystemUtils
+from utils.tracing import Tracer
+
+
+class Catalog:
+    """
+    Índice SQLite de snapshots (configuraciones guardadas y backups).
+    
+    Cada snapshot se registra con su tipo, fecha, perfiles, tamaño y hash de
+    contenido cuando la herramienta lo escribe. Para lo que cambie por fuera
+    (carpetas copiadas o borradas a mano) se guarda el mtime de cada carpeta
+    raíz (saved_configs/, Linux/, backup/): si no cambió, listar es una sola
+    consulta; si cambió, se relista solo esa raíz y se describen solo las
+    entradas nuevas o modificadas.
+    
+    Los cambios dentro de una entrada ya catalogada que no pasen por la
+    herramienta se ven recién cuando cambie su carpeta raíz. Si la base no
+    se puede usar (bloqueada o dañada), los listados y búsquedas recorren
+    las carpetas raíz como antes de existir el catálogo.
+    
+    De las configuraciones guardadas se indexan además todas sus rutas de
+    claves (ej. "brave.shields.stats"). Como guardar varias veces el mismo
+    perfil repite casi siempre el mismo conjunto de rutas, cada conjunto
+    distinto se guarda una sola vez (keysets) y los snapshots lo referencian:
+    buscar por clave es un lookup por índice, sin abrir ningún JSON.
+    """
+    
+    DB_FILENAME = "catalog.sqlite3"
+    SCHEMA_VERSION = 3
+    
+    KIND_SAVED = "saved"
+    KIND_BACKUP = "backup"
+    
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            root TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL DEFAULT 0,
+            stored_bytes INTEGER NOT NULL DEFAULT 0,
+            content_hash TEXT,
+            backup_kind TEXT,
+            base TEXT,
+            keyset_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_snapshots_kind_mtime ON snapshots (kind, mtime_ns DESC);
+        CREATE INDEX IF NOT EXISTS idx_snapshots_kind_created ON snapshots (kind, created_at);
+        CREATE INDEX IF NOT EXISTS idx_snapshots_kind_size ON snapshots (kind, size);
+        CREATE INDEX IF NOT EXISTS idx_snapshots_root ON snapshots (root);
+        CREATE INDEX IF NOT EXISTS idx_snapshots_keyset ON snapshots (keyset_id);
+        CREATE TABLE IF NOT EXISTS snapshot_profiles (
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+            profile TEXT NOT NULL,
+            PRIMARY KEY (snapshot_id, profile)
+        );
+        CREATE INDEX IF NOT EXISTS idx_snapshot_profiles_profile ON snapshot_profiles (profile);
+        CREATE TABLE IF NOT EXISTS key_paths (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS keysets (
+            id INTEGER PRIMARY KEY,
+            digest TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS keyset_paths (
+            key_id INTEGER NOT NULL,
+            keyset_id INTEGER NOT NULL,
+            PRIMARY KEY (key_id, keyset_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_keyset_paths_keyset ON keyset_paths (keyset_id);
+        CREATE TABLE IF NOT EXISTS roots (
+            root TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL
+        );
+    """
+    
+    _TABLES = ("snapshot_profiles", "snapshots", "keyset_paths", "keysets", "key_paths", "roots")
+    
+    @staticmethod
+    def get_db_path() -> Path:
+        """Obtiene la ruta de la base del catálogo"""
+        return SystemUtils.get_cache_dir() / Catalog.DB_FILENAME
+    
+    @staticmethod
+    @contextmanager
+    def _connect() -> Iterator[sqlite3.Connection]:
+        """Abre la base (creando el esquema si hace falta) dentro de una transacción"""
+        with closing(sqlite3.connect(Catalog.get_db_path(), timeout=30)) as db:
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA foreign_keys = ON")
+            db.execute("PRAGMA journal_mode = WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != Catalog.SCHEMA_VERSION:
+                # Es solo un índice: ante un esquema viejo se descarta y se reconstruye
+                for table in Catalog._TABLES:
+                    db.execute(f"DROP TABLE IF EXISTS {table}")
+                db.executescript(Catalog._SCHEMA)
+                db.execute(f"PRAGMA user_version = {Catalog.SCHEMA_VERSION}")
+            with db:
+                yield db
+    
+    @staticmethod
+    def _roots() -> Dict[str, str]:
+        """Carpetas raíz que se catalogan: {ruta: tipo}"""
+        from storage.backup_manager import BackupManager
+        
+        return {
+            str(BackupManager.get_saved_configs_dir()): Catalog.KIND_SAVED,
+            str(Path.cwd() / "Linux"): Catalog.KIND_SAVED,
+            str(BackupManager.get_backups_dir()): Catalog.KIND_BACKUP
+        }
+    
+    @staticmethod
+    def _is_snapshot(path: Path, kind: str) -> bool:
+        """Mismo criterio que usaban los listados: backups brave_backup_*, guardados con algún JSON"""
+        if not path.is_dir():
+            return False
+        if kind == Catalog.KIND_BACKUP:
+            return path.name.startswith("brave_backup_")
+        return any(f.suffix == '.json' for f in path.iterdir() if f.is_file())
+    
+    @staticmethod
+    def _timestamp_from_name(name: str) -> Optional[float]:
+        """Fecha del sufijo _AAAAMMDD_HHMMSS que usan todas las carpetas generadas"""
+        try:
+            return datetime.datetime.strptime(name[-15:], "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _json_key_paths(data: bytes) -> Iterable[str]:
+        """Rutas de claves de un JSON guardado, en la estructura de Preferences"""
+        try:
+            value = JsonBackend.loads(data)
+        except ValueError:
+            return ()
+        if not isinstance(value, dict):
+            return ()
+        if "brave_settings" in value:
+            value = DiffEngine.config_view(value)
+        return DiffEngine.key_paths(value)
+    
+    @staticmethod
+    def _describe_saved(path: Path) -> dict:
+        digest = hashlib.sha256()
+        size = 0
+        profiles = []
+        key_paths = set()
+        for item in sorted(path.iterdir()):
+            if item.is_file() and item.suffix == '.json':
+                data = item.read_bytes()
+                size += len(data)
+                digest.update(item.name.encode('utf-8') + b"\0" + hashlib.sha256(data).digest())
+                profiles.append(item.stem)
+                key_paths.update(Catalog._json_key_paths(data))
+        return {"size": size, "stored_bytes": size, "content_hash": digest.hexdigest(), "profiles": profiles,
+                "created_at": None, "backup_kind": None, "base": None, "key_paths": key_paths}
+    
+    @staticmethod
+    def _describe_backup(path: Path) -> dict:
+        from core.profile_handler import ProfileHandler
+        from storage.archive_store import ArchiveStore
+        from storage.backup_manager import BackupManager
+        
+        info = BackupManager.load_backup_info(path) or {}
+        content_hash = None
+        top_level: List[str] = []
+        
+        for meta_file in (BackupManager.MANIFEST_FILENAME, ArchiveStore.INDEX_FILENAME):
+            if (path / meta_file).exists():
+                content_hash = hashlib.sha256((path / meta_file).read_bytes()).hexdigest()
+                break
+        
+        if ArchiveStore.is_archive(path):
+            top_level = [name.split("/", 1)[0] for name in ArchiveStore.load_index(path)["files"]]
+        elif (path / BackupManager.MANIFEST_FILENAME).exists():
+            manifest = BackupManager.resolve_manifest(path)
+            top_level = [rel.replace("\\", "/").split("/", 1)[0] for rel in manifest.dirs] if manifest else []
+        else:
+            top_level = [item.name for item in ProfileHandler.list_profile_dirs(path)]
+        
+        profiles = sorted({name for name in top_level
+                           if name.startswith(("Profile ", "Default", "Guest Profile"))})
+        
+        size = info.get("size")
+        if size is None:
+            from storage.size_index import SizeIndex
+            size = SizeIndex.get_tree_size(path)
+        
+        created_at = None
+        if info.get("created_at"):
+            try:
+                created_at = datetime.datetime.fromisoformat(info["created_at"]).timestamp()
+            except ValueError:
+                created_at = None
+        
+        # Lo que ocupa en disco: en los deduplicados, los blobs que agregó al almacén
+        stored_bytes = info.get("stored_bytes", size)
+        
+        return {"size": size, "stored_bytes": stored_bytes, "content_hash": content_hash, "profiles": profiles,
+                "created_at": created_at, "backup_kind": info.get("kind", "legacy"), "base": info.get("base"),
+                "key_paths": None}
+    
+    @staticmethod
+    def _keyset(db: sqlite3.Connection, key_paths: Iterable[str]) -> int:
+        """Id del conjunto de rutas (lo crea si es la primera vez que aparece)"""
+        ordered = sorted(key_paths)
+        digest = hashlib.sha256("\n".join(ordered).encode('utf-8', 'surrogatepass')).hexdigest()
+        row = db.execute("SELECT id FROM keysets WHERE digest = ?", (digest,)).fetchone()
+        if row:
+            return row["id"]
+        
+        keyset_id = db.execute("INSERT INTO keysets (digest) VALUES (?)", (digest,)).lastrowid
+        db.executemany("INSERT OR IGNORE INTO key_paths (path) VALUES (?)", [(p,) for p in ordered])
+        db.executemany("INSERT INTO keyset_paths (key_id, keyset_id) SELECT id, ? FROM key_paths WHERE path = ?",
+                       [(keyset_id, p) for p in ordered])
+        return keyset_id
+    
+    @staticmethod
+    def _drop_orphan_keysets(db: sqlite3.Connection):
+        """Borra los conjuntos de rutas que ya no usa ningún snapshot"""
+        orphans = [(row["id"],) for row in db.execute(
+            "SELECT id FROM keysets WHERE id NOT IN (SELECT keyset_id FROM snapshots WHERE keyset_id IS NOT NULL)"
+        )]
+        db.executemany("DELETE FROM keyset_paths WHERE keyset_id = ?", orphans)
+        db.executemany("DELETE FROM keysets WHERE id = ?", orphans)
+    
+    @staticmethod
+    def _upsert(db: sqlite3.Connection, path: Path, root: str, kind: str):
+        """Describe una entrada y la guarda (reemplaza la anterior si existía)"""
+        try:
+            st = path.stat()
+            details = Catalog._describe_saved(path) if kind == Catalog.KIND_SAVED else Catalog._describe_backup(path)
+        except (OSError, ValueError):
+            return
+        
+        created_at = details["created_at"] or Catalog._timestamp_from_name(path.name) or st.st_mtime
+        keyset_id = Catalog._keyset(db, details["key_paths"]) if details["key_paths"] is not None else None
+        db.execute("DELETE FROM snapshots WHERE path = ?", (str(path),))
+        cursor = db.execute(
+            "INSERT INTO snapshots (path, root, kind, name, created_at, mtime_ns, size, stored_bytes, content_hash,"
+            " backup_kind, base, keyset_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(path), root, kind, path.name, created_at, st.st_mtime_ns, details["size"], details["stored_bytes"],
+             details["content_hash"], details["backup_kind"], details["base"], keyset_id)
+        )
+        db.executemany("INSERT INTO snapshot_profiles (snapshot_id, profile) VALUES (?, ?)",
+                       [(cursor.lastrowid, profile) for profile in details["profiles"]])
+    
+    @staticmethod
+    @Tracer.traced("catalog.record")
+    def record(path: Path):
+        """
+        Registra (o actualiza) un snapshot recién escrito por la herramienta
+        
+        Las carpetas que no están en una raíz catalogada se ignoran.
+        
+        Args:
+            path: Carpeta de la configuración guardada o del backup
+        """
+        path = Path(path).absolute()
+        roots = Catalog._roots()
+        root = str(path.parent)
+        kind = roots.get(root)
+        if kind is None:
+            return
+        try:
+            with Catalog._connect() as db:
+                if path.exists() and Catalog._is_snapshot(path, kind):
+                    Catalog._upsert(db, path, root, kind)
+                else:
+                    db.execute("DELETE FROM snapshots WHERE path = ?", (str(path),))
+                Catalog._drop_orphan_keysets(db)
+        except sqlite3.Error as e:
+            # El catálogo es solo un índice: si falla, la próxima sincronización lo corrige
+            print(f"⚠️ No se pudo actualizar el catálogo: {e}")
+    
+    @staticmethod
+    def forget(path: Path):
+        """
+        Quita un snapshot del catálogo (ej. al borrarlo)
+        
+        Args:
+            path: Carpeta del snapshot
+        """
+        try:
+            with Catalog._connect() as db:
+                db.execute("DELETE FROM snapshots WHERE path = ?", (str(Path(path).absolute()),))
+                Catalog._drop_orphan_keysets(db)
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo actualizar el catálogo: {e}")
+    
+    @staticmethod
+    @Tracer.traced("catalog.sync")
+    def sync(kind: Optional[str] = None):
+        """
+        Pone al día el catálogo con lo que haya en disco
+        
+        Solo relista las raíces cuyo mtime cambió desde la última vez.
+        
+        Args:
+            kind: KIND_SAVED, KIND_BACKUP o None para ambos
+        """
+        with Catalog._connect() as db:
+            for root, root_kind in Catalog._roots().items():
+                if kind and root_kind != kind:
+                    continue
+                Catalog._sync_root(db, root, root_kind)
+    
+    @staticmethod
+    def _sync_root(db: sqlite3.Connection, root: str, kind: str):
+        try:
+            root_mtime = os.stat(root).st_mtime_ns
+        except OSError:
+            db.execute("DELETE FROM snapshots WHERE root = ?", (root,))
+            db.execute("DELETE FROM roots WHERE root = ?", (root,))
+            Catalog._drop_orphan_keysets(db)
+            return
+        
+        row = db.execute("SELECT mtime_ns FROM roots WHERE root = ?", (root,)).fetchone()
+        if row and row["mtime_ns"] == root_mtime:
+            return
+        
+        known = {r["path"]: r["mtime_ns"] for r in db.execute("SELECT path, mtime_ns FROM snapshots WHERE root = ?",
+                                                              (root,))}
+        present = set()
+        changed = False
+        for item in Path(root).iterdir():
+            try:
+                # Entrada conocida y sin cambios: un stat, sin listar su contenido
+                if known.get(str(item)) == item.stat().st_mtime_ns:
+                    present.add(str(item))
+                    continue
+                if Catalog._is_snapshot(item, kind):
+                    present.add(str(item))
+                    Catalog._upsert(db, item, root, kind)
+                    changed = True
+            except OSError:
+                continue
+        
+        missing = known.keys() - present
+        db.executemany("DELETE FROM snapshots WHERE path = ?", [(path,) for path in missing])
+        if changed or missing:
+            Catalog._drop_orphan_keysets(db)
+        db.execute("INSERT OR REPLACE INTO roots (root, kind, mtime_ns) VALUES (?, ?, ?)", (root, kind, root_mtime))
+    
+    @staticmethod
+    def list_paths(kind: str) -> List[Path]:
+        """
+        Lista los snapshots de un tipo, del más reciente al más viejo (por mtime)
+        
+        Args:
+            kind: KIND_SAVED o KIND_BACKUP
+        
+        Returns:
+            Lista de carpetas
+        """
+        try:
+            Catalog.sync(kind)
+            with Catalog._connect() as db:
+                rows = db.execute("SELECT path FROM snapshots WHERE kind = ? ORDER BY mtime_ns DESC", (kind,))
+                return [Path(row["path"]) for row in rows]
+        except sqlite3.Error as e:
+            print(f"⚠️ Catálogo no disponible ({e}), se recorren las carpetas")
+            return [path for path, _ in Catalog._scan(kind)]
+    
+    @staticmethod
+    def _scan(kind: Optional[str]) -> List[tuple]:
+        """Snapshots en disco sin pasar por la base: [(carpeta, tipo)], del más reciente al más viejo"""
+        found = []
+        for root, root_kind in Catalog._roots().items():
+            if kind and root_kind != kind:
+                continue
+            try:
+                items = list(Path(root).iterdir())
+            except OSError:
+                continue
+            for item in items:
+                try:
+                    if Catalog._is_snapshot(item, root_kind):
+                        found.append((item.stat().st_mtime_ns, item, root_kind))
+                except OSError:
+                    continue
+        found.sort(key=lambda item: item[0], reverse=True)
+        return [(path, root_kind) for _, path, root_kind in found]
+    
+    @staticmethod
+    def list_entries(kind: Optional[str] = None) -> List[dict]:
+        """
+        Lista los snapshots con sus metadatos
+        
+        Args:
+            kind: KIND_SAVED, KIND_BACKUP o None para ambos
+        
+        Returns:
+            Lista de diccionarios (ver search), más recientes primero
+        """
+        return Catalog.search(kind)
+    
+    @staticmethod
+    def _timestamp(value: Union[str, datetime.date, None], end: bool = False) -> Optional[float]:
+        """Convierte una fecha (ISO o AAAA-MM-DD) a timestamp; una fecha sola como fin abarca todo el día"""
+        if value is None or value == "":
+            return None
+        if isinstance(value, str):
+            value = datetime.datetime.fromisoformat(value) if len(value) > 10 else datetime.date.fromisoformat(value)
+        if not isinstance(value, datetime.datetime):
+            value = datetime.datetime.combine(value, datetime.time.min)
+            if end:
+                value += datetime.timedelta(days=1)
+                return value.timestamp() - 1e-6
+        return value.timestamp()
+    
+    @staticmethod
+    def _match_op(pattern: str) -> str:
+        """Con * se compara con GLOB; sin comodines, igualdad exacta (usa el índice)"""
+        return "GLOB" if "*" in pattern else "="
+    
+    @staticmethod
+    def search(kind: Optional[str] = None,
+               since: Union[str, datetime.date, None] = None,
+               until: Union[str, datetime.date, None] = None,
+               profile: Optional[str] = None,
+               min_size: Optional[int] = None,
+               max_size: Optional[int] = None,
+               key_path: Optional[str] = None,
+               name: Optional[str] = None,
+               limit: Optional[int] = None) -> List[dict]:
+        """
+        Busca snapshots por metadatos, sin abrir ningún archivo
+        
+        Todos los filtros son opcionales y se combinan con Y. En profile,
+        key_path y name se puede usar * como comodín.
+        
+        Args:
+            kind: KIND_SAVED, KIND_BACKUP o None para ambos
+            since: Creados desde esta fecha (inclusive)
+            until: Creados hasta esta fecha (inclusive; AAAA-MM-DD abarca todo el día)
+            profile: Carpeta de perfil incluida (ej. "Default", "Profile *")
+            min_size: Tamaño mínimo en bytes
+            max_size: Tamaño máximo en bytes
+            key_path: Ruta de clave presente (ej. "brave.shields.stats"). Solo
+                las configuraciones guardadas tienen rutas indexadas, así que
+                este filtro deja afuera a los backups.
+            name: Nombre de la carpeta del snapshot
+            limit: Máximo de resultados
+        
+        Returns:
+            Lista de diccionarios (path, kind, name, created_at, size, stored_bytes,
+            content_hash, backup_kind, base, profiles), más recientes primero
+        """
+        conditions = []
+        params: list = []
+        
+        if kind:
+            conditions.append("s.kind = ?")
+            params.append(kind)
+        if since:
+            conditions.append("s.created_at >= ?")
+            params.append(Catalog._timestamp(since))
+        if until:
+            conditions.append("s.created_at <= ?")
+            params.append(Catalog._timestamp(until, end=True))
+        if min_size is not None:
+            conditions.append("s.size >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            conditions.append("s.size <= ?")
+            params.append(max_size)
+        if name:
+            conditions.append(f"s.name {Catalog._match_op(name)} ?")
+            params.append(name)
+        if profile:
+            conditions.append("s.id IN (SELECT snapshot_id FROM snapshot_profiles"
+                              f" WHERE profile {Catalog._match_op(profile)} ?)")
+            params.append(profile)
+        if key_path:
+            conditions.append("s.keyset_id IN (SELECT kp.keyset_id FROM keyset_paths kp"
+                              f" JOIN key_paths k ON k.id = kp.key_id WHERE k.path {Catalog._match_op(key_path)} ?)")
+            params.append(key_path)
+        
+        query = ("SELECT s.*, (SELECT group_concat(p.profile, char(31)) FROM snapshot_profiles p"
+                 " WHERE p.snapshot_id = s.id) AS profile_list FROM snapshots s")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY s.mtime_ns DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        try:
+            Catalog.sync(kind)
+            with Catalog._connect() as db:
+                return [Catalog._row_to_entry(row) for row in db.execute(query, params)]
+        except sqlite3.Error as e:
+            print(f"⚠️ Catálogo no disponible ({e}), se recorren las carpetas")
+            return Catalog._search_scan(kind, Catalog._timestamp(since), Catalog._timestamp(until, end=True),
+                                        profile, min_size, max_size, key_path, name, limit)
+    
+    @staticmethod
+    def _search_scan(kind: Optional[str], since: Optional[float], until: Optional[float], profile: Optional[str],
+                     min_size: Optional[int], max_size: Optional[int], key_path: Optional[str],
+                     name: Optional[str], limit: Optional[int]) -> List[dict]:
+        """search sin la base: describe cada snapshot en disco y filtra igual que la consulta"""
+        def matches(pattern: str, value: str) -> bool:
+            return fnmatch.fnmatchcase(value, pattern) if "*" in pattern else value == pattern
+        
+        results = []
+        for path, snapshot_kind in Catalog._scan(kind):
+            try:
+                st = path.stat()
+                details = (Catalog._describe_saved(path) if snapshot_kind == Catalog.KIND_SAVED
+                           else Catalog._describe_backup(path))
+            except (OSError, ValueError):
+                continue
+            created_at = details["created_at"] or Catalog._timestamp_from_name(path.name) or st.st_mtime
+            if ((since is not None and created_at < since) or (until is not None and created_at > until)
+                    or (min_size is not None and details["size"] < min_size)
+                    or (max_size is not None and details["size"] > max_size)
+                    or (name and not matches(name, path.name))
+                    or (profile and not any(matches(profile, p) for p in details["profiles"]))
+                    or (key_path and not any(matches(key_path, k) for k in details["key_paths"] or ()))):
+                continue
+            results.append({
+                "path": str(path),
+                "kind": snapshot_kind,
+                "name": path.name,
+                "created_at": datetime.datetime.fromtimestamp(created_at).isoformat(),
+                "size": details["size"],
+                "stored_bytes": details["stored_bytes"],
+                "content_hash": details["content_hash"],
+                "backup_kind": details["backup_kind"],
+                "base": details["base"],
+                "profiles": sorted(details["profiles"])
+            })
+            if limit and len(results) >= limit:
+                break
+        return results
+    
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> dict:
+        return {
+            "path": row["path"],
+            "kind": row["kind"],
+            "name": row["name"],
+            "created_at": datetime.datetime.fromtimestamp(row["created_at"]).isoformat(),
+            "size": row["size"],
+            "stored_bytes": row["stored_bytes"],
+            "content_hash": row["content_hash"],
+            "backup_kind": row["backup_kind"],
+            "base": row["base"],
+            "profiles": sorted(row["profile_list"].split("\x1f")) if row["profile_list"] else []
+        }
\ No newline at end of file
@@ -0,0 +1,453 @@
+"""
+Motor de copia paralela de árboles de archivos
+"""
+import errno
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from storage.exclusion_rules import ExclusionRules
+from utils.tracing import Tracer
+
+
+# Errores con los que la copia zero-copy no está disponible y hay que caer al método siguiente
+_ZERO_COPY_FALLBACK_ERRNOS = {
+    errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF,
+}
+
+
+@dataclass
+class CopyStats:
+    """Resultado de una copia de árbol"""
+    files: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    
+    @property
+    def bytes_per_sec(self) -> float:
+        """Velocidad media en bytes por segundo"""
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+    
+    @property
+    def mb(self) -> float:
+        """Total copiado en MB"""
+        return self.bytes / (1024 * 1024)
+
+
+class CopyProgress:
+    """Acumula bytes copiados y muestra la velocidad en una sola línea"""
+    
+    REFRESH_SECONDS = 0.5
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.files = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._printed = False
+        self._lock = threading.Lock()
+    
+    def add(self, nbytes: int):
+        """Registra un archivo copiado"""
+        with self._lock:
+            self.files += 1
+            self.bytes += nbytes
+            now = time.monotonic()
+            if self.enabled and now - self._last_report >= self.REFRESH_SECONDS:
+                self._last_report = now
+                self._printed = True
+                self._print(now)
+    
+    def _print(self, now: float):
+        elapsed = max(now - self.started, 1e-6)
+        mb = self.bytes / (1024 * 1024)
+        print(f"\r   📦 {self.files} archivos · {mb:.1f} MB · {mb / elapsed:.1f} MB/s", end="", flush=True)
+    
+    def finish(self):
+        """Cierra la línea de progreso"""
+        if self._printed:
+            self._print(time.monotonic())
+            print()
+
+
+class OperationCancelled(Exception):
+    """Se pidió cancelar la operación en curso (ver CopyEngine.cancel_scope)"""
+
+
+class CopyEngine:
+    """Copia árboles de archivos con un pool de hilos y copia zero-copy del kernel"""
+    
+    CHUNK_SIZE = 8 * 1024 * 1024
+    
+    # ioctl FICLONE de Linux (reflink en btrfs, XFS, bcachefs...)
+    FICLONE = 0x40049409
+    
+    _cancel_local = threading.local()
+    
+    @staticmethod
+    def default_workers() -> int:
+        """Cantidad de hilos por defecto (la copia está limitada por I/O, no por CPU)"""
+        return min(16, (os.cpu_count() or 1) * 2)
+    
+    @staticmethod
+    @contextmanager
+    def cancel_scope(event: threading.Event):
+        """
+        Hace cancelables los recorridos que se lancen desde este hilo
+        
+        Mientras dure el bloque, process_tree, copy_tree, los backups y las
+        restauraciones revisan event entre archivo y archivo: si se activa,
+        dejan de encolar trabajo, esperan lo que ya estaba en curso y
+        lanzan OperationCancelled (los que crean algo lo borran, como ante
+        cualquier error).
+        
+        Args:
+            event: Se activa para pedir la cancelación
+        """
+        previous = getattr(CopyEngine._cancel_local, "event", None)
+        CopyEngine._cancel_local.event = event
+        try:
+            yield
+        finally:
+            CopyEngine._cancel_local.event = previous
+    
+    @staticmethod
+    def cancel_event() -> Optional[threading.Event]:
+        """Event de cancelación del hilo actual (None fuera de cancel_scope)"""
+        return getattr(CopyEngine._cancel_local, "event", None)
+    
+    @staticmethod
+    def check_cancelled(event: Optional[threading.Event] = None):
+        """Lanza OperationCancelled si event (por defecto el del hilo) está activo"""
+        event = event or CopyEngine.cancel_event()
+        if event is not None and event.is_set():
+            raise OperationCancelled("Operación cancelada")
+    
+    @staticmethod
+    def _copy_data(src_fd: int, dst_fd: int, size: int):
+        """Copia el contenido entre descriptores usando copy_file_range/sendfile si se puede"""
+        offset = 0
+        
+        if hasattr(os, "copy_file_range"):
+            try:
+                while offset < size:
+                    copied = os.copy_file_range(src_fd, dst_fd, min(CopyEngine.CHUNK_SIZE, size - offset))
+                    if copied == 0:
+                        break
+                    offset += copied
+                if offset >= size:
+                    return
+            except OSError as e:
+                if e.errno not in _ZERO_COPY_FALLBACK_ERRNOS or offset:
+                    raise
+        
+        if hasattr(os, "sendfile") and offset == 0:
+            try:
+                while offset < size:
+                    sent = os.sendfile(dst_fd, src_fd, offset, min(CopyEngine.CHUNK_SIZE, size - offset))
+                    if sent == 0:
+                        break
+                    offset += sent
+                if offset >= size:
+                    return
+            except OSError as e:
+                if e.errno not in _ZERO_COPY_FALLBACK_ERRNOS or offset:
+                    raise
+        
+        # Copia tradicional en espacio de usuario (el archivo pudo crecer mientras se copiaba)
+        os.lseek(src_fd, offset, os.SEEK_SET)
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        while True:
+            chunk = os.read(src_fd, CopyEngine.CHUNK_SIZE)
+            if not chunk:
+                break
+            os.write(dst_fd, chunk)
+    
+    @staticmethod
+    def copy_file(src: str, dst: str) -> int:
+        """
+        Copia un archivo preservando permisos y fechas
+        
+        Args:
+            src: Archivo origen
+            dst: Archivo destino
+        
+        Returns:
+            Bytes copiados
+        """
+        src_fd = os.open(src, os.O_RDONLY)
+        try:
+            st = os.fstat(src_fd)
+            dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, stat.S_IMODE(st.st_mode) | stat.S_IWUSR)
+            try:
+                CopyEngine._copy_data(src_fd, dst_fd, st.st_size)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        
+        shutil.copystat(src, dst)
+        return st.st_size
+    
+    @staticmethod
+    def reflink_file(src: str, dst: str) -> bool:
+        """
+        Intenta clonar un archivo compartiendo bloques (reflink / copy-on-write)
+        
+        Args:
+            src: Archivo origen
+            dst: Archivo destino (no debe existir)
+        
+        Returns:
+            True si se clonó, False si el sistema de archivos no lo soporta
+        """
+        if not sys.platform.startswith("linux"):
+            return False
+        
+        import fcntl
+        
+        src_fd = os.open(src, os.O_RDONLY)
+        try:
+            dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            try:
+                fcntl.ioctl(dst_fd, CopyEngine.FICLONE, src_fd)
+            except OSError:
+                os.close(dst_fd)
+                os.unlink(dst)
+                return False
+            os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        
+        shutil.copystat(src, dst)
+        return True
+    
+    @staticmethod
+    def clone_file(src: str, dst: str, allow_hardlink: bool = False) -> str:
+        """
+        Crea dst con el contenido de src por el camino más barato disponible
+        
+        Orden: reflink, hardlink (solo si se permite) y copia zero-copy.
+        Un hardlink comparte el inodo: escribir en dst modifica también src.
+        
+        Args:
+            src: Archivo origen
+            dst: Archivo destino (no debe existir)
+            allow_hardlink: Permitir hardlinks
+        
+        Returns:
+            Método usado: "reflink", "hardlink" o "copy"
+        """
+        if CopyEngine.reflink_file(src, dst):
+            return "reflink"
+        if allow_hardlink:
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError:
+                pass
+        CopyEngine.copy_file(src, dst)
+        return "copy"
+    
+    @staticmethod
+    def walk_tree(src: Path,
+                  exclude: Optional[ExclusionRules] = None,
+                  on_error: Optional[Callable[[str, Exception], None]] = None) -> Iterator[Tuple[str, str, str]]:
+        """
+        Recorre un árbol en profundidad aplicando las reglas de exclusión
+        
+        Cada carpeta se entrega antes que su contenido y el contenido de una
+        carpeta de la raíz sale completo antes de pasar a la siguiente.
+        
+        Args:
+            src: Directorio origen
+            exclude: Reglas de exclusión (por defecto ExclusionRules.volatile())
+            on_error: Función (ruta_relativa, error) para carpetas ilegibles
+        
+        Yields:
+            (tipo, path, ruta_relativa) con tipo "dir", "symlink" o "file"
+        """
+        exclude = exclude or ExclusionRules.volatile()
+        stack = [(str(src), "")]
+        while stack:
+            src_dir, rel_dir = stack.pop()
+            yield "dir", src_dir, rel_dir
+            try:
+                entries = list(os.scandir(src_dir))
+            except OSError as e:
+                if on_error:
+                    on_error(rel_dir or ".", e)
+                continue
+            
+            for entry in entries:
+                rel = os.path.join(rel_dir, entry.name)
+                try:
+                    if entry.is_symlink():
+                        kind = "symlink"
+                    elif entry.is_dir():
+                        kind = "dir"
+                    elif entry.is_file():
+                        kind = "file"
+                    else:
+                        continue
+                except OSError as e:
+                    if on_error:
+                        on_error(rel, e)
+                    continue
+                
+                # Una carpeta excluida no se recorre
+                rel_posix = rel if os.sep == "/" else rel.replace(os.sep, "/")
+                if exclude.excludes(rel_posix, entry.name, kind == "dir"):
+                    continue
+                if kind == "dir":
+                    stack.append((entry.path, rel))
+                    continue
+                yield kind, entry.path, rel
+    
+    @staticmethod
+    @Tracer.traced("process_tree")
+    def process_tree(src: Path,
+                     on_file: Callable[[str, str], int],
+                     on_dir: Optional[Callable[[str, str], None]] = None,
+                     on_symlink: Optional[Callable[[str, str], None]] = None,
+                     exclude: Optional[ExclusionRules] = None,
+                     max_workers: Optional[int] = None,
+                     show_progress: bool = True,
+                     on_error: Optional[Callable[[str, Exception], None]] = None) -> CopyStats:
+        """
+        Recorre un árbol y procesa cada archivo en un pool de hilos
+        
+        El recorrido se hace en el hilo que llama (on_dir y on_symlink corren
+        ahí, en orden padre → hijo) y cada archivo se procesa en el pool. La
+        cantidad de trabajos pendientes está acotada para no acumular trabajo
+        en memoria.
+        
+        Args:
+            src: Directorio origen
+            on_file: Función (path, ruta_relativa) -> bytes procesados, corre en el pool
+            on_dir: Función (path, ruta_relativa) para cada carpeta ("" es la raíz)
+            on_symlink: Función (path, ruta_relativa) para cada enlace simbólico
+            exclude: Reglas de exclusión (por defecto ExclusionRules.volatile())
+            max_workers: Hilos del pool (por defecto CopyEngine.default_workers())
+            show_progress: Mostrar progreso en bytes/seg
+            on_error: Función (ruta_relativa, excepción) para cada archivo o carpeta que falló
+        
+        Returns:
+            CopyStats con archivos, bytes, tiempo y errores
+        """
+        exclude = exclude or ExclusionRules.volatile()
+        max_workers = max_workers or CopyEngine.default_workers()
+        stats = CopyStats()
+        progress = CopyProgress(show_progress)
+        pending = threading.BoundedSemaphore(max_workers * 4)
+        errors_lock = threading.Lock()
+        
+        def record_error(rel: str, e: Exception):
+            with errors_lock:
+                stats.errors.append(f"{rel}: {e}")
+                if on_error:
+                    on_error(rel, e)
+        
+        cancel = CopyEngine.cancel_event()
+        
+        def process_one(src_file: str, rel: str):
+            try:
+                if cancel is not None and cancel.is_set():
+                    return
+                with Tracer.span("file"):
+                    progress.add(on_file(src_file, rel))
+            except Exception as e:
+                record_error(rel, e)
+            finally:
+                pending.release()
+        
+        process = Tracer.bind(process_one)
+        started = time.monotonic()
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for kind, path, rel in CopyEngine.walk_tree(src, exclude, on_error=record_error):
+                CopyEngine.check_cancelled(cancel)
+                try:
+                    if kind == "dir":
+                        if on_dir:
+                            on_dir(path, rel)
+                    elif kind == "symlink":
+                        if on_symlink:
+                            on_symlink(path, rel)
+                    else:
+                        pending.acquire()
+                        pool.submit(process, path, rel)
+                except Exception as e:
+                    record_error(rel or ".", e)
+        
+        progress.finish()
+        stats.files = progress.files
+        stats.bytes = progress.bytes
+        stats.elapsed = time.monotonic() - started
+        Tracer.count("files", stats.files)
+        Tracer.count("bytes", stats.bytes)
+        return stats
+    
+    @staticmethod
+    @Tracer.traced("copy_tree")
+    def copy_tree(src: Path, dst: Path,
+                  exclude: Optional[ExclusionRules] = None,
+                  max_workers: Optional[int] = None,
+                  show_progress: bool = True,
+                  clone: bool = False,
+                  allow_hardlink: bool = False) -> CopyStats:
+        """
+        Copia un árbol de directorios en paralelo
+        
+        Args:
+            src: Directorio origen
+            dst: Directorio destino (se crea si no existe)
+            exclude: Reglas de exclusión (por defecto ExclusionRules.volatile())
+            max_workers: Hilos de copia (por defecto CopyEngine.default_workers())
+            show_progress: Mostrar progreso en bytes/seg
+            clone: Intentar reflink antes de copiar (ver CopyEngine.clone_file)
+            allow_hardlink: Con clone, permitir hardlinks al origen
+        
+        Returns:
+            CopyStats con archivos, bytes, tiempo y errores
+        """
+        dst = str(dst)
+        copied_dirs = []
+        
+        def make_dir(src_dir: str, rel: str):
+            dst_dir = os.path.join(dst, rel) if rel else dst
+            os.makedirs(dst_dir, exist_ok=True)
+            copied_dirs.append((src_dir, dst_dir))
+        
+        def copy_symlink(src_link: str, rel: str):
+            os.symlink(os.readlink(src_link), os.path.join(dst, rel))
+        
+        def copy_one(src_file: str, rel: str) -> int:
+            dst_file = os.path.join(dst, rel)
+            if clone:
+                CopyEngine.clone_file(src_file, dst_file, allow_hardlink)
+                return os.stat(dst_file).st_size
+            return CopyEngine.copy_file(src_file, dst_file)
+        
+        stats = CopyEngine.process_tree(src, copy_one, on_dir=make_dir, on_symlink=copy_symlink,
+                                        exclude=exclude, max_workers=max_workers,
+                                        show_progress=show_progress)
+        
+        # Fechas y permisos de carpetas al final (copiar archivos dentro las modifica)
+        for src_dir, dst_dir in reversed(copied_dirs):
+            try:
+                shutil.copystat(src_dir, dst_dir)
+            except OSError:
+                pass
+        
+        return stats
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Reglas de exclusión estilo .gitignore para copias y backups
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from models.profile import BackupScope
+
+
+class _Rule(NamedTuple):
+    pattern: str
+    negate: bool
+    dir_only: bool
+    anchored: bool      # compara contra la ruta relativa completa y no solo contra el nombre
+    regex: str
+
+
+class ExclusionRules:
+    """
+    Patrones estilo .gitignore compilados una vez para recorrer árboles rápido.
+    
+    - "nombre" o "*.tmp" (sin barra): coincide con el nombre en cualquier nivel
+    - "/Local State" o "Default/Cache" (con barra): ruta desde la raíz copiada
+    - "*" no cruza barras; "**" sí ("**/CacheStorage", "Default/**/LOG")
+    - "Cache/" (barra final): solo carpetas
+    - "!patrón": vuelve a incluir; gana la última regla que coincide
+    
+    Una carpeta excluida se poda: no se recorre su contenido, así que un "!"
+    no puede rescatar algo que está dentro de ella (igual que en git).
+    
+    Los nombres literales van a un set y el resto de los patrones se unen en
+    una sola expresión regular por tipo (nombre/ruta, archivo/carpeta), así
+    evaluar una entrada cuesta un lookup y a lo sumo cuatro match sin importar
+    cuántas reglas haya. Solo si hay reglas con "!" se evalúan en orden.
+    """
+    
+    # Archivos de una instancia de Brave en ejecución, temporales y ocultos
+    VOLATILE_PATTERNS = [".*", "*Singleton*", "*.tmp", "/*.lock"]
+    
+    # Cachés que Brave regenera solo: suelen ser la mayor parte de los bytes
+    CACHE_PATTERNS = [
+        "/*/Cache/",
+        "/*/Code Cache/",
+        "/*/GPUCache/",
+        "/*/DawnCache/",
+        "/*/GraphiteDawnCache/",
+        "/*/Service Worker/CacheStorage/",
+        "/*/Service Worker/ScriptCache/",
+        "/ShaderCache/",
+        "/GrShaderCache/",
+        "/GraphiteDawnCache/",
+        "/component_crx_cache/"
+    ]
+    
+    _compiled_cache: Dict[Tuple[str, ...], "ExclusionRules"] = {}
+    
+    def __init__(self, patterns: Sequence[str] = ()):
+        self.patterns = [p for p in (pattern.strip() for pattern in patterns) if p and not p.startswith("#")]
+        self._rules = [self._compile(pattern) for pattern in self.patterns]
+        self._ordered = any(rule.negate for rule in self._rules)
+        
+        literal = re.compile(r"[^*?\[\]]+")
+        self._names = {rule.pattern for rule in self._rules
+                       if not (rule.negate or rule.dir_only or rule.anchored) and literal.fullmatch(rule.pattern)}
+        self._name_re = self._join(r for r in self._rules
+                                   if not (r.negate or r.dir_only or r.anchored) and r.pattern not in self._names)
+        self._dir_name_re = self._join(r for r in self._rules if not r.negate and r.dir_only and not r.anchored)
+        self._path_re = self._join(r for r in self._rules if not (r.negate or r.dir_only) and r.anchored)
+        self._dir_path_re = self._join(r for r in self._rules if not r.negate and r.dir_only and r.anchored)
+        self._ordered_rules = [(rule, re.compile(rule.regex)) for rule in reversed(self._rules)]
+    
+    @staticmethod
+    def _glob_to_regex(glob: str) -> str:
+        """Traduce un glob de .gitignore a regex (* y ? no cruzan "/", ** sí)"""
+        out = []
+        i = 0
+        while i < len(glob):
+            c = glob[i]
+            if glob.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if glob.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            if c == "*":
+                out.append("[^/]*")
+            elif c == "?":
+                out.append("[^/]")
+            elif c == "[":
+                end = glob.find("]", i + 2)
+                if end == -1:
+                    out.append(re.escape(c))
+                else:
+                    body = glob[i + 1:end]
+                    # "[" y "\\" son literales en un glob pero no dentro de una clase de regex
+                    body = body.replace("\\", "\\\\").replace("[", "\\[")
+                    if body.startswith("!"):
+                        body = "^" + body[1:]
+                    out.append(f"[{body}]")
+                    i = end
+            else:
+                out.append(re.escape(c))
+            i += 1
+        return "".join(out)
+    
+    @staticmethod
+    def _compile(pattern: str) -> _Rule:
+        negate = pattern.startswith("!")
+        body = pattern[1:] if negate else pattern
+        dir_only = body.endswith("/")
+        body = body.rstrip("/")
+        anchored = "/" in body
+        body = body.lstrip("/")
+        return _Rule(body, negate, dir_only, anchored, ExclusionRules._glob_to_regex(body))
+    
+    @staticmethod
+    def _join(rules) -> Optional["re.Pattern"]:
+        regexes = [rule.regex for rule in rules]
+        return re.compile("|".join(f"(?:{regex})" for regex in regexes)) if regexes else None
+    
+    @classmethod
+    def compile(cls, patterns: Sequence[str]) -> "ExclusionRules":
+        """
+        Obtiene las reglas compiladas para una lista de patrones (cacheadas)
+        
+        Args:
+            patterns: Patrones estilo .gitignore
+        
+        Returns:
+            ExclusionRules
+        """
+        key = tuple(patterns)
+        if key not in cls._compiled_cache:
+            cls._compiled_cache[key] = cls(key)
+        return cls._compiled_cache[key]
+    
+    @classmethod
+    def none(cls) -> "ExclusionRules":
+        """Sin exclusiones (copia exacta)"""
+        return cls.compile(())
+    
+    @classmethod
+    def volatile(cls) -> "ExclusionRules":
+        """Solo archivos de bloqueo, temporales y ocultos (para copias y restauraciones)"""
+        return cls.compile(cls.VOLATILE_PATTERNS)
+    
+    @classmethod
+    def for_backup(cls, scope: Optional[BackupScope] = None) -> "ExclusionRules":
+        """
+        Reglas de un backup: volátiles, cachés (salvo que el alcance las
+        incluya), patrones propios del alcance y, si se limita a perfiles,
+        todo lo demás de la raíz
+        
+        Args:
+            scope: Alcance del backup (None: directorio completo sin cachés)
+        
+        Returns:
+            ExclusionRules
+        """
+        scope = scope or BackupScope()
+        patterns = list(cls.VOLATILE_PATTERNS)
+        if scope.exclude_caches:
+            patterns += cls.CACHE_PATTERNS
+        patterns += scope.exclude
+        if scope.top_level:
+            patterns.append("/*")
+            patterns += [f"!/{cls.escape(name)}" for name in scope.top_level]
+        return cls.compile(patterns)
+    
+    @staticmethod
+    def escape(name: str) -> str:
+        """Escapa un nombre literal para usarlo como patrón"""
+        return re.sub(r"([*?\[\]])", r"[\1]", name)
+    
+    def excludes(self, rel: str, name: str, is_dir: bool) -> bool:
+        """
+        Indica si una entrada queda afuera
+        
+        Args:
+            rel: Ruta relativa a la raíz copiada, separada por "/"
+            name: Último componente de rel
+            is_dir: Si es una carpeta (para las reglas con barra final)
+        
+        Returns:
+            True si no hay que copiarla
+        """
+        if self._ordered:
+            for rule, regex in self._ordered_rules:
+                if rule.dir_only and not is_dir:
+                    continue
+                if regex.fullmatch(rel if rule.anchored else name):
+                    return not rule.negate
+            return False
+        
+        if name in self._names:
+            return True
+        if self._name_re is not None and self._name_re.fullmatch(name):
+            return True
+        if self._path_re is not None and self._path_re.fullmatch(rel):
+            return True
+        if is_dir:
+            if self._dir_name_re is not None and self._dir_name_re.fullmatch(name):
+                return True
+            if self._dir_path_re is not None and self._dir_path_re.fullmatch(rel):
+                return True
+        return False
+    
+    def to_list(self) -> List[str]:
+        """Patrones tal como se escribieron"""
+        return list(self.patterns)
\ No newline at end of file
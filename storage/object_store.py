@@ -0,0 +1,168 @@
+"""
+Almacén de objetos direccionado por contenido para backups deduplicados
+"""
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Tuple
+
+from storage.copy_engine import CopyEngine
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, lock() no bloquea
+    fcntl = None
+
+
+class ObjectStore:
+    """
+    Guarda cada contenido de archivo una sola vez, nombrado por su SHA-256.
+    
+    Los blobs viven en <raíz>/<2 primeros hex>/<resto del hash> y se dejan de
+    solo lectura. Eso no protege a un blob exportado como hardlink: root
+    escribe igual y corrompe todos los backups que lo usan. Por eso nunca se
+    exporta con hardlink a un directorio que Brave vaya a abrir.
+    """
+    
+    HASH_CHUNK_SIZE = 1024 * 1024
+    LOCK_FILENAME = ".lock"
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+    
+    def object_path(self, digest: str) -> Path:
+        """Ruta del blob para un hash"""
+        return self.root / digest[:2] / digest[2:]
+    
+    @contextmanager
+    def lock(self, exclusive: bool = False) -> Iterator[None]:
+        """
+        Bloquea el almacén entre procesos (flock sobre <raíz>/.lock)
+        
+        Los backups deduplicados lo toman compartido desde que eligen su base
+        hasta que escriben el manifiesto; la retención lo toma exclusivo para
+        planificar, mover backups a la papelera y limpiar blobs. Así la
+        limpieza nunca borra un blob o una base que un backup en curso reusa
+        (put_file no toca un blob que ya existe, así que su fecha no lo
+        protege).
+        
+        Args:
+            exclusive: Bloqueo exclusivo (por defecto compartido)
+        """
+        if fcntl is None:
+            yield
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / self.LOCK_FILENAME, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+    
+    def has(self, digest: str) -> bool:
+        """Indica si el blob ya está en el almacén"""
+        return self.object_path(digest).exists()
+    
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """
+        Calcula el SHA-256 de un archivo
+        
+        Args:
+            path: Archivo a leer
+        
+        Returns:
+            Hash en hexadecimal
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb', buffering=0) as f:
+            buffer = bytearray(ObjectStore.HASH_CHUNK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                digest.update(view[:n])
+        return digest.hexdigest()
+    
+    def put_file(self, src: str) -> Tuple[str, bool]:
+        """
+        Agrega un archivo al almacén si su contenido no estaba
+        
+        El archivo se hashea primero (lectura sola); solo si el contenido es
+        nuevo se copia a un temporal y se vuelve a hashear esa copia, así el
+        nombre del blob siempre coincide con lo guardado aunque el origen
+        cambie mientras se lee.
+        
+        Args:
+            src: Archivo a guardar
+        
+        Returns:
+            (hash del contenido guardado, True si se agregó un blob nuevo)
+        """
+        digest = self.hash_file(src)
+        if self.has(digest):
+            return digest, False
+        
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / uuid.uuid4().hex
+        try:
+            CopyEngine.copy_file(src, str(tmp_path))
+            digest = self.hash_file(str(tmp_path))
+            object_path = self.object_path(digest)
+            if object_path.exists():
+                tmp_path.unlink()
+                return digest, False
+            object_path.parent.mkdir(exist_ok=True)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, object_path)
+            return digest, True
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+    
+    def iter_objects(self) -> Iterator[Tuple[str, Path]]:
+        """Recorre los blobs del almacén como (hash, ruta)"""
+        if not self.root.exists():
+            return
+        for prefix in os.scandir(self.root):
+            # Solo las carpetas de 2 hex (tmp/ tiene copias a medio guardar)
+            if len(prefix.name) != 2 or not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                yield prefix.name + entry.name, Path(entry.path)
+    
+    def remove(self, digest: str) -> int:
+        """
+        Borra un blob del almacén
+        
+        Args:
+            digest: Hash del blob
+        
+        Returns:
+            Bytes liberados
+        """
+        object_path = self.object_path(digest)
+        size = object_path.stat().st_size
+        os.chmod(object_path, 0o644)  # los blobs son de solo lectura (en Windows no se borrarían)
+        object_path.unlink()
+        return size
+    
+    def export(self, digest: str, dst: str, allow_hardlink: bool = False) -> str:
+        """
+        Crea un archivo con el contenido de un blob
+        
+        Args:
+            digest: Hash del blob
+            dst: Archivo destino (no debe existir)
+            allow_hardlink: Permitir hardlink al blob (comparte inodo y permisos)
+        
+        Returns:
+            Método usado: "reflink", "hardlink" o "copy"
+        """
+        object_path = self.object_path(digest)
+        if not object_path.exists():
+            raise FileNotFoundError(f"Falta el objeto {digest} en el almacén")
+        return CopyEngine.clone_file(str(object_path), dst, allow_hardlink)
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Restauración atómica mediante directorio de staging e intercambio por rename
+"""
+import ctypes
+import ctypes.util
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+from storage.copy_engine import CopyStats
+
+
+class RestoreIncomplete(Exception):
+    """La reconstrucción tuvo errores: el destino se dejó como estaba"""
+    
+    def __init__(self, stats: CopyStats):
+        self.stats = stats
+        super().__init__(f"Restauración incompleta ({len(stats.errors)} errores, no se modificó el destino): "
+                         f"{stats.errors[0]}")
+
+
+class RestoreEngine:
+    """
+    Reemplaza un directorio completo sin dejarlo nunca a medio copiar.
+    
+    El contenido nuevo se arma en una carpeta hermana (mismo sistema de
+    archivos) y recién cuando está completo se intercambia con el destino:
+    con renameat2(RENAME_EXCHANGE) en Linux el cambio es atómico; en otros
+    sistemas son dos rename seguidos. El árbol viejo se borra en segundo plano.
+    """
+    
+    STAGING_MARKER = ".staging-"
+    TRASH_MARKER = ".old-"
+    
+    # renameat2(2)
+    _AT_FDCWD = -100
+    _RENAME_EXCHANGE = 2
+    
+    _cleanup_threads: List[threading.Thread] = []
+    _removing: Set[str] = set()
+    
+    @staticmethod
+    def _staging_path(target: Path) -> Path:
+        return target.parent / f".{target.name}{RestoreEngine.STAGING_MARKER}{os.getpid()}"
+    
+    @staticmethod
+    def _trash_path(target: Path) -> Path:
+        return target.parent / f".{target.name}{RestoreEngine.TRASH_MARKER}{os.getpid()}-{time.time_ns()}"
+    
+    @staticmethod
+    def _exchange(a: Path, b: Path) -> bool:
+        """Intercambia dos rutas de forma atómica (solo Linux); False si no está disponible"""
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            renameat2 = libc.renameat2
+        except (OSError, AttributeError):
+            return False
+        
+        renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+        result = renameat2(RestoreEngine._AT_FDCWD, os.fsencode(a),
+                           RestoreEngine._AT_FDCWD, os.fsencode(b),
+                           RestoreEngine._RENAME_EXCHANGE)
+        return result == 0
+    
+    @staticmethod
+    def remove_in_background(path: Path):
+        """Borra un árbol en un hilo aparte (el proceso espera a que termine al salir)"""
+        if str(path) in RestoreEngine._removing:
+            return
+        RestoreEngine._removing.add(str(path))
+        thread = threading.Thread(target=shutil.rmtree, args=(path, True), name=f"rmtree {path.name}")
+        thread.start()
+        RestoreEngine._cleanup_threads.append(thread)
+    
+    @staticmethod
+    def wait_for_cleanup():
+        """Espera a que terminen los borrados en segundo plano"""
+        while RestoreEngine._cleanup_threads:
+            RestoreEngine._cleanup_threads.pop().join()
+    
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    
+    @staticmethod
+    def clean_leftovers(target: Path):
+        """
+        Elimina staging y árboles viejos que haya dejado una restauración interrumpida
+        
+        Solo los de procesos que ya no existen: los de otra restauración en
+        curso (otro PID vivo) se dejan, esa restauración los usa o los borra.
+        """
+        if not target.parent.exists():
+            return
+        for marker in (RestoreEngine.STAGING_MARKER, RestoreEngine.TRASH_MARKER):
+            prefix = f".{target.name}{marker}"
+            for item in target.parent.iterdir():
+                if not item.name.startswith(prefix) or item == RestoreEngine._staging_path(target):
+                    continue
+                pid = item.name[len(prefix):].split("-", 1)[0]
+                if pid.isdigit() and RestoreEngine._pid_alive(int(pid)):
+                    continue
+                RestoreEngine.remove_in_background(item)
+    
+    @staticmethod
+    def swap_in(target: Path, build: Callable[[Path], Optional[CopyStats]],
+                allow_partial: bool = False) -> Optional[CopyStats]:
+        """
+        Construye el contenido nuevo aparte y lo intercambia con target
+        
+        Args:
+            target: Directorio a reemplazar (puede no existir)
+            build: Función que llena el directorio de staging recibido
+            allow_partial: Intercambiar aunque build informe errores (archivos que no se pudieron armar)
+        
+        Returns:
+            Lo que devuelva build. Si build falla, target queda intacto y se
+            propaga la excepción; si devuelve errores, también (RestoreIncomplete)
+            salvo con allow_partial.
+        """
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        RestoreEngine.clean_leftovers(target)
+        
+        staging = RestoreEngine._staging_path(target)
+        if staging.exists():
+            shutil.rmtree(staging)
+        
+        try:
+            result = build(staging)
+            if result is not None and result.errors and not allow_partial:
+                raise RestoreIncomplete(result)
+            staging.mkdir(exist_ok=True)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        
+        if not target.exists():
+            os.rename(staging, target)
+        elif RestoreEngine._exchange(staging, target):
+            # Tras el intercambio, staging contiene el árbol viejo
+            trash = RestoreEngine._trash_path(target)
+            os.rename(staging, trash)
+            RestoreEngine.remove_in_background(trash)
+        else:
+            trash = RestoreEngine._trash_path(target)
+            os.rename(target, trash)
+            try:
+                os.rename(staging, target)
+            except OSError:
+                os.rename(trash, target)
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            RestoreEngine.remove_in_background(trash)
+        
+        return result
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+Retención de backups y limpieza del almacén de objetos
+"""
+import datetime
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.profile import RetentionPlan, RetentionPolicy
+from storage.backup_manager import BackupManager
+from storage.catalog import Catalog
+
+
+class RetentionEngine:
+    """
+    Decide qué backups borrar según una RetentionPolicy y los borra.
+    
+    El plan se calcula con los metadatos del catálogo (nombre, fecha, base y
+    bytes ocupados), sin recorrer ningún backup. Un backup que se conserva
+    arrastra a toda su cadena de bases incrementales: nunca se borra algo
+    que un backup conservado necesita para restaurarse.
+    
+    Las reglas de cantidad cuentan por separado cada origen y alcance (ver
+    _group): los backups de algunos perfiles no desplazan a los completos
+    del mismo directorio. Para el espacio de los backups deduplicados se
+    leen además sus manifiestos: un blob compartido cuenta una sola vez y
+    solo se libera cuando se borran todos los backups que lo usan.
+    
+    Borrar es en dos pasos: los backups se mueven a backup/.trash/ (un
+    rename, así desaparecen de los listados al instante) y un hilo aparte
+    borra esa carpeta y después los blobs del almacén que ya no referencia
+    ningún manifiesto. Planificar, mover a la papelera y limpiar el almacén
+    se hacen con el almacén bloqueado en exclusiva (ObjectStore.lock): un
+    backup deduplicado en curso, que lo tiene compartido, nunca pierde su
+    base ni los blobs que reusa.
+    """
+    
+    TRASH_DIRNAME = ".trash"
+    # Los blobs más nuevos que esto no se borran aunque nadie los referencie (backup en curso)
+    GC_GRACE_SECONDS = 3600
+    
+    _BUCKET_RULES = ("keep_hourly", "keep_daily", "keep_weekly", "keep_monthly")
+    
+    @staticmethod
+    def _bucket(created: datetime.datetime, rule: str) -> str:
+        """Período al que pertenece una fecha para una regla"""
+        if rule == "keep_hourly":
+            return created.strftime("%Y-%m-%d %H")
+        if rule == "keep_daily":
+            return created.strftime("%Y-%m-%d")
+        if rule == "keep_weekly":
+            year, week, _ = created.isocalendar()
+            return f"{year}-W{week:02d}"
+        return created.strftime("%Y-%m")
+    
+    @staticmethod
+    def _bases(name: str, by_name: Dict[str, dict]) -> List[str]:
+        """Cadena de bases de un backup (de la más cercana a la más lejana)"""
+        bases = []
+        base = by_name[name].get("base")
+        while base and base in by_name and base not in bases:
+            bases.append(base)
+            base = by_name[base].get("base")
+        return bases
+    
+    @staticmethod
+    def _group(entry: dict) -> Tuple[Optional[str], Tuple[str, ...]]:
+        """Origen y perfiles del alcance de un backup (sin perfiles: el directorio completo)"""
+        info = (BackupManager.load_backup_info(Path(entry["path"])) if entry.get("path") else None) or {}
+        return info.get("source"), tuple(sorted((info.get("scope") or {}).get("profiles") or ()))
+    
+    @staticmethod
+    def plan(policy: RetentionPolicy, entries: Optional[List[dict]] = None) -> RetentionPlan:
+        """
+        Calcula qué backups conservar y cuáles borrar
+        
+        Args:
+            policy: Reglas de retención
+            entries: Backups en formato Catalog.list_entries (por defecto los del catálogo)
+        
+        Returns:
+            RetentionPlan con el motivo de cada backup conservado y los
+            nombres a borrar (del más viejo al más nuevo)
+        """
+        if entries is None:
+            entries = Catalog.list_entries(Catalog.KIND_BACKUP)
+        ordered = sorted(entries, key=lambda entry: entry["created_at"], reverse=True)
+        by_name = {entry["name"]: entry for entry in ordered}
+        keep: Dict[str, List[str]] = {}
+        groups: Dict[Tuple[Optional[str], Tuple[str, ...]], List[dict]] = {}
+        for entry in ordered:
+            groups.setdefault(RetentionEngine._group(entry), []).append(entry)
+        
+        if not (policy.keep_last or any(getattr(policy, rule) for rule in RetentionEngine._BUCKET_RULES)):
+            # Sin reglas de cantidad se parte de todos (el tope de bytes, si hay, recorta después)
+            for entry in ordered:
+                keep.setdefault(entry["name"], []).append("sin reglas de cantidad")
+        
+        for group in groups.values():
+            for entry in group[:policy.keep_last]:
+                keep.setdefault(entry["name"], []).append("last")
+            
+            for rule in RetentionEngine._BUCKET_RULES:
+                limit = getattr(policy, rule)
+                if not limit:
+                    continue
+                seen = set()
+                for entry in group:
+                    bucket = RetentionEngine._bucket(datetime.datetime.fromisoformat(entry["created_at"]), rule)
+                    if bucket in seen:
+                        continue
+                    if len(seen) >= limit:
+                        break
+                    seen.add(bucket)
+                    keep.setdefault(entry["name"], []).append(rule[len("keep_"):])
+        
+        # Las bases de lo que se conserva también se conservan
+        for name in list(keep):
+            for base in RetentionEngine._bases(name, by_name):
+                keep.setdefault(base, []).append(f"base de {name}")
+        
+        # Los manifiestos solo hacen falta para medir espacio: si hay tope o algo que borrar
+        blobs: Dict[str, Dict[str, int]] = {}
+        if policy.max_total_bytes is not None or len(keep) < len(ordered):
+            blobs = RetentionEngine._blob_sizes(ordered)
+        
+        if policy.max_total_bytes is not None and ordered:
+            # El tope nunca saca el backup completo más reciente de cada origen
+            newest = [ordered[0]] + [group[0] for (_, profiles), group in groups.items() if not profiles]
+            RetentionEngine._apply_byte_cap(policy.max_total_bytes, ordered, by_name, keep, blobs,
+                                            [entry["name"] for entry in newest])
+        
+        plan = RetentionPlan(keep={entry["name"]: keep[entry["name"]] for entry in ordered if entry["name"] in keep})
+        plan.delete = [entry["name"] for entry in reversed(ordered) if entry["name"] not in keep]
+        if plan.delete:
+            plan.freed_bytes = (RetentionEngine._stored_bytes(by_name, by_name, blobs)
+                                - RetentionEngine._stored_bytes(keep, by_name, blobs))
+        return plan
+    
+    @staticmethod
+    def _blob_sizes(entries: List[dict]) -> Dict[str, Dict[str, int]]:
+        """
+        Blobs del almacén que lista cada backup deduplicado ({nombre: {hash: bytes}})
+        
+        Los backups clásicos, los comprimidos y los de manifiesto ilegible no
+        aparecen: su espacio es su stored_bytes.
+        """
+        blobs = {}
+        for entry in entries:
+            if not entry.get("path"):
+                continue
+            try:
+                manifest = BackupManager.load_manifest(Path(entry["path"]))
+            except (OSError, ValueError):
+                continue
+            if manifest:
+                blobs[entry["name"]] = {file["digest"]: file["size"] for file in manifest.files.values()}
+        return blobs
+    
+    @staticmethod
+    def _stored_bytes(names, by_name: Dict[str, dict], blobs: Dict[str, Dict[str, int]]) -> int:
+        """Espacio que ocupan juntos los backups de names (cada blob compartido cuenta una vez)"""
+        unique: Dict[str, int] = {}
+        total = 0
+        for name in names:
+            if name in blobs:
+                unique.update(blobs[name])
+            else:
+                total += by_name[name].get("stored_bytes") or 0
+        return total + sum(unique.values())
+    
+    @staticmethod
+    def _apply_byte_cap(max_bytes: int, ordered: List[dict], by_name: Dict[str, dict], keep: Dict[str, List[str]],
+                        blobs: Dict[str, Dict[str, int]], protected_names: List[str]):
+        """
+        Saca de keep los backups más viejos hasta que lo conservado quepa en max_bytes
+        
+        Un backup sale junto con los incrementales conservados que dependen
+        de él (sin su base no se podrían restaurar). Los de protected_names y
+        sus cadenas nunca salen, aunque solos ya superen el tope. Los blobs (ver
+        _blob_sizes) se cuentan una vez y se descuentan recién cuando sale el
+        último backup conservado que los usa.
+        """
+        protected = set(protected_names)
+        for name in protected_names:
+            protected.update(RetentionEngine._bases(name, by_name))
+        refs: Counter = Counter()
+        for name in keep:
+            refs.update(blobs.get(name, {}).keys())
+        total = RetentionEngine._stored_bytes(keep, by_name, blobs)
+        dependents: Dict[str, List[str]] = {}
+        for name in keep:
+            base = by_name[name].get("base")
+            if base in keep:
+                dependents.setdefault(base, []).append(name)
+        
+        for entry in reversed(ordered):  # del más viejo al más nuevo
+            if total <= max_bytes:
+                break
+            if entry["name"] not in keep or entry["name"] in protected:
+                continue
+            
+            group, stack = [], [entry["name"]]
+            while stack:
+                name = stack.pop()
+                group.append(name)
+                stack.extend(dependents.get(name, []))
+            if protected.intersection(group):
+                continue
+            
+            for name in group:
+                if keep.pop(name, None) is None:
+                    continue
+                if name not in blobs:
+                    total -= by_name[name].get("stored_bytes") or 0
+                    continue
+                for digest, size in blobs[name].items():
+                    refs[digest] -= 1
+                    if not refs[digest]:
+                        total -= size
+    
+    @staticmethod
+    def apply(plan: RetentionPlan, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Borra los backups del plan
+        
+        Si desde que se calculó el plan apareció un backup que depende de
+        alguno de los que iban a borrarse, ése se conserva.
+        
+        Args:
+            plan: Resultado de plan()
+            background: Borrar los archivos en un hilo aparte (el rename a
+                        la papelera es inmediato)
+        
+        Returns:
+            El hilo que borra (para esperarlo con join), o None si se borró en el momento
+        """
+        with BackupManager.get_object_store().lock(exclusive=True):
+            collect = RetentionEngine._move_to_trash(plan)
+        return RetentionEngine._start_purge(collect, background)
+    
+    @staticmethod
+    def _needed_bases(deleting: List[str]) -> Set[str]:
+        """Backups de deleting que son base (directa o no) de alguno que se conserva"""
+        bases = {backup.name: (BackupManager.load_backup_info(backup) or {}).get("base")
+                 for backup in BackupManager.list_available_backups()}
+        needed = set()
+        for name in bases.keys() - set(deleting):
+            base = bases[name]
+            while base and base not in needed:
+                needed.add(base)
+                base = bases.get(base)
+        return needed & set(deleting)
+    
+    @staticmethod
+    def _move_to_trash(plan: RetentionPlan) -> bool:
+        """Mueve los backups del plan a la papelera (con el almacén bloqueado); True si hay blobs que limpiar"""
+        backups_dir = BackupManager.get_backups_dir()
+        trash = backups_dir / RetentionEngine.TRASH_DIRNAME
+        trash.mkdir(parents=True, exist_ok=True)
+        needed = RetentionEngine._needed_bases(plan.delete)
+        collect = False
+        
+        for name in plan.delete:
+            if name in needed:
+                print(f"⚠️ No se borra {name}: es base de un backup más nuevo")
+                continue
+            backup_path = backups_dir / name
+            if (backup_path / BackupManager.MANIFEST_FILENAME).exists():
+                collect = True
+            target = trash / name
+            if target.exists():
+                shutil.rmtree(target, ignore_errors=True)
+            try:
+                os.replace(backup_path, target)
+            except OSError as e:
+                print(f"⚠️ No se pudo borrar {name}: {e}")
+                continue
+            Catalog.forget(backup_path)
+            print(f"🗑️ Backup borrado: {name}")
+        return collect
+    
+    @staticmethod
+    def _start_purge(collect: bool, background: bool) -> Optional[threading.Thread]:
+        """Vacía la papelera (y limpia el almacén si collect) en el momento o en un hilo aparte"""
+        trash = BackupManager.get_backups_dir() / RetentionEngine.TRASH_DIRNAME
+        if not background:
+            RetentionEngine._purge(trash, collect)
+            return None
+        worker = threading.Thread(target=RetentionEngine._purge, args=(trash, collect), name="retention-purge")
+        worker.start()
+        return worker
+    
+    @staticmethod
+    def _purge(trash: Path, collect: bool):
+        """Vacía la papelera y, si se borraron backups deduplicados, limpia el almacén"""
+        for item in list(trash.iterdir()):
+            shutil.rmtree(item, ignore_errors=True)
+        if collect:
+            RetentionEngine.collect_garbage()
+    
+    @staticmethod
+    def collect_garbage() -> Tuple[int, int]:
+        """
+        Borra del almacén los blobs que ya no referencia ningún manifiesto
+        
+        Se leen solo los manifiestos (cada uno lista los blobs que agregó o
+        cambió; los de sus bases se leen igual porque las bases se conservan).
+        Si algún manifiesto no se puede leer no se borra nada. Corre con el
+        almacén bloqueado en exclusiva: espera a los backups en curso.
+        
+        Returns:
+            (blobs borrados, bytes liberados)
+        """
+        with BackupManager.get_object_store().lock(exclusive=True):
+            return RetentionEngine._collect_garbage()
+    
+    @staticmethod
+    def _collect_garbage() -> Tuple[int, int]:
+        referenced = set()
+        for backup_path in BackupManager.list_available_backups():
+            try:
+                manifest = BackupManager.load_manifest(backup_path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se limpia el almacén: manifiesto ilegible en {backup_path.name} ({e})")
+                return 0, 0
+            if manifest:
+                referenced.update(entry["digest"] for entry in manifest.files.values())
+        
+        store = BackupManager.get_object_store()
+        cutoff = time.time() - RetentionEngine.GC_GRACE_SECONDS
+        removed = freed = 0
+        for digest, object_path in store.iter_objects():
+            if digest in referenced:
+                continue
+            try:
+                if object_path.stat().st_ctime > cutoff:
+                    continue
+                freed += store.remove(digest)
+                removed += 1
+            except OSError:
+                continue
+        
+        if removed:
+            print(f"🧹 Almacén: {removed} objetos sin uso borrados ({freed / (1024 * 1024):.1f} MB)")
+        return removed, freed
+    
+    @staticmethod
+    def prune(policy: RetentionPolicy, dry_run: bool = False,
+              background: bool = True) -> Tuple[RetentionPlan, Optional[threading.Thread]]:
+        """
+        Calcula el plan de retención y, salvo dry_run, lo aplica
+        
+        Args:
+            policy: Reglas de retención
+            dry_run: Solo calcular, sin borrar
+            background: Ver apply
+        
+        Returns:
+            (plan, hilo que borra o None)
+        """
+        # Plan y papelera con el almacén bloqueado: ningún backup elige como base algo que se va a borrar
+        with BackupManager.get_object_store().lock(exclusive=True):
+            plan = RetentionEngine.plan(policy)
+            if dry_run or not plan.delete:
+                return plan, None
+            collect = RetentionEngine._move_to_trash(plan)
+        return plan, RetentionEngine._start_purge(collect, background)
\ No newline at end of file
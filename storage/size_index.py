@@ -0,0 +1,150 @@
+"""
+Índice persistente de tamaños de directorios
+"""
+import atexit
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.json_backend import JsonBackend
+from utils.system_utils import SystemUtils
+from utils.tracing import Tracer
+
+
+class SizeIndex:
+    """
+    Calcula tamaños de árboles de directorios reutilizando un índice en disco.
+    
+    Cada directorio se guarda con su mtime, la suma de sus archivos directos y
+    la lista de subdirectorios. En las siguientes consultas solo se vuelven a
+    listar los directorios cuyo mtime cambió; el resto sale del índice con un
+    único stat por directorio. El índice se persiste al salir del proceso.
+    
+    Nota: reescribir un archivo existente en el lugar no cambia el mtime del
+    directorio que lo contiene, así que su nuevo tamaño se refleja recién
+    cuando ese directorio cambie (alta, baja o renombre de una entrada).
+    """
+    
+    INDEX_FILENAME = "size_index.json"
+    INDEX_VERSION = 1
+    
+    _lock = threading.Lock()
+    _entries: Optional[Dict[str, list]] = None
+    _dirty = False
+    
+    @staticmethod
+    def get_index_path() -> Path:
+        """Obtiene la ruta del archivo de índice"""
+        return SystemUtils.get_cache_dir() / SizeIndex.INDEX_FILENAME
+    
+    @staticmethod
+    def _load() -> Dict[str, list]:
+        """Carga el índice desde disco (una sola vez por proceso)"""
+        if SizeIndex._entries is None:
+            entries = {}
+            index_path = SizeIndex.get_index_path()
+            if index_path.exists():
+                try:
+                    data = JsonBackend.load(index_path)
+                    if data.get("version") == SizeIndex.INDEX_VERSION:
+                        entries = data.get("dirs", {})
+                except Exception:
+                    entries = {}
+            SizeIndex._entries = entries
+            atexit.register(SizeIndex.save)
+        return SizeIndex._entries
+    
+    @staticmethod
+    def save():
+        """Persiste el índice si hubo cambios"""
+        with SizeIndex._lock:
+            if not SizeIndex._dirty or SizeIndex._entries is None:
+                return
+            index_path = SizeIndex.get_index_path()
+            tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+            try:
+                JsonBackend.dump({"version": SizeIndex.INDEX_VERSION, "dirs": SizeIndex._entries}, tmp_path,
+                                 compact=True)
+                os.replace(tmp_path, index_path)
+                SizeIndex._dirty = False
+            except OSError:
+                # El índice es solo una caché: si no se puede escribir, se recalcula la próxima vez
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+    
+    @staticmethod
+    def _scan_dir(dir_path: str) -> List:
+        """Lista un directorio y devuelve [bytes de archivos directos, subdirectorios]"""
+        files_bytes = 0
+        subdirs = []
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        files_bytes += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+        return [files_bytes, subdirs]
+    
+    @staticmethod
+    @Tracer.traced("size_index")
+    def get_tree_size(root: Path) -> int:
+        """
+        Calcula el tamaño total de un árbol de directorios
+        
+        Args:
+            root: Directorio raíz a medir
+        
+        Returns:
+            Tamaño en bytes (0 si no existe o no se puede leer)
+        """
+        root_str = str(Path(root).absolute())
+        if not os.path.isdir(root_str):
+            return 0
+        
+        with SizeIndex._lock:
+            entries = SizeIndex._load()
+            visited = set()
+            total = 0
+            rescanned = 0
+            stack = [root_str]
+            
+            while stack:
+                dir_path = stack.pop()
+                try:
+                    mtime = os.stat(dir_path).st_mtime_ns
+                except OSError:
+                    continue
+                
+                cached = entries.get(dir_path)
+                if cached and cached[0] == mtime:
+                    files_bytes, subdirs = cached[1], cached[2]
+                else:
+                    try:
+                        files_bytes, subdirs = SizeIndex._scan_dir(dir_path)
+                    except OSError:
+                        continue
+                    entries[dir_path] = [mtime, files_bytes, subdirs]
+                    SizeIndex._dirty = True
+                    rescanned += 1
+                
+                visited.add(dir_path)
+                total += files_bytes
+                stack.extend(os.path.join(dir_path, name) for name in subdirs)
+            
+            # Olvidar directorios que ya no existen dentro de este árbol
+            prefix = root_str + os.sep
+            stale = [key for key in entries if key.startswith(prefix) and key not in visited]
+            for key in stale:
+                del entries[key]
+            if stale:
+                SizeIndex._dirty = True
+        
+        Tracer.count("dirs", len(visited))
+        Tracer.count("dirs_rescanned", rescanned)
+        return total
\ No newline at end of file
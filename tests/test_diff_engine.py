@@ -0,0 +1,83 @@
+"""
+Diferencias estructurales y parches sobre Preferences
+"""
+import unittest
+
+from core.diff_engine import DiffEngine
+from models.profile import ConfigDiff
+
+
+class CountingDict(dict):
+    """Diccionario que cuenta cuántas veces se listan sus claves (diff solo lo hace al bajar)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.listed = 0
+    
+    def keys(self):
+        self.listed += 1
+        return super().keys()
+
+
+class DiffTest(unittest.TestCase):
+
+    def test_keys_with_literal_dots(self):
+        result = DiffEngine.diff({"hosts": {"a.com": 1}}, {"hosts": {"a.com": 2, "b.org": 3}})
+        
+        self.assertEqual(result.changed, {"hosts.a\\.com": {"old": 1, "new": 2}})
+        self.assertEqual(result.added, {"hosts.b\\.org": 3})
+        self.assertEqual(DiffEngine.split_path("hosts.a\\.com"), ["hosts", "a.com"])
+    
+    def test_lists_compare_as_whole_values(self):
+        result = DiffEngine.diff({"order": [1, 2, 3]}, {"order": [1, 3, 2]})
+        
+        self.assertEqual(result.changed, {"order": {"old": [1, 2, 3], "new": [1, 3, 2]}})
+        self.assertFalse(result.added or result.removed)
+    
+    def test_true_and_one_differ(self):
+        result = DiffEngine.diff({"flag": True, "zero": 0}, {"flag": 1, "zero": False})
+        
+        self.assertEqual(set(result.changed), {"flag", "zero"})
+    
+    def test_identical_subtrees_are_not_walked(self):
+        old_same = CountingDict({"deep": {"x": 1}})
+        new_same = CountingDict({"deep": {"x": 1}})
+        
+        result = DiffEngine.diff({"same": old_same, "other": 1}, {"same": new_same, "other": 2})
+        
+        self.assertEqual(set(result.changed), {"other"})
+        self.assertEqual((old_same.listed, new_same.listed), (0, 0))
+    
+    def test_equal_configurations_are_empty(self):
+        self.assertTrue(DiffEngine.diff({"a": {"b": [1]}}, {"a": {"b": [1]}}).is_empty)
+
+
+class PatchTest(unittest.TestCase):
+
+    def test_build_and_apply_reproduce_saved_sections(self):
+        config = {"brave_settings": {"tabs": [1, 2], "shields": {"stats": True}}, "keyboard_shortcuts": {},
+                  "profile_name": "Guardado"}
+        prefs = {"brave": {"tabs": [1, 3], "shields": {"stats": 1}, "gone": 5}, "shortcuts": {},
+                 "profile": {"name": "Actual"}, "other": {"kept": True}}
+        
+        patch = DiffEngine.build_patch(config, prefs)
+        
+        self.assertEqual(set(patch.changed), {"brave.tabs", "brave.shields.stats"})
+        self.assertEqual(set(patch.removed), {"brave.gone"})
+        DiffEngine.apply_patch(prefs, patch)
+        self.assertEqual(prefs, {"brave": {"tabs": [1, 2], "shields": {"stats": True}}, "shortcuts": {},
+                                 "profile": {"name": "Actual"}, "other": {"kept": True}})
+        self.assertTrue(DiffEngine.build_patch(config, prefs).is_empty)
+    
+    def test_apply_dotted_paths(self):
+        prefs = {"hosts": {"a.com": 1, "keep": 2}}
+        patch = ConfigDiff(added={"hosts.b\\.org": 3}, removed={"hosts.a\\.com": 1},
+                           changed={"new\\.section.x": {"old": None, "new": 4}})
+        
+        DiffEngine.apply_patch(prefs, patch)
+        
+        self.assertEqual(prefs, {"hosts": {"keep": 2, "b.org": 3}, "new.section": {"x": 4}})
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Semántica .gitignore de ExclusionRules y poda de carpetas al recorrer
+"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from models.profile import BackupScope
+from storage.copy_engine import CopyEngine
+from storage.exclusion_rules import ExclusionRules
+
+
+def excluded(rules: ExclusionRules, rel: str, is_dir: bool = False) -> bool:
+    return rules.excludes(rel, rel.rsplit("/", 1)[-1], is_dir)
+
+
+class ExclusionRulesTest(unittest.TestCase):
+
+    def test_name_patterns_match_at_any_level(self):
+        rules = ExclusionRules(["*.tmp", "LOG"])
+        
+        self.assertTrue(excluded(rules, "a.tmp"))
+        self.assertTrue(excluded(rules, "Default/deep/b.tmp"))
+        self.assertTrue(excluded(rules, "Default/LOG"))
+        self.assertFalse(excluded(rules, "Default/LOG.old"))
+    
+    def test_anchored_patterns_match_from_the_root(self):
+        rules = ExclusionRules(["/Local State", "Default/Cache"])
+        
+        self.assertTrue(excluded(rules, "Local State"))
+        self.assertFalse(excluded(rules, "Default/Local State"))
+        self.assertTrue(excluded(rules, "Default/Cache", is_dir=True))
+        self.assertFalse(excluded(rules, "Profile 1/Default/Cache", is_dir=True))
+    
+    def test_star_does_not_cross_slashes_but_double_star_does(self):
+        rules = ExclusionRules(["/*/History", "**/CacheStorage", "Default/**/LOG"])
+        
+        self.assertTrue(excluded(rules, "Default/History"))
+        self.assertFalse(excluded(rules, "Default/sub/History"))
+        self.assertTrue(excluded(rules, "CacheStorage", is_dir=True))
+        self.assertTrue(excluded(rules, "Default/Service Worker/CacheStorage", is_dir=True))
+        self.assertTrue(excluded(rules, "Default/LOG"))
+        self.assertTrue(excluded(rules, "Default/a/b/LOG"))
+        self.assertFalse(excluded(rules, "Profile 1/LOG"))
+    
+    def test_trailing_slash_only_matches_directories(self):
+        rules = ExclusionRules(["Cache/"])
+        
+        self.assertTrue(excluded(rules, "Default/Cache", is_dir=True))
+        self.assertFalse(excluded(rules, "Default/Cache"))
+    
+    def test_negation_reincludes_and_last_rule_wins(self):
+        rules = ExclusionRules(["*.log", "!keep.log", "/*", "!/Default"])
+        
+        self.assertTrue(excluded(rules, "Default/a.log"))
+        self.assertFalse(excluded(rules, "Default/keep.log"))
+        self.assertTrue(excluded(rules, "Profile 1", is_dir=True))
+        self.assertFalse(excluded(rules, "Default", is_dir=True))
+        # Un "!" anterior no gana sobre una regla posterior
+        self.assertTrue(excluded(ExclusionRules(["!a.log", "*.log"]), "a.log"))
+    
+    def test_comments_and_blank_lines_are_ignored(self):
+        rules = ExclusionRules(["# comentario", "", "  ", "*.tmp"])
+        
+        self.assertEqual(rules.to_list(), ["*.tmp"])
+    
+    def test_escape_makes_names_literal(self):
+        rules = ExclusionRules([f"/{ExclusionRules.escape('Profile [1]*')}"])
+        
+        self.assertTrue(excluded(rules, "Profile [1]*", is_dir=True))
+        self.assertFalse(excluded(rules, "Profile 1x", is_dir=True))
+    
+    def test_for_backup_limits_root_to_selected_profiles(self):
+        rules = ExclusionRules.for_backup(BackupScope(profiles=["Default"]))
+        
+        self.assertFalse(excluded(rules, "Default", is_dir=True))
+        self.assertFalse(excluded(rules, "Local State"))
+        self.assertTrue(excluded(rules, "Profile 1", is_dir=True))
+        self.assertTrue(excluded(rules, "First Run"))
+        # Dentro del perfil siguen valiendo las cachés y los volátiles
+        self.assertFalse(excluded(rules, "Default/Preferences"))
+        self.assertTrue(excluded(rules, "Default/Cache", is_dir=True))
+        self.assertTrue(excluded(rules, "Default/SingletonLock"))
+    
+    def test_for_backup_without_local_state_or_cache_exclusion(self):
+        rules = ExclusionRules.for_backup(BackupScope(profiles=["Default"], local_state=False, exclude_caches=False))
+        
+        self.assertTrue(excluded(rules, "Local State"))
+        self.assertFalse(excluded(rules, "Default/Cache", is_dir=True))
+    
+    def test_excluded_directories_are_pruned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for rel in ("Default/Cache/keep.log", "Default/Cache/data", "Default/Preferences", "Default/keep.log"):
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text("x")
+            seen = []
+            
+            def on_file(path: str, rel: str) -> int:
+                seen.append(Path(rel).as_posix())
+                return os.path.getsize(path)
+            
+            # Un "!" no rescata nada dentro de una carpeta excluida (igual que en git)
+            CopyEngine.process_tree(root, on_file, exclude=ExclusionRules(["Cache/", "*.log", "!keep.log"]),
+                                    show_progress=False)
+            
+            self.assertEqual(sorted(seen), ["Default/Preferences", "Default/keep.log"])
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
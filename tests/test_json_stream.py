@@ -0,0 +1,131 @@
+"""
+JsonStream contra json.loads: bloques mínimos, cadenas con escapes y corchetes, claves no ASCII
+"""
+import io
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from utils.json_stream import JsonStream
+
+CHUNK_SIZES = (1, 2, 3, 7, 64)
+
+# Cadenas que confunden a un recorrido ingenuo: comillas escapadas, corchetes y barras
+TRICKY_STRINGS = ['', 'a"b', '\\', '\\"', '{[', ']}', '"}]', 'ñandú', '日本語', ' ', 'emoji 🎉', 'x\\\\"y']
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(8 if depth < 5 else 4)
+    if kind == 0:
+        return rng.choice(TRICKY_STRINGS) + str(rng.randrange(100))
+    if kind == 1:
+        return rng.choice([0, -1, 3.5, 1e20, -2.5e-7, 123456789012345678])
+    if kind == 2:
+        return rng.choice([True, False, None])
+    if kind == 3:
+        return rng.choice(TRICKY_STRINGS)
+    if kind in (4, 5):
+        return {rng.choice(TRICKY_STRINGS) + str(i): random_value(rng, depth + 1) for i in range(rng.randrange(5))}
+    return [random_value(rng, depth + 1) for _ in range(rng.randrange(5))]
+
+
+def documents(count: int = 150):
+    rng = random.Random(20240525)
+    for _ in range(count):
+        value = {f"clave_{i}_{rng.choice(TRICKY_STRINGS)}": random_value(rng) for i in range(rng.randrange(1, 6))}
+        indent = rng.choice([None, 1, 4])
+        yield value, json.dumps(value, ensure_ascii=rng.random() < 0.5, indent=indent).encode('utf-8')
+
+
+def stream(data: bytes, chunk_size: int) -> JsonStream:
+    return JsonStream(io.BytesIO(data), chunk_size=chunk_size)
+
+
+class JsonStreamParityTest(unittest.TestCase):
+
+    def test_read_matches_json_loads(self):
+        for _, data in documents():
+            for chunk_size in CHUNK_SIZES:
+                self.assertEqual(stream(data, chunk_size).read(), json.loads(data))
+    
+    def test_walk_skip_and_copy_match_json_loads(self):
+        for value, data in documents():
+            for chunk_size in CHUNK_SIZES:
+                s = stream(data, chunk_size)
+                keys, read = [], {}
+                for i, key in enumerate(s.iter_object()):
+                    keys.append(key)
+                    if i % 3 == 0:
+                        s.skip()
+                    elif i % 3 == 1:
+                        read[key] = s.read()
+                    else:
+                        parts = []
+                        s.copy_to(parts.append)
+                        read[key] = json.loads(b"".join(parts))
+                self.assertEqual(keys, list(value))
+                self.assertEqual(read, {k: v for i, (k, v) in enumerate(value.items()) if i % 3})
+    
+    def test_find_nested_non_ascii_keys(self):
+        data = json.dumps({"ñ": {"日本": {"a\"b": [1, "]"]}}, "z": 1}, ensure_ascii=False).encode('utf-8')
+        for chunk_size in CHUNK_SIZES:
+            self.assertEqual(stream(data, chunk_size).find(("ñ", "日本", "a\"b")), [1, "]"])
+            self.assertIsNone(stream(data, chunk_size).find(("ñ", "falta")))
+    
+    def test_invalid_documents_raise(self):
+        for data in (b'{"a": 1', b'{"a" 1}', b'{"a": "sin cerrar}', b'{"a": [1, 2}'):
+            with self.assertRaises(ValueError):
+                s = stream(data, 2)
+                for _ in s.iter_object():
+                    s.skip()
+
+
+class JsonStreamFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "Preferences"
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_splice_round_trip(self):
+        original = {"brave": {"shields": {"s": "a\"}]"}}, "ñandú": [1, {"x": None}], "keep": "日本", "gone": 1}
+        raw = json.dumps(original, ensure_ascii=False, indent=3).encode('utf-8')
+        self.path.write_bytes(raw)
+        untouched = []
+        s = stream(raw, 5)
+        for key in s.iter_object():
+            if key == "ñandú":
+                s.copy_to(untouched.append)
+            else:
+                s.skip()
+        
+        JsonStream.splice(self.path, {"brave": {"tabs": True}, "nueva": "ü"}, deleted=["gone"])
+        
+        result = json.loads(self.path.read_bytes())
+        self.assertEqual(list(result), ["brave", "ñandú", "keep", "nueva"])
+        self.assertEqual(result, {"brave": {"tabs": True}, "ñandú": [1, {"x": None}], "keep": "日本", "nueva": "ü"})
+        # Lo que no se tocó se copia byte a byte, con su formato original
+        self.assertIn(b"".join(untouched), self.path.read_bytes())
+        self.assertIn(b"\n", b"".join(untouched))
+    
+    def test_splice_without_changes_preserves_content(self):
+        for value, data in documents(30):
+            self.path.write_bytes(data)
+            JsonStream.splice(self.path, {})
+            self.assertEqual(json.loads(self.path.read_bytes()), value)
+    
+    def test_read_keys_and_get(self):
+        data = {"a": {"b": [1, 2]}, "ñ": "x", "c": 3}
+        self.path.write_text(json.dumps(data), encoding='utf-8')
+        
+        self.assertEqual(JsonStream.read_keys(self.path, ["ñ", "c", "falta"]), {"ñ": "x", "c": 3})
+        self.assertEqual(JsonStream.get(self.path, ("a", "b")), [1, 2])
+        self.assertEqual(JsonStream.get(self.path, ("a", "z"), "def"), "def")
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Aplicar una configuración guardada sobre un perfil cuyas extensiones cambiaron
+"""
+import copy
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core.extraction_engine import ExtractionEngine
+from core.extraction_spec import ExtractionSpec
+from utils.json_backend import JsonBackend
+from utils.json_stream import JsonStream
+
+
+# Rutas del preset compact anterior: los manifest de las extensiones elegidos por comodín
+OLD_COMPACT = ExtractionSpec(["brave.shields", "extensions.theme", "extensions.settings.*.manifest.name",
+                              "extensions.settings.*.manifest.version", "shortcuts", "profile.name"])
+
+
+def extension(name: str, version: str) -> dict:
+    return {"path": name.lower(), "state": 1,
+            "manifest": {"name": name, "version": version, "permissions": ["tabs"]}}
+
+
+class ApplyCompactConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        saved_prefs = {
+            "brave": {"shields": {"stats": 1}},
+            "extensions": {"settings": {"a": extension("A", "1.0"), "b": extension("B", "1.0")}},
+            "profile": {"name": "Persona"}
+        }
+        self.config = ExtractionEngine._config_from_prefs(saved_prefs, OLD_COMPACT).to_dict()
+        
+        # Después de guardar: A se actualizó, B se desinstaló y C es nueva
+        self.live = {
+            "brave": {"shields": {"stats": 2}, "other": True},
+            "extensions": {"settings": {"a": extension("A", "2.0"), "c": extension("C", "1.0")}},
+            "profile": {"name": "Otro"}
+        }
+        self.tmp = tempfile.TemporaryDirectory()
+        self.prefs_file = Path(self.tmp.name) / "Preferences"
+        JsonBackend.dump_atomic(self.live, self.prefs_file, compact=True)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def check_patched(self):
+        prefs = JsonBackend.load(self.prefs_file)
+        expected = copy.deepcopy(self.live)
+        expected["brave"]["shields"]["stats"] = 1
+        self.assertEqual(prefs, expected)
+    
+    def test_full_parse(self):
+        self.assertIsNotNone(ExtractionEngine.patch_preferences(self.config, self.prefs_file))
+        self.check_patched()
+    
+    def test_stream(self):
+        with mock.patch.object(JsonStream, "STREAM_THRESHOLD", 0):
+            self.assertIsNotNone(ExtractionEngine.patch_preferences(self.config, self.prefs_file))
+        self.check_patched()
+    
+    def test_no_common_extensions(self):
+        del self.config["extra_settings"]["extensions"]["settings"]["a"]
+        self.assertIsNotNone(ExtractionEngine.patch_preferences(self.config, self.prefs_file))
+        self.check_patched()
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
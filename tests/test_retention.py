@@ -0,0 +1,96 @@
+"""
+Plan de retención: cadenas de bases, tope de bytes con blobs compartidos y alcances
+"""
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from models.profile import BackupManifest, RetentionPolicy
+from storage.backup_manager import BackupManager
+from storage.retention import RetentionEngine
+
+SOURCE = "/home/user/.config/BraveSoftware/Brave-Browser"
+
+
+class RetentionPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.entries: List[dict] = []
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def add(self, name: str, hour: int, base: Optional[str] = None, blobs: Optional[Dict[str, int]] = None,
+            profiles: Optional[List[str]] = None, stored_bytes: int = 0):
+        """Registra un backup deduplicado con su backup_info y su manifiesto"""
+        path = self.root / name
+        path.mkdir()
+        created_at = f"2026-01-01T{hour:02d}:00:00"
+        info = {"kind": "incremental" if base else "full", "base": base, "created_at": created_at, "source": SOURCE}
+        if profiles is not None:
+            info["scope"] = {"profiles": profiles, "local_state": True, "exclude_caches": True, "exclude": []}
+        BackupManager.save_backup_info(path, info)
+        
+        manifest = BackupManifest.create(Path(SOURCE))
+        manifest.kind, manifest.base = info["kind"], base
+        manifest.files = {f"file_{digest}": {"digest": digest, "size": size, "mtime_ns": 0, "mode": 0o644}
+                          for digest, size in (blobs or {}).items()}
+        BackupManager.save_manifest(manifest, path)
+        
+        self.entries.append({"path": str(path), "name": name, "created_at": created_at, "base": base,
+                             "stored_bytes": stored_bytes})
+    
+    def plan(self, **policy):
+        return RetentionEngine.plan(RetentionPolicy(**policy), self.entries)
+    
+    def test_kept_incremental_keeps_its_base_chain(self):
+        self.add("old", 1)
+        self.add("full", 2)
+        self.add("inc1", 3, base="full")
+        self.add("inc2", 4, base="inc1")
+        
+        plan = self.plan(keep_last=1)
+        
+        self.assertEqual(list(plan.keep), ["inc2", "inc1", "full"])
+        self.assertIn("base de inc2", plan.keep["full"])
+        self.assertEqual(plan.delete, ["old"])
+    
+    def test_byte_cap_counts_shared_blobs_once(self):
+        # Cada uno agregó su blob chico; el grande lo comparten los tres
+        self.add("a", 1, blobs={"shared": 100, "a": 10}, stored_bytes=110)
+        self.add("b", 2, blobs={"shared": 100, "b": 10}, stored_bytes=10)
+        self.add("c", 3, blobs={"shared": 100, "c": 10}, stored_bytes=10)
+        
+        plan = self.plan(max_total_bytes=125)
+        
+        # Sin "a" lo conservado ocupa 120: el blob compartido sigue en uso y no se libera
+        self.assertEqual(plan.delete, ["a"])
+        self.assertEqual(plan.freed_bytes, 10)
+    
+    def test_scoped_backups_do_not_displace_full_ones(self):
+        self.add("full", 1, profiles=[])
+        self.add("scoped1", 2, profiles=["Default"])
+        self.add("scoped2", 3, profiles=["Default"])
+        
+        plan = self.plan(keep_last=1)
+        
+        self.assertEqual(set(plan.keep), {"scoped2", "full"})
+        self.assertEqual(plan.delete, ["scoped1"])
+    
+    def test_newest_full_backup_survives_cap_it_exceeds(self):
+        self.add("older", 1, blobs={"older": 500})
+        self.add("full", 2, blobs={"full": 1000})
+        self.add("scoped", 3, blobs={"scoped": 10}, profiles=["Default"])
+        
+        plan = self.plan(max_total_bytes=5)
+        
+        self.assertEqual(set(plan.keep), {"scoped", "full"})
+        self.assertEqual(plan.delete, ["older"])
+        self.assertEqual(plan.freed_bytes, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,430 @@
+"""
+Subcomandos no interactivos con salida JSON (cron, scripts de aprovisionamiento)
+"""
+import argparse
+import contextlib
+import datetime
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from core.async_service import AsyncService
+from core.extraction_engine import ExtractionEngine
+from core.extraction_spec import ExtractionSpec
+from core.profile_handler import ProfileHandler
+from models.profile import BackupScope, RetentionPolicy
+from storage.backup_manager import BackupManager
+from storage.catalog import Catalog
+from storage.retention import RetentionEngine
+from utils.json_backend import JsonBackend
+from utils.system_utils import SystemUtils
+from utils.tracing import Tracer
+
+
+class BatchCLI:
+    """
+    Ejecuta las operaciones del gestor sin menús ni input().
+    
+    Cada comando llama directo a core/ y storage/ y escribe un único objeto
+    JSON en stdout; los mensajes para humanos que imprimen esas capas se
+    desvían a stderr. El código de salida es 0 si la operación salió bien,
+    1 si falló (argparse sale con 2 ante argumentos inválidos).
+    """
+    
+    COMMANDS = ("save", "backup", "restore", "list", "status", "fleet", "diff", "search", "prune", "watch")
+    
+    @staticmethod
+    def register_commands(subparsers):
+        """
+        Agrega los subcomandos al parser de main.py
+        
+        Args:
+            subparsers: Resultado de ArgumentParser.add_subparsers()
+        """
+        common = argparse.ArgumentParser(add_help=False)
+        common.add_argument("--brave-path", type=Path,
+                            help="Directorio de Brave a usar (por defecto el del usuario actual)")
+        common.add_argument("--repo", type=Path,
+                            help="Carpeta con backup/ y saved_configs/ (por defecto el directorio actual)")
+        
+        concurrency = argparse.ArgumentParser(add_help=False)
+        concurrency.add_argument("--per-disk", type=int, default=AsyncService.DEFAULT_PER_DEVICE, metavar="N",
+                                 help="Operaciones de copia simultáneas por disco "
+                                      f"(por defecto {AsyncService.DEFAULT_PER_DEVICE})")
+        
+        retention = argparse.ArgumentParser(add_help=False)
+        retention.add_argument("--keep-last", type=int, default=0, metavar="N",
+                               help="Conservar los N backups más recientes")
+        retention.add_argument("--keep-hourly", type=int, default=0, metavar="N", help="Uno por hora, últimas N horas")
+        retention.add_argument("--keep-daily", type=int, default=0, metavar="N", help="Uno por día, últimos N días")
+        retention.add_argument("--keep-weekly", type=int, default=0, metavar="N",
+                               help="Uno por semana, últimas N semanas")
+        retention.add_argument("--keep-monthly", type=int, default=0, metavar="N", help="Uno por mes, últimos N meses")
+        retention.add_argument("--max-total-size", type=BatchCLI._size, metavar="TAMAÑO",
+                               help="Tope de lo que ocupan los backups (ej. 20G)")
+        
+        subparsers.add_parser("status", parents=[common], help="Estado del sistema en JSON")
+        subparsers.add_parser("list", parents=[common], help="Lista perfiles, backups y configuraciones guardadas")
+        
+        save = subparsers.add_parser("save", parents=[common, concurrency], help="Extrae la configuración de los perfiles")
+        save.add_argument("--profile", action="append", metavar="CARPETA",
+                          help="Perfil a guardar (repetible; por defecto todos)")
+        save.add_argument("--name", help="Nombre base de la carpeta en saved_configs/")
+        save.add_argument("--spec", metavar="PRESET|ARCHIVO",
+                          help="Qué rutas extraer: 'default', 'compact' o un JSON {include, exclude}")
+        save.add_argument("--backup", action="store_true",
+                          help="Respaldar esos perfiles al mismo tiempo que se extraen")
+        
+        backup = subparsers.add_parser("backup", parents=[common, concurrency, retention],
+                                       help="Crea un backup del directorio de Brave (y aplica la retención)")
+        backup.add_argument("--incremental", action="store_true", help="Basarse en el último backup deduplicado")
+        backup.add_argument("--verify-hash", action="store_true",
+                            help="En modo incremental, hashear también los archivos sin cambios aparentes")
+        backup.add_argument("--archive", action="store_true", help="Guardar como tar comprimido")
+        backup.add_argument("--codec", choices=["zstd", "xz"], help="Compresión del modo --archive")
+        backup.add_argument("--profile", action="append", metavar="CARPETA",
+                            help="Respaldar solo este perfil y Local State (repetible; por defecto todo)")
+        backup.add_argument("--include-caches", action="store_true",
+                            help="Incluir las cachés regenerables (Cache, Code Cache, GPUCache...)")
+        backup.add_argument("--exclude", action="append", default=[], metavar="PATRÓN",
+                            help="Excluir además este patrón estilo .gitignore (repetible, ej. 'Default/History*')")
+        
+        restore = subparsers.add_parser("restore", parents=[common, concurrency], help="Restaura un backup o una configuración")
+        source = restore.add_mutually_exclusive_group(required=True)
+        source.add_argument("--backup", metavar="NOMBRE",
+                            help="Backup a restaurar ('latest': el último completo de --brave-path)")
+        source.add_argument("--saved", metavar="NOMBRE", help="Configuración guardada a restaurar")
+        restore.add_argument("--profile", metavar="CARPETA",
+                             help="Con --saved: aplicar solo a este perfil (ej. Default)")
+        restore.add_argument("--force", action="store_true", help="Restaurar aunque Brave parezca abierto")
+        restore.add_argument("--allow-partial", action="store_true",
+                             help="Reemplazar aunque falten archivos (por defecto no se toca el destino)")
+        
+        diff = subparsers.add_parser("diff", help="Compara dos configuraciones o una configuración con un perfil")
+        diff.add_argument("old", type=Path, help="JSON guardado, carpeta guardada o carpeta de perfil")
+        diff.add_argument("new", type=Path, help="JSON guardado, carpeta guardada o carpeta de perfil")
+        diff.add_argument("--profile", metavar="CARPETA", help="Perfil a usar dentro de carpetas guardadas")
+        diff.add_argument("--paths-only", action="store_true", help="Listar solo las rutas, sin valores")
+        
+        prune = subparsers.add_parser("prune", parents=[retention],
+                                      help="Borra backups según una política de retención")
+        prune.add_argument("--repo", type=Path,
+                           help="Carpeta con backup/ y saved_configs/ (por defecto el directorio actual)")
+        prune.add_argument("--dry-run", action="store_true", help="Solo mostrar qué se borraría")
+        
+        search = subparsers.add_parser("search", help="Busca configuraciones guardadas y backups en el catálogo")
+        search.add_argument("--repo", type=Path,
+                            help="Carpeta con backup/ y saved_configs/ (por defecto el directorio actual)")
+        search.add_argument("--kind", choices=["saved", "backup"], help="Solo configuraciones guardadas o backups")
+        search.add_argument("--since", metavar="FECHA", help="Creados desde (AAAA-MM-DD o ISO)")
+        search.add_argument("--until", metavar="FECHA", help="Creados hasta (AAAA-MM-DD incluye todo el día)")
+        search.add_argument("--profile", metavar="CARPETA", help="Que incluyan este perfil (admite *)")
+        search.add_argument("--min-size", type=BatchCLI._size, metavar="TAMAÑO", help="Tamaño mínimo (ej. 500K, 2G)")
+        search.add_argument("--max-size", type=BatchCLI._size, metavar="TAMAÑO", help="Tamaño máximo")
+        search.add_argument("--key", metavar="RUTA",
+                            help="Que contengan esta clave (ej. brave.shields.stats; admite *; solo guardadas)")
+        search.add_argument("--name", help="Nombre de la carpeta (admite *)")
+        search.add_argument("--limit", type=int, help="Máximo de resultados")
+        
+        fleet = subparsers.add_parser("fleet", help="Guarda y respalda la configuración de muchos usuarios")
+        fleet.add_argument("homes", nargs="*", type=Path, metavar="HOME",
+                           help="Carpetas personales o que las contienen (por defecto /home)")
+        fleet.add_argument("--output", type=Path, default=Path("fleet"),
+                           help="Carpeta donde queda lo de cada usuario (por defecto ./fleet)")
+        fleet.add_argument("--workers", type=int, help="Procesos en paralelo (por defecto uno por CPU)")
+        fleet.add_argument("--no-save", action="store_true", help="No extraer la configuración de los perfiles")
+        fleet.add_argument("--spec", metavar="PRESET|ARCHIVO", help="Qué rutas extraer (ver save --spec)")
+        fleet.add_argument("--no-backup", action="store_true", help="No crear backups")
+        fleet.add_argument("--incremental", action="store_true", help="Backups incrementales")
+        fleet.add_argument("--archive", action="store_true", help="Backups como tar comprimido")
+        fleet.add_argument("--codec", choices=["zstd", "xz"], help="Compresión del modo --archive")
+        
+        watch = subparsers.add_parser("watch", parents=[common],
+                                      help="Vigila los perfiles y guarda la configuración cada vez que cambia")
+        watch.add_argument("--profile", action="append", metavar="CARPETA",
+                           help="Perfil a vigilar (repetible; por defecto todos, incluso los nuevos)")
+        watch.add_argument("--name", default="brave_watch", help="Nombre base de los snapshots en saved_configs/")
+        watch.add_argument("--spec", metavar="PRESET|ARCHIVO", help="Qué rutas extraer (ver save --spec)")
+        watch.add_argument("--debounce", type=float, default=2.0, metavar="SEG",
+                           help="Segundos sin escrituras antes de extraer (por defecto 2)")
+        watch.add_argument("--poll", action="store_true", help="Revisar con stat aunque haya inotify")
+        watch.add_argument("--interval", type=float, default=5.0, metavar="SEG",
+                           help="Segundos entre revisiones sin inotify (por defecto 5)")
+    
+    @staticmethod
+    def run(args) -> int:
+        """
+        Ejecuta el subcomando elegido e imprime su resultado en JSON
+        
+        Args:
+            args: Namespace de argparse con el atributo command
+        
+        Returns:
+            Código de salida del proceso
+        """
+        # Rutas absolutas antes de cambiar de directorio (el origen queda así en los manifiestos)
+        if getattr(args, "brave_path", None):
+            args.brave_path = args.brave_path.expanduser().resolve()
+        if getattr(args, "repo", None):
+            try:
+                os.chdir(args.repo)
+            except OSError as e:
+                return BatchCLI._emit({"command": args.command, "ok": False, "error": str(e)})
+        
+        handler = getattr(BatchCLI, f"_cmd_{args.command}")
+        try:
+            with contextlib.redirect_stdout(sys.stderr), Tracer.span(f"cli.{args.command}"):
+                result = handler(args)
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        
+        return BatchCLI._emit({"command": args.command, **result})
+    
+    @staticmethod
+    def _emit(result: dict) -> int:
+        """Escribe el resultado en stdout y devuelve el código de salida"""
+        print(JsonBackend.dumps(result, compact=True, default=str), flush=True)
+        return 0 if result.get("ok") else 1
+    
+    @staticmethod
+    def _size(value: str) -> int:
+        """Tamaño en bytes con sufijo opcional K, M o G (base 1024)"""
+        units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+        value = value.strip().upper().rstrip("B")
+        try:
+            if value and value[-1] in units:
+                return int(float(value[:-1]) * units[value[-1]])
+            return int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"tamaño inválido: {value}")
+    
+    @staticmethod
+    def _brave_path(args) -> Path:
+        return args.brave_path or ProfileHandler.get_brave_config_path()
+    
+    @staticmethod
+    def _service(args) -> AsyncService:
+        return AsyncService(per_device=args.per_disk)
+    
+    @staticmethod
+    def _brave_running(brave_path: Path) -> bool:
+        """Brave deja SingletonLock (un symlink, a veces colgado) mientras está abierto"""
+        return os.path.lexists(brave_path / "SingletonLock")
+    
+    @staticmethod
+    def _find_by_name(candidates: List[Path], name: str) -> Optional[Path]:
+        """Busca una carpeta por nombre entre candidates, o la toma como ruta"""
+        for item in candidates:
+            if item.name == name:
+                return item
+        path = Path(name)
+        return path if path.is_dir() else None
+    
+    @staticmethod
+    def _cmd_status(args) -> dict:
+        status = SystemUtils.get_status_info(BatchCLI._brave_path(args))
+        return {"ok": True, **status}
+    
+    @staticmethod
+    def _cmd_list(args) -> dict:
+        brave_path = BatchCLI._brave_path(args)
+        
+        backups = [
+            {"name": entry["name"], "path": entry["path"], "kind": entry["backup_kind"],
+             "base": entry["base"], "created_at": entry["created_at"], "size": entry["size"],
+             "profiles": entry["profiles"]}
+            for entry in Catalog.list_entries(Catalog.KIND_BACKUP)
+        ]
+        
+        profiles = [
+            {"folder": profile.folder_name, "name": profile.display_name, "path": str(profile.path)}
+            for profile in ProfileHandler.detect_profiles(brave_path)
+        ]
+        
+        saved = [
+            {"name": entry["name"], "path": entry["path"], "created_at": entry["created_at"],
+             "size": entry["size"], "files": [f"{profile}.json" for profile in entry["profiles"]]}
+            for entry in Catalog.list_entries(Catalog.KIND_SAVED)
+        ]
+        
+        return {"ok": True, "brave_path": str(brave_path), "profiles": profiles,
+                "backups": backups, "saved_configs": saved}
+    
+    @staticmethod
+    def _cmd_search(args) -> dict:
+        try:
+            results = Catalog.search(kind=args.kind, since=args.since, until=args.until, profile=args.profile,
+                                     min_size=args.min_size, max_size=args.max_size, key_path=args.key,
+                                     name=args.name, limit=args.limit)
+        except ValueError as e:  # fecha mal escrita
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "count": len(results), "results": results}
+    
+    @staticmethod
+    def _cmd_save(args) -> dict:
+        brave_path = BatchCLI._brave_path(args)
+        profiles = ProfileHandler.detect_profiles(brave_path)
+        if args.profile:
+            profiles = [profile for profile in profiles if profile.folder_name in args.profile]
+        if not profiles:
+            return {"ok": False, "error": f"No hay perfiles para guardar en {brave_path}"}
+        
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_name = args.name or "brave_all_profiles_config"
+        saved_path = BackupManager.get_saved_configs_dir() / f"{base_name}_{timestamp}"
+        saved_path.mkdir(parents=True, exist_ok=True)
+        
+        spec = ExtractionSpec.resolve(args.spec)
+        backup_path = None
+        with BatchCLI._service(args) as service:
+            if args.backup:
+                scope = BackupScope(profiles=[profile.folder_name for profile in profiles] if args.profile else [])
+                results, backup_path = service.run(service.save_with_backup(profiles, saved_path, spec,
+                                                                            brave_path, scope=scope))
+            else:
+                results = service.run(service.save(profiles, saved_path, spec))
+        saved = [result.folder_name for result in results if result.ok]
+        failed = [result.folder_name for result in results if not result.ok]
+        
+        result = {"ok": bool(saved), "path": str(saved_path), "saved": saved, "failed": failed,
+                  "results": [result.to_dict() for result in results]}
+        if args.backup:
+            result["backup"] = str(backup_path) if backup_path else None
+            result["ok"] = result["ok"] and backup_path is not None
+        return result
+    
+    @staticmethod
+    def _cmd_backup(args) -> dict:
+        brave_path = BatchCLI._brave_path(args)
+        with BatchCLI._service(args) as service:
+            backup_path = service.run(service.backup(
+                brave_path, incremental=args.incremental, verify_hash=args.verify_hash,
+                archive=args.archive, codec=args.codec,
+                scope=BackupScope(profiles=args.profile or [], exclude_caches=not args.include_caches,
+                                  exclude=args.exclude)
+            ))
+        if not backup_path:
+            return {"ok": False, "error": f"No se pudo crear el backup de {brave_path}"}
+        
+        info = BackupManager.load_backup_info(backup_path) or {}
+        result = {"ok": True, "name": backup_path.name, "path": str(backup_path), **info}
+        
+        policy = BatchCLI._retention_policy(args)
+        if not policy.is_empty:
+            plan, _ = RetentionEngine.prune(policy)
+            result["retention"] = plan.to_dict()
+        return result
+    
+    @staticmethod
+    def _retention_policy(args) -> RetentionPolicy:
+        return RetentionPolicy(keep_last=args.keep_last, keep_hourly=args.keep_hourly, keep_daily=args.keep_daily,
+                               keep_weekly=args.keep_weekly, keep_monthly=args.keep_monthly,
+                               max_total_bytes=args.max_total_size)
+    
+    @staticmethod
+    def _cmd_prune(args) -> dict:
+        policy = BatchCLI._retention_policy(args)
+        if policy.is_empty:
+            return {"ok": False, "error": "Indicá al menos una regla (--keep-* o --max-total-size)"}
+        # El borrado sigue en segundo plano; el proceso espera a que termine antes de salir
+        plan, _ = RetentionEngine.prune(policy, dry_run=args.dry_run)
+        return {"ok": True, "dry_run": args.dry_run, "policy": policy.to_dict(), **plan.to_dict()}
+    
+    @staticmethod
+    def _cmd_restore(args) -> dict:
+        brave_path = BatchCLI._brave_path(args)
+        if BatchCLI._brave_running(brave_path) and not args.force:
+            return {"ok": False, "error": "Brave parece estar abierto (SingletonLock); cerralo o usá --force"}
+        
+        if args.backup:
+            if args.backup == "latest":
+                backup = BackupManager.find_latest_backup(brave_path)
+            else:
+                backup = BatchCLI._find_by_name(BackupManager.list_available_backups(), args.backup)
+            if not backup and args.backup == "latest":
+                return {"ok": False, "error": f"No hay backups completos de {brave_path}"}
+            if not backup:
+                return {"ok": False, "error": f"No se encontró el backup: {args.backup}"}
+            
+            with BatchCLI._service(args) as service:
+                stats = service.run(service.restore_backup(backup, brave_path, allow_partial=args.allow_partial))
+            return {"ok": not stats.errors, "backup": backup.name, "target": str(brave_path),
+                    "files": stats.files, "bytes": stats.bytes, "errors": stats.errors}
+        
+        saved = BatchCLI._find_by_name(BackupManager.list_saved_configurations(), args.saved)
+        if not saved:
+            return {"ok": False, "error": f"No se encontró la configuración guardada: {args.saved}"}
+        
+        if not args.profile:
+            with BatchCLI._service(args) as service:
+                stats = service.run(service.restore_directory(saved, brave_path,
+                                                              allow_partial=args.allow_partial))
+            return {"ok": not stats.errors, "saved": saved.name, "target": str(brave_path),
+                    "files": stats.files, "bytes": stats.bytes, "errors": stats.errors}
+        
+        profile_path = brave_path / args.profile
+        if not profile_path.is_dir():
+            return {"ok": False, "error": f"No existe el perfil: {args.profile}"}
+        
+        config_json = ExtractionEngine.find_config_json(saved, args.profile)
+        if not config_json:
+            return {"ok": False, "error": f"{saved.name} no tiene configuración JSON"}
+        
+        config_data = JsonBackend.load(config_json)
+        
+        patch = ExtractionEngine.patch_preferences(config_data, profile_path / "Preferences")
+        if patch is None:
+            return {"ok": False, "error": f"No se pudo aplicar {config_json.name} a {args.profile}"}
+        return {"ok": True, "saved": saved.name, "config": config_json.name, "profile": args.profile,
+                "written": not patch.is_empty, "changes": patch.to_dict(include_values=False)}
+    
+    @staticmethod
+    def _cmd_diff(args) -> dict:
+        from core.diff_engine import DiffEngine
+        
+        old = DiffEngine.load_side(args.old, args.profile)
+        # Un perfil en vivo se extrae con la misma especificación que la configuración de referencia
+        new = DiffEngine.load_side(args.new, args.profile, spec=DiffEngine.spec_of(old))
+        result = DiffEngine.diff_configs(old, new)
+        return {"ok": True, "identical": result.is_empty, "total": result.total,
+                **result.to_dict(include_values=not args.paths_only)}
+    
+    @staticmethod
+    def _cmd_watch(args) -> dict:
+        """
+        Corre hasta Ctrl+C o SIGTERM. Cada snapshot sale en su propio renglón
+        JSON ({"event": "snapshot", ...}) y al final el resumen, como siempre
+        """
+        from core.config_watcher import ConfigWatcher
+        
+        def on_snapshot(folder: str, path: Path):
+            print(JsonBackend.dumps({"event": "snapshot", "profile": folder, "path": str(path)}, compact=True),
+                  file=sys.__stdout__, flush=True)
+        
+        watcher = ConfigWatcher(BatchCLI._brave_path(args), spec=ExtractionSpec.resolve(args.spec),
+                                profiles=args.profile, name=args.name, debounce=args.debounce,
+                                poll_interval=args.interval, use_inotify=not args.poll, on_snapshot=on_snapshot)
+        stop = threading.Event()
+        previous = signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        try:
+            stats = watcher.run(stop)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        return {"ok": True, **stats}
+    
+    @staticmethod
+    def _cmd_fleet(args) -> dict:
+        from core.fleet import FleetManager
+        
+        homes = FleetManager.discover_homes(args.homes or FleetManager.DEFAULT_ROOTS)
+        if not homes:
+            return {"ok": False, "error": "No se encontraron usuarios con configuración de Brave"}
+        
+        backup_options = {"incremental": args.incremental, "archive": args.archive, "codec": args.codec}
+        report = FleetManager.run(homes, args.output, workers=args.workers, save=not args.no_save,
+                                  backup=not args.no_backup, backup_options=backup_options,
+                                  spec=ExtractionSpec.resolve(args.spec))
+        return {"ok": report["summary"]["failed"] == 0, **report}
@@ -6,9 +6,14 @@ import shutil
 from pathlib import Path
 from typing import Optional
 
+from core.async_service import AsyncService
 from core.profile_handler import ProfileHandler
 from core.extraction_engine import ExtractionEngine
+from models.profile import BackupScope
 from storage.backup_manager import BackupManager
+from storage.copy_engine import OperationCancelled
+from storage.catalog import Catalog
+from utils.json_backend import JsonBackend
 from utils.system_utils import SystemUtils
 ask_yes_no = SystemUtils.ask_yes_no
 
@@ -16,6 +21,8 @@ ask_yes_no = SystemUtils.ask_yes_no
 class MenuManager:
     """Gestiona todos los menús interactivos"""
     
+    FILTER_THRESHOLD = 15  # a partir de cuántas configuraciones guardadas se ofrece filtrar
+    
     @staticmethod
     def show_main_menu(status: dict):
         """Muestra el menú principal"""
@@ -77,13 +84,34 @@ class MenuManager:
             input("Presioná Enter para continuar...")
             return False
     
+    @staticmethod
+    def _extract_with_backup(profiles: list, saved_path: Path, with_backup: bool) -> Optional[list]:
+        """
+        Extrae los perfiles en saved_path y, si se pidió, respalda al mismo tiempo
+        
+        El backup y la extracción no dependen uno del otro: se solapan en el
+        servicio asíncrono en lugar de esperar a que termine el backup.
+        
+        Returns:
+            Un ExtractionResult por perfil, o None si se canceló con Ctrl+C
+        """
+        with AsyncService() as service:
+            try:
+                if not with_backup:
+                    return service.run(service.save(profiles, saved_path))
+                results, backup_path = service.run(service.save_with_backup(profiles, saved_path))
+            except OperationCancelled:
+                print("\n❌ Operación cancelada")
+                return None
+        if not backup_path:
+            print("⚠️ No se pudo crear el backup")
+        return results
+    
     @staticmethod
     def _save_all_profiles(profiles: list) -> bool:
         """Guarda configuración de todos los perfiles"""
-        # Preguntar por backup
-        if ask_yes_no("¿Querés hacer backup antes de guardar?"):
-            if not BackupManager.create_backup():
-                print("⚠️ No se pudo crear el backup, continuando...")
+        # Preguntar por backup (se hace mientras se extraen los perfiles)
+        with_backup = ask_yes_no("¿Querés hacer backup antes de guardar?")
         
         # Elegir destino
         saved_path = MenuManager._choose_save_destination("brave_all_profiles_config")
@@ -91,23 +119,18 @@ class MenuManager:
             return False
         
         print(f"🔄 Guardando configuraciones de {len(profiles)} perfiles...")
+        results = MenuManager._extract_with_backup(profiles, saved_path, with_backup)
+        if results is None:
+            return False
         
         success_count = 0
-        for profile in profiles:
-            print(f"   👤 Procesando: {profile.display_name} ({profile.folder_name})")
-            
-            config = ExtractionEngine.extract_settings(profile.path)
-            if config:
-                json_filename = f"{profile.folder_name}.json"
-                json_path = saved_path / json_filename
-                
-                if ExtractionEngine.save_configuration(config, json_path):
-                    print(f"      ✅ Configuración extraída: {json_filename}")
-                    success_count += 1
-                else:
-                    print(f"      ❌ Error al guardar: {json_filename}")
+        for profile, result in zip(profiles, results):
+            print(f"   👤 {profile.display_name} ({profile.folder_name})")
+            if result.ok:
+                print(f"      ✅ Configuración extraída: {result.output_path.name} ({result.total_time:.2f}s)")
+                success_count += 1
             else:
-                print(f"      ❌ Error al extraer: {profile.display_name}")
+                print(f"      ❌ Error: {result.error}")
         
         if success_count > 0:
             print(f"✅ ¡Hecho! {success_count}/{len(profiles)} perfiles guardados en: {saved_path.name}")
@@ -131,10 +154,8 @@ class MenuManager:
             
             selected_profile = profiles[choice]
             
-            # Preguntar por backup
-            if ask_yes_no("¿Querés hacer backup antes de guardar?"):
-                if not BackupManager.create_backup():
-                    print("⚠️ No se pudo crear el backup, continuando...")
+            # Preguntar por backup (se hace mientras se extrae el perfil)
+            with_backup = ask_yes_no("¿Querés hacer backup antes de guardar?")
             
             # Elegir destino
             saved_path = MenuManager._choose_save_destination(f"brave_profile_config_{selected_profile.folder_name}")
@@ -143,19 +164,14 @@ class MenuManager:
             
             print(f"🔄 Guardando configuración del perfil: {selected_profile.display_name}")
             
-            config = ExtractionEngine.extract_settings(selected_profile.path)
-            if config:
-                json_filename = f"{selected_profile.folder_name}.json"
-                json_path = saved_path / json_filename
-                
-                if ExtractionEngine.save_configuration(config, json_path):
-                    print(f"✅ Perfil guardado: {json_filename}")
-                    return True
-                else:
-                    print(f"❌ Error al guardar perfil")
-                    return False
+            results = MenuManager._extract_with_backup([selected_profile], saved_path, with_backup)
+            if results is None:
+                return False
+            if results[0].ok:
+                print(f"✅ Perfil guardado: {results[0].output_path.name}")
+                return True
             else:
-                print(f"❌ Error al extraer configuración del perfil")
+                print(f"❌ Error al extraer configuración del perfil: {results[0].error}")
                 return False
                 
         except ValueError:
@@ -225,20 +241,18 @@ class MenuManager:
             else:
                 profiles_to_process = [profiles[choice - 1]]
             
+            print(f"\n📄 Extrayendo configuración de {len(profiles_to_process)} perfiles...")
+            results = MenuManager._extract_with_backup(profiles_to_process, saved_path, False)
+            if results is None:
+                return False
+            
             success_count = 0
-            for profile in profiles_to_process:
-                print(f"\n📄 Extrayendo configuración de: {profile.display_name}")
-                
-                config = ExtractionEngine.extract_settings(profile.path)
-                if config:
-                    output_file = saved_path / f"{profile.folder_name}.json"
-                    if ExtractionEngine.save_configuration(config, output_file):
-                        print(f"✅ Guardado: {output_file.name}")
-                        success_count += 1
-                    else:
-                        print(f"❌ Error al guardar: {profile.display_name}")
+            for profile, result in zip(profiles_to_process, results):
+                if result.ok:
+                    print(f"✅ Guardado: {result.output_path.name} ({result.total_time:.2f}s)")
+                    success_count += 1
                 else:
-                    print(f"❌ Error al extraer: {profile.display_name}")
+                    print(f"❌ Error al extraer {profile.display_name}: {result.error}")
             
             if success_count > 0:
                 print(f"\n✅ Configuración guardada en: {saved_path}")
@@ -330,6 +344,24 @@ class MenuManager:
             input("Presioná Enter para continuar...")
             return False
     
+    @staticmethod
+    def _filter_saved(saved_configs: list) -> list:
+        """Con muchas configuraciones guardadas, ofrece filtrarlas por perfil o clave antes de listarlas"""
+        if len(saved_configs) <= MenuManager.FILTER_THRESHOLD:
+            return saved_configs
+        
+        print(f"\n🔍 Hay {len(saved_configs)} configuraciones guardadas.")
+        text = input("   Filtrar por perfil (ej. Default) o clave (ej. brave.shields), Enter para ver todas: ").strip()
+        if not text:
+            return saved_configs
+        
+        by_profile = Catalog.search(Catalog.KIND_SAVED, profile=text)
+        matches = by_profile or Catalog.search(Catalog.KIND_SAVED, key_path=text)
+        if not matches:
+            print(f"⚠️ Ninguna coincide con '{text}', se muestran todas")
+            return saved_configs
+        return [Path(entry["path"]) for entry in matches]
+    
     @staticmethod
     def _restore_from_saved() -> bool:
         """Restaura configuración desde configuraciones guardadas"""
@@ -340,6 +372,8 @@ class MenuManager:
             input("Presioná Enter para continuar...")
             return False
         
+        saved_configs = MenuManager._filter_saved(saved_configs)
+        
         print("\n📦 CONFIGURACIONES GUARDADAS:")
         print("=" * 50)
         for i, saved in enumerate(saved_configs, 1):
@@ -408,12 +442,11 @@ class MenuManager:
                     print(f"\n📤 Restaurando configuración '{saved_name}' (global)...")
                     print(f"📍 Hacia: {brave_config}")
                     
-                    # Eliminar configuración actual
-                    if brave_config.exists():
-                        shutil.rmtree(brave_config)
-                    
-                    # Copiar configuración guardada
-                    shutil.copytree(selected_saved, brave_config)
+                    # Armar la configuración aparte e intercambiarla de una vez
+                    stats = AsyncService.run_once(
+                        lambda service: service.restore_directory(selected_saved, brave_config))
+                    for error in stats.errors:
+                        print(f"⚠️ No se pudo restaurar {error}")
                     
                     print(f"✅ Configuración global restaurada exitosamente!")
                     print("🔄 Podés abrir Brave Browser ahora")
@@ -427,9 +460,9 @@ class MenuManager:
                     # Aplicar a perfil específico
                     target_profile = current_profiles[profile_choice - 1]
                     
-                    # Hacer backup antes de restaurar
+                    # Hacer backup antes de restaurar (solo este perfil, sin cachés: tarda segundos)
                     if ask_yes_no("¿Querés hacer backup antes de restaurar el perfil?"):
-                        if not BackupManager.create_backup():
+                        if not BackupManager.create_backup(scope=BackupScope(profiles=[target_profile.folder_name])):
                             print("⚠️ No se pudo crear el backup, continuando...")
                     
                     print(f"\n📤 Aplicando configuración '{saved_name}' al perfil específico...")
@@ -437,38 +470,27 @@ class MenuManager:
                     
                     try:
                         # Buscar JSON de configuración en la carpeta guardada
-                        config_json = None
-                        for item in selected_saved.iterdir():
-                            if item.is_file() and item.suffix == '.json':
-                                config_json = item
-                                break
+                        config_json = ExtractionEngine.find_config_json(selected_saved)
                         
                         if not config_json:
                             print("❌ No se encontró configuración JSON para restaurar")
                             return False
                         
                         # Leer configuración desde JSON
-                        import json
-                        with open(config_json, 'r', encoding='utf-8') as f:
-                            config_data = json.load(f)
+                        config_data = JsonBackend.load(config_json)
                         
-                        # Leer Preferences actual del perfil
+                        # Escribir solo las claves que difieren del perfil
                         prefs_file = target_profile.path / "Preferences"
-                        current_prefs = {}
-                        if prefs_file.exists():
-                            with open(prefs_file, 'r', encoding='utf-8') as f:
-                                current_prefs = json.load(f)
-                        
-                        # Actualizar solo la sección brave
-                        if 'brave_settings' in config_data:
-                            current_prefs['brave'] = config_data['brave_settings']
-                        if 'keyboard_shortcuts' in config_data:
-                            current_prefs['shortcuts'] = config_data['keyboard_shortcuts']
+                        patch = ExtractionEngine.patch_preferences(config_data, prefs_file)
+                        if patch is None:
+                            return False
                         
-                        # Guardar configuración actualizada
-                        with open(prefs_file, 'w', encoding='utf-8') as f:
-                            json.dump(current_prefs, f, indent=2)
+                        if patch.is_empty:
+                            print(f"✅ El perfil '{target_profile.display_name}' ya tiene esta configuración, no hubo cambios")
+                            return True
                         
+                        print(f"   📝 {len(patch.added)} agregadas, {len(patch.changed)} modificadas, "
+                              f"{len(patch.removed)} eliminadas")
                         print(f"✅ Configuración aplicada al perfil '{target_profile.display_name}'!")
                         print("🔄 Podés abrir Brave Browser ahora")
                         return True
@@ -510,15 +532,17 @@ class MenuManager:
         print("=" * 50)
         for i, backup in enumerate(backups, 1):
             backup_name = backup.name.replace("brave_backup_", "")
+            label = backup_name
             if len(backup_name) >= 14 and backup_name[8] == "_":
                 try:
                     dt = datetime.datetime.strptime(backup_name, "%Y%m%d_%H%M%S")
-                    formatted_time = dt.strftime("%d/%m/%Y %H:%M:%S")
-                    print(f"  {i}. {formatted_time}")
+                    label = dt.strftime("%d/%m/%Y %H:%M:%S")
                 except:
-                    print(f"  {i}. {backup_name}")
-            else:
-                print(f"  {i}. {backup_name}")
+                    pass
+            
+            # Mostrar de qué backup depende si es incremental
+            chain = BackupManager.describe_backup(backup)
+            print(f"  {i}. {label}" + (f"  ↳ {chain}" if chain else ""))
         
         print(f"  {len(backups) + 1}. Volver")
         print("=" * 50)
@@ -552,12 +576,11 @@ class MenuManager:
             print(f"\n📤 Restaurando backup '{backup_name}'...")
             print(f"📍 Hacia: {brave_config}")
             
-            # Eliminar configuración actual
-            if brave_config.exists():
-                shutil.rmtree(brave_config)
-            
-            # Copiar backup
-            shutil.copytree(selected_backup, brave_config)
+            # Reconstruir backup aparte (desde el almacén de objetos si es deduplicado) e intercambiarlo
+            stats = AsyncService.run_once(
+                lambda service: service.restore_backup(selected_backup, brave_config))
+            for error in stats.errors:
+                print(f"⚠️ No se pudo restaurar {error}")
             
             print(f"✅ Backup restaurado exitosamente!")
             print("🔄 Podés abrir Brave Browser ahora")
@@ -665,12 +688,11 @@ class MenuManager:
                 if not BackupManager.create_backup():
                     print("⚠️ No se pudo crear el backup, continuando...")
             
-            # Eliminar carpeta de configuración
-            if target_config.exists():
-                shutil.rmtree(target_config)
-            
-            # Copiar configuración guardada
-            shutil.copytree(selected_saved, target_config)
+            # Copiar configuración guardada aparte e intercambiarla de una vez
+            stats = AsyncService.run_once(
+                lambda service: service.restore_directory(selected_saved, target_config))
+            for error in stats.errors:
+                print(f"⚠️ No se pudo copiar {error}")
             print(f"✅ Configuración '{target_config.name}' reemplazada con configuración guardada '{saved_name}'!")
             
             return True
@@ -696,15 +718,17 @@ class MenuManager:
         print("=" * 50)
         for i, backup in enumerate(backups, 1):
             backup_name = backup.name.replace("brave_backup_", "")
+            label = backup_name
             if len(backup_name) >= 14 and backup_name[8] == "_":
                 try:
                     dt = datetime.datetime.strptime(backup_name, "%Y%m%d_%H%M%S")
-                    formatted_time = dt.strftime("%d/%m/%Y %H:%M:%S")
-                    print(f"  {i}. {formatted_time}")
+                    label = dt.strftime("%d/%m/%Y %H:%M:%S")
                 except:
-                    print(f"  {i}. {backup_name}")
-            else:
-                print(f"  {i}. {backup_name}")
+                    pass
+            
+            # Mostrar de qué backup depende si es incremental
+            chain = BackupManager.describe_backup(backup)
+            print(f"  {i}. {label}" + (f"  ↳ {chain}" if chain else ""))
         
         print(f"  {len(backups) + 1}. Volver")
         print("=" * 50)
@@ -748,12 +772,10 @@ class MenuManager:
                 if not BackupManager.create_backup():
                     print("⚠️ No se pudo crear el backup, continuando...")
             
-            # Eliminar carpeta de configuración
-            if target_config.exists():
-                shutil.rmtree(target_config)
-            
-            # Copiar backup a la configuración
-            shutil.copytree(selected_backup, target_config)
+            # Reconstruir backup aparte (reflink o copia desde el almacén) e intercambiarlo
+            stats = AsyncService.run_once(lambda service: service.restore_backup(selected_backup, target_config))
+            for error in stats.errors:
+                print(f"⚠️ No se pudo restaurar {error}")
             print(f"✅ Configuración '{target_config.name}' reemplazada con backup '{backup_name}'!")
             
             return True
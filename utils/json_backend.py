@@ -0,0 +1,182 @@
+"""
+Capa única de serialización JSON (orjson / ujson / json)
+"""
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Optional, Union
+
+from utils.tracing import Tracer
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se prueba ujson y después la biblioteca estándar
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JsonBackend:
+    """
+    Lee y escribe JSON con el codec más rápido instalado.
+    
+    Orden de preferencia: orjson, ujson, json de la biblioteca estándar. La
+    variable de entorno BRAVE_CM_JSON ("orjson", "ujson" o "json") fuerza uno.
+    Hay dos formatos de salida: legible (indentado a 2 espacios, como siempre
+    se guardaron las configuraciones) y compacto (sin espacios, para
+    Preferences, índices y manifiestos). Si el codec rápido no puede con un
+    valor (ej. enteros de más de 64 bits), se reintenta con json.
+    """
+    
+    ENV_VAR = "BRAVE_CM_JSON"
+    
+    name: Optional[str] = None  # codec elegido (se fija al importar el módulo)
+    
+    @staticmethod
+    def _choose() -> str:
+        forced = os.environ.get(JsonBackend.ENV_VAR, "").strip().lower()
+        available = {"orjson": orjson is not None, "ujson": ujson is not None, "json": True}
+        if forced:
+            if not available.get(forced):
+                raise RuntimeError(f"{JsonBackend.ENV_VAR}={forced}: el codec no está instalado")
+            return forced
+        return next(name for name, ok in available.items() if ok)
+    
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        """
+        Parsea un documento JSON
+        
+        Args:
+            data: Contenido en bytes (UTF-8) o str
+        
+        Returns:
+            Valor decodificado
+        """
+        if Tracer.enabled:
+            Tracer.count("json_bytes", len(data))
+        if JsonBackend.name == "orjson":
+            return orjson.loads(data)
+        if JsonBackend.name == "ujson":
+            return ujson.loads(data)
+        return json.loads(data)
+    
+    @staticmethod
+    def dumpb(obj: Any, compact: bool = False, default: Optional[Callable] = None) -> bytes:
+        """
+        Serializa a bytes UTF-8 (sin escapar caracteres no ASCII)
+        
+        Args:
+            obj: Valor a serializar
+            compact: Sin indentación ni espacios
+            default: Conversión para tipos no serializables (ej. str)
+        
+        Returns:
+            Documento JSON
+        """
+        try:
+            if JsonBackend.name == "orjson":
+                return orjson.dumps(obj, default=default, option=0 if compact else orjson.OPT_INDENT_2)
+            if JsonBackend.name == "ujson":
+                text = ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False,
+                                   indent=0 if compact else 2, default=default)
+                return text.encode('utf-8')
+        except (TypeError, ValueError, OverflowError):
+            pass
+        if compact:
+            text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=default)
+        else:
+            text = json.dumps(obj, ensure_ascii=False, indent=2, default=default)
+        return text.encode('utf-8')
+    
+    @staticmethod
+    def dumps(obj: Any, compact: bool = False, default: Optional[Callable] = None) -> str:
+        """Serializa a str (ver dumpb)"""
+        return JsonBackend.dumpb(obj, compact, default).decode('utf-8')
+    
+    @staticmethod
+    def load(path: Path) -> Any:
+        """
+        Lee y parsea un archivo JSON
+        
+        Args:
+            path: Archivo a leer
+        
+        Returns:
+            Valor decodificado
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        with Tracer.span("json.parse"):
+            return JsonBackend.loads(data)
+    
+    @staticmethod
+    def dump(obj: Any, path: Path, compact: bool = False):
+        """
+        Serializa y escribe un archivo JSON
+        
+        Args:
+            obj: Valor a serializar
+            path: Archivo destino (se sobrescribe)
+            compact: Sin indentación ni espacios
+        """
+        data = JsonBackend.dumpb(obj, compact)
+        with open(path, 'wb') as f:
+            f.write(data)
+    
+    @staticmethod
+    def dump_atomic(obj: Any, path: Path, compact: bool = False):
+        """
+        Escribe un archivo JSON de forma atómica (temporal en la misma carpeta + rename)
+        
+        Quien lea el archivo ve la versión vieja o la nueva completa, nunca una
+        a medio escribir. Se conservan los permisos del archivo original.
+        
+        Args:
+            obj: Valor a serializar
+            path: Archivo destino (se reemplaza)
+            compact: Sin indentación ni espacios
+        """
+        data = JsonBackend.dumpb(obj, compact)
+        with JsonBackend.open_atomic(path) as f:
+            f.write(data)
+    
+    @staticmethod
+    @contextmanager
+    def open_atomic(path: Path) -> Iterator[BinaryIO]:
+        """
+        Abre un temporal para escribir path de a partes y lo reemplaza al cerrar (ver dump_atomic)
+        
+        Si el bloque lanza una excepción, el temporal se borra y path queda intacto.
+        
+        Args:
+            path: Archivo destino
+        
+        Yields:
+            Archivo binario abierto para escritura
+        """
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise
+
+
+JsonBackend.name = JsonBackend._choose()
\ No newline at end of file
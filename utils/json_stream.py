@@ -0,0 +1,337 @@
+"""
+Lectura incremental de JSON: recorrer un documento grande sin cargarlo entero
+"""
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from utils.json_backend import JsonBackend
+from utils.tracing import Tracer
+
+
+class JsonStream:
+    """
+    Cursor sobre un documento JSON que se lee de a bloques.
+    
+    En lugar de armar el árbol completo (json.load), quien recorre decide
+    valor por valor: iter_object() entrega las claves de un objeto y, para
+    cada una, se llama a skip() (se descarta sin crear objetos), read() (se
+    parsea solo ese subárbol con JsonBackend) o copy_to() (se copian sus
+    bytes tal cual). En memoria queda el bloque actual más lo que se lee con
+    read(): el consumo depende de lo que se extrae, no del tamaño del
+    archivo.
+    
+    Descartar es recorrer bytes con expresiones regulares (cadenas y
+    corchetes), así que para archivos chicos es más rápido el parseo completo
+    con orjson: los helpers de clase eligen según STREAM_THRESHOLD.
+    """
+    
+    CHUNK_SIZE = 256 * 1024
+    STREAM_THRESHOLD = 4 * 1024 * 1024  # Preferences más grandes que esto se recorren por bloques
+    
+    _WS = re.compile(rb'[ \t\n\r]*')
+    _STRING_TAIL = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.S)  # desde después de la comilla de apertura
+    # Lo que se puede saltear sin contar corchetes en Python: texto fuera de cadenas, cadenas
+    # completas (pueden tener corchetes) y objetos o listas de hasta dos niveles. Cada carácter
+    # tiene una sola forma de coincidir, así un fallo no dispara backtracking exponencial.
+    _STRING_RE = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+    _FLAT_RE = rb'\[(?:[^"{}\[\]]|%s)*\]|\{(?:[^"{}\[\]]|%s)*\}' % (_STRING_RE, _STRING_RE)
+    _NESTED_RE = rb'\[(?:[^"{}\[\]]|%s|%s)*\]|\{(?:[^"{}\[\]]|%s|%s)*\}' % ((_STRING_RE, _FLAT_RE) * 2)
+    _UNTIL_BRACKET = re.compile(rb'(?:[^"{}\[\]]+|%s|%s)*' % (_STRING_RE, _NESTED_RE), re.S)
+    _SCALAR = re.compile(rb'[^ \t\n\r,\]}]*')
+    
+    _QUOTE, _COLON, _COMMA = ord('"'), ord(':'), ord(',')
+    _OPEN_OBJECT, _CLOSE_OBJECT, _OPEN_ARRAY = ord('{'), ord('}'), ord('[')
+    
+    def __init__(self, file: BinaryIO, chunk_size: int = CHUNK_SIZE):
+        """
+        Args:
+            file: Archivo abierto en modo binario
+            chunk_size: Bytes por lectura
+        """
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buf = b""
+        self._pos = 0
+        self._eof = False
+        # Mientras se captura un valor, lo consumido se entrega a _sink antes de descartarlo
+        self._sink: Optional[Callable[[bytes], Any]] = None
+        self._sink_start = 0
+        self.bytes_read = 0
+    
+    @staticmethod
+    @contextmanager
+    def open(path: Path) -> Iterator['JsonStream']:
+        """Abre un archivo JSON como JsonStream (usar con with)"""
+        with Tracer.span("json.stream"), open(path, 'rb') as f:
+            stream = JsonStream(f)
+            try:
+                yield stream
+            finally:
+                Tracer.count("json_stream_bytes", stream.bytes_read)
+    
+    @staticmethod
+    def should_stream(path: Path) -> bool:
+        """Indica si conviene recorrer path por bloques en lugar de parsearlo entero"""
+        try:
+            return os.stat(path).st_size > JsonStream.STREAM_THRESHOLD
+        except OSError:
+            return False
+    
+    # --- lectura del buffer ---
+    
+    def _error(self, message: str) -> ValueError:
+        offset = self.bytes_read - len(self._buf) + self._pos
+        return ValueError(f"JSON inválido cerca del byte {offset}: {message}")
+    
+    def _fill(self) -> bool:
+        """Descarta lo consumido y lee otro bloque (False si el archivo terminó)"""
+        if self._eof:
+            return False
+        if self._sink is not None:
+            self._sink(self._buf[self._sink_start:self._pos])
+            self._sink_start = 0
+        # Lo pendiente sin consumir (un token partido) puede ser largo: leer al menos otro tanto
+        pending = len(self._buf) - self._pos
+        chunk = self._file.read(max(self._chunk_size, pending))
+        self.bytes_read += len(chunk)
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+        return bool(chunk)
+    
+    def _peek(self) -> int:
+        """Primer byte del próximo token (saltea espacios)"""
+        while True:
+            self._pos = self._WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise self._error("el documento termina antes de tiempo")
+    
+    def _skip_string(self) -> int:
+        """Saltea la cadena que empieza en la posición actual y devuelve dónde empezaba"""
+        while True:
+            match = self._STRING_TAIL.match(self._buf, self._pos + 1)
+            if match:
+                start, self._pos = self._pos, match.end()
+                return start
+            if not self._fill():
+                raise self._error("cadena sin cerrar")
+    
+    def _skip_container(self):
+        """Saltea un objeto o lista completos contando corchetes (las cadenas se saltean enteras)"""
+        self._pos += 1
+        depth = 1
+        while True:
+            self._pos = self._UNTIL_BRACKET.match(self._buf, self._pos).end()
+            # Se frenó al final del bloque o en una cadena que sigue en el próximo
+            if self._pos >= len(self._buf) or self._buf[self._pos] == self._QUOTE:
+                if not self._fill():
+                    raise self._error("objeto o lista sin cerrar")
+                continue
+            char = self._buf[self._pos]
+            self._pos += 1
+            depth += 1 if char in (self._OPEN_OBJECT, self._OPEN_ARRAY) else -1
+            if depth == 0:
+                return
+    
+    def _skip_scalar(self):
+        """Saltea un número, true, false o null"""
+        while True:
+            end = self._SCALAR.match(self._buf, self._pos).end()
+            if end < len(self._buf) or self._eof:
+                if end == self._pos:
+                    raise self._error("se esperaba un valor")
+                self._pos = end
+                return
+            self._fill()
+    
+    def _read_key(self) -> str:
+        start = self._skip_string()
+        raw = self._buf[start:self._pos]
+        if b'\\' in raw:
+            return JsonBackend.loads(raw)
+        return raw[1:-1].decode('utf-8')
+    
+    # --- recorrido ---
+    
+    def peek_type(self) -> str:
+        """Tipo del próximo valor: "object", "array", "string" o "scalar" (número, true, false, null)"""
+        char = self._peek()
+        if char == self._OPEN_OBJECT:
+            return "object"
+        if char == self._OPEN_ARRAY:
+            return "array"
+        if char == self._QUOTE:
+            return "string"
+        return "scalar"
+    
+    def iter_object(self) -> Iterator[str]:
+        """
+        Recorre las claves del objeto que sigue
+        
+        Después de recibir cada clave hay que consumir su valor (skip, read,
+        copy_to o recorrerlo con iter_object) antes de pedir la siguiente.
+        
+        Yields:
+            Claves del objeto, en el orden del documento
+        """
+        if self._peek() != self._OPEN_OBJECT:
+            raise self._error("se esperaba un objeto")
+        self._pos += 1
+        if self._peek() == self._CLOSE_OBJECT:
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != self._QUOTE:
+                raise self._error("se esperaba una clave")
+            key = self._read_key()
+            if self._peek() != self._COLON:
+                raise self._error("se esperaba ':'")
+            self._pos += 1
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == self._CLOSE_OBJECT:
+                return
+            if char != self._COMMA:
+                raise self._error("se esperaba ',' o '}'")
+    
+    def skip(self):
+        """Descarta el próximo valor sin construirlo"""
+        char = self._peek()
+        if char == self._QUOTE:
+            self._skip_string()
+        elif char in (self._OPEN_OBJECT, self._OPEN_ARRAY):
+            self._skip_container()
+        else:
+            self._skip_scalar()
+    
+    def copy_to(self, write: Callable[[bytes], Any]):
+        """
+        Copia los bytes del próximo valor tal cual, sin parsearlo
+        
+        Args:
+            write: Recibe el valor en uno o más pedazos (ej. archivo.write)
+        """
+        self._peek()
+        self._sink, self._sink_start = write, self._pos
+        try:
+            self.skip()
+            write(self._buf[self._sink_start:self._pos])
+        finally:
+            self._sink = None
+    
+    def read(self) -> Any:
+        """Parsea y devuelve el próximo valor (solo ese subárbol)"""
+        parts = []
+        self.copy_to(parts.append)
+        return JsonBackend.loads(parts[0] if len(parts) == 1 else b"".join(parts))
+    
+    def find(self, keys: Sequence[str], default: Any = None) -> Any:
+        """
+        Valor en una ruta de claves del próximo objeto, leyendo solo hasta encontrarlo
+        
+        Args:
+            keys: Ruta (ej. ("profile", "name"))
+            default: Si la ruta no existe
+        """
+        for wanted in keys:
+            if self.peek_type() != "object":
+                return default
+            for key in self.iter_object():
+                if key == wanted:
+                    break
+                self.skip()
+            else:
+                return default
+        return self.read()
+    
+    # --- archivos completos ---
+    
+    @staticmethod
+    def get(path: Path, keys: Sequence[str], default: Any = None) -> Any:
+        """
+        Valor en una ruta de claves de un archivo JSON
+        
+        Args:
+            path: Archivo (ej. Preferences)
+            keys: Ruta (ej. ("profile", "name"))
+            default: Si la ruta no existe
+        """
+        if JsonStream.should_stream(path):
+            with JsonStream.open(path) as stream:
+                return stream.find(keys, default)
+        value = JsonBackend.load(path)
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+    
+    @staticmethod
+    def read_keys(path: Path, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Lee solo algunas claves de primer nivel de un objeto JSON
+        
+        Args:
+            path: Archivo con un objeto JSON
+            keys: Claves a leer
+        
+        Returns:
+            {clave: valor} de las que existen
+        """
+        keys = set(keys)
+        with JsonStream.open(path) as stream:
+            values = {}
+            for key in stream.iter_object():
+                if key in keys:
+                    values[key] = stream.read()
+                else:
+                    stream.skip()
+            return values
+    
+    @staticmethod
+    def splice(path: Path, updates: Dict[str, Any], deleted: Iterable[str] = ()):
+        """
+        Reescribe un objeto JSON cambiando solo algunas claves de primer nivel
+        
+        El resto de las claves se copian byte a byte sin parsearlas, en su
+        orden original; las claves nuevas van al final, en formato compacto.
+        El archivo se reemplaza de forma atómica.
+        
+        Args:
+            path: Archivo con un objeto JSON
+            updates: {clave: valor nuevo}
+            deleted: Claves a quitar
+        """
+        updates = dict(updates)
+        dropped = set(deleted) | set(updates)
+        
+        with JsonStream.open(path) as stream, JsonBackend.open_atomic(path) as out:
+            out.write(b"{")
+            first = True
+            for key in stream.iter_object():
+                if key in dropped:
+                    stream.skip()
+                    if key not in updates:
+                        continue
+                if not first:
+                    out.write(b",")
+                first = False
+                out.write(JsonBackend.dumpb(key))
+                out.write(b":")
+                if key in dropped:
+                    out.write(JsonBackend.dumpb(updates.pop(key), compact=True))
+                else:
+                    stream.copy_to(out.write)
+            for key, value in updates.items():
+                if not first:
+                    out.write(b",")
+                first = False
+                out.write(JsonBackend.dumpb(key) + b":" + JsonBackend.dumpb(value, compact=True))
+            out.write(b"}")
\ No newline at end of file
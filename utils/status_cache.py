@@ -0,0 +1,90 @@
+"""
+Caché del estado mostrado en el menú principal
+"""
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from utils.system_utils import SystemUtils
+
+
+class StatusCache:
+    """
+    Mantiene una foto del estado del sistema y la recalcula solo si algo cambió.
+    
+    La validez se decide con una huella de mtimes: el directorio de Brave, las
+    carpetas backup/, saved_configs/, Linux/ y Windows/ del repo, y cada una de
+    sus subcarpetas directas (una config guardada cuenta solo si tiene JSONs,
+    y agregar uno cambia el mtime de su carpeta). Calcular la huella cuesta un
+    par de listados de directorio, en vez de detectar perfiles y recorrer
+    backups y configuraciones en cada vuelta del menú.
+    """
+    
+    def __init__(self):
+        self._status: Optional[dict] = None
+        self._fingerprint: Optional[Tuple] = None
+    
+    @staticmethod
+    def _watched_dirs() -> Tuple[List[Path], List[Path]]:
+        """
+        Obtiene los directorios que determinan el estado
+        
+        Returns:
+            (directorios cuyo listado importa, directorios cuyas subcarpetas también importan)
+        """
+        from core.profile_handler import ProfileHandler
+        
+        current_dir = Path.cwd()
+        flat = [ProfileHandler.get_brave_config_path(), current_dir / "backup"]
+        nested = [current_dir / "saved_configs", current_dir / "Linux", current_dir / "Windows"]
+        return flat, nested
+    
+    @staticmethod
+    def compute_fingerprint() -> Tuple:
+        """
+        Calcula la huella de mtimes de los directorios observados
+        
+        Returns:
+            Tupla comparable; cambia si se agregan, quitan o modifican entradas
+        """
+        fingerprint = []
+        flat, nested = StatusCache._watched_dirs()
+        
+        for directory in flat:
+            try:
+                fingerprint.append((str(directory), os.stat(directory).st_mtime_ns))
+            except OSError:
+                fingerprint.append((str(directory), None))
+        
+        for directory in nested:
+            try:
+                fingerprint.append((str(directory), os.stat(directory).st_mtime_ns))
+                with os.scandir(directory) as it:
+                    children = sorted(
+                        (entry.name, entry.stat().st_mtime_ns)
+                        for entry in it if entry.is_dir()
+                    )
+                fingerprint.append(tuple(children))
+            except OSError:
+                fingerprint.append((str(directory), None))
+        
+        return tuple(fingerprint)
+    
+    def get_status(self) -> dict:
+        """
+        Obtiene el estado del sistema, recalculándolo solo si cambió la huella
+        
+        Returns:
+            Diccionario con información del estado (ver SystemUtils.get_status_info)
+        """
+        fingerprint = StatusCache.compute_fingerprint()
+        if self._status is None or fingerprint != self._fingerprint:
+            # Guardar la huella previa al cálculo: un cambio concurrente invalida la próxima consulta
+            self._status = SystemUtils.get_status_info()
+            self._fingerprint = fingerprint
+        return self._status
+    
+    def invalidate(self):
+        """Fuerza el recálculo en la próxima consulta"""
+        self._status = None
+        self._fingerprint = None
\ No newline at end of file
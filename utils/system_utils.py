@@ -4,7 +4,7 @@ Utilidades del sistema
 import os
 import platform
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 
 
 class SystemUtils:
@@ -28,6 +28,13 @@ class SystemUtils:
         """Limpia la pantalla según el sistema operativo"""
         os.system('cls' if platform.system().lower() == 'windows' else 'clear')
     
+    @staticmethod
+    def get_cache_dir() -> Path:
+        """Obtiene el directorio de cachés e índices internos"""
+        cache_dir = Path.cwd() / ".cache"
+        cache_dir.mkdir(exist_ok=True)
+        return cache_dir
+    
     @staticmethod
     def ask_yes_no(question: str) -> bool:
         """
@@ -49,18 +56,21 @@ class SystemUtils:
                 print("❌ Por favor respondé Sí o No")
     
     @staticmethod
-    def get_status_info() -> dict:
+    def get_status_info(brave_path: Optional[Path] = None) -> dict:
         """
         Obtiene información del estado actual del sistema
         
+        Args:
+            brave_path: Directorio de Brave (por defecto el del usuario actual)
+        
         Returns:
             Diccionario con información del estado
         """
         from core.profile_handler import ProfileHandler
         from storage.backup_manager import BackupManager
         
-        brave_path = ProfileHandler.get_brave_config_path()
-        profiles = ProfileHandler.detect_profiles(brave_path)
+        brave_path = brave_path or ProfileHandler.get_brave_config_path()
+        profiles = ProfileHandler.list_profile_dirs(brave_path)
         backups = BackupManager.list_available_backups()
         saved = BackupManager.list_saved_configurations()
         brave_configs = ProfileHandler.find_brave_configurations(Path.cwd())
@@ -0,0 +1,357 @@
+"""
+Trazas de tiempo por operación (spans anidados, contadores y cProfile opcional)
+"""
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class _SpanStats:
+    """Acumulado de todas las llamadas a un mismo camino de spans"""
+    __slots__ = ("calls", "total", "child", "counters")
+    
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.child = 0.0
+        self.counters: Dict[str, int] = {}
+
+
+class _Span:
+    """Context manager de un span activo (solo se crea con la traza prendida)"""
+    __slots__ = ("name", "path", "started", "child")
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        stack = Tracer._stack()
+        self.path = (stack[-1].path if stack else Tracer._base()) + (self.name,)
+        self.child = 0.0
+        stack.append(self)
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        stack = Tracer._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        with Tracer._lock:
+            stats = Tracer._spans.get(self.path)
+            if stats is None:
+                stats = Tracer._spans[self.path] = _SpanStats()
+            stats.calls += 1
+            stats.total += elapsed
+            stats.child += self.child
+        return False
+
+
+class _NullSpan:
+    """Span que no hace nada: lo que devuelve Tracer.span() con la traza apagada"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+class Tracer:
+    """
+    Mide dónde se va el tiempo de una operación sin un profiler externo.
+    
+    Tracer.span("nombre") abre un span anidado dentro del span activo del
+    hilo; las llamadas repetidas al mismo camino se acumulan (cantidad,
+    tiempo total y tiempo propio, sin los spans hijos del mismo hilo).
+    Tracer.count() suma a un contador del span activo y al total general
+    (archivos, bytes, bytes de JSON parseados). Los spans de primer nivel
+    son las operaciones del reporte.
+    
+    Apagada (lo normal), span() devuelve siempre el mismo objeto vacío y
+    count() retorna al primer if: el costo es una llamada. Se prende con
+    --trace en main.py o con la variable BRAVE_CM_TRACE ("text" o "json",
+    más ",profile" para sumar cProfile, ej. "json,profile"). El reporte se
+    escribe al salir en stderr o en BRAVE_CM_TRACE_OUTPUT.
+    
+    Los hilos de un pool no heredan el span activo: las tareas que se
+    envían con Tracer.bind(fn) se cuelgan del span de quien las envió.
+    cProfile solo perfila el hilo principal.
+    """
+    
+    ENV_VAR = "BRAVE_CM_TRACE"
+    OUTPUT_ENV_VAR = "BRAVE_CM_TRACE_OUTPUT"
+    FORMATS = ("text", "json")
+    PROFILE_TOP = 25
+    
+    enabled = False
+    output_format = "text"
+    output_path: Optional[Path] = None
+    
+    _NULL = _NullSpan()
+    _lock = threading.Lock()
+    _local = threading.local()
+    _spans: Dict[Tuple[str, ...], _SpanStats] = {}
+    _counters: Dict[str, int] = {}
+    _profiler: Optional[cProfile.Profile] = None
+    _atexit_registered = False
+    
+    @staticmethod
+    def _stack() -> List[_Span]:
+        stack = getattr(Tracer._local, "stack", None)
+        if stack is None:
+            stack = Tracer._local.stack = []
+        return stack
+    
+    @staticmethod
+    def _base() -> Tuple[str, ...]:
+        """Camino heredado por una tarea enviada con bind() (vacío fuera de ellas)"""
+        return getattr(Tracer._local, "base", ())
+    
+    @staticmethod
+    def _current_path() -> Tuple[str, ...]:
+        stack = Tracer._stack()
+        return stack[-1].path if stack else Tracer._base()
+    
+    @staticmethod
+    def configure(enabled: bool = True, output_format: str = "text", profile: bool = False,
+                  output_path: Optional[Path] = None):
+        """
+        Prende o apaga la traza
+        
+        Args:
+            enabled: Registrar spans y contadores
+            output_format: "text" o "json"
+            profile: Correr además cProfile sobre el hilo principal
+            output_path: Archivo del reporte (por defecto stderr)
+        """
+        if output_format not in Tracer.FORMATS:
+            raise ValueError(f"Formato de traza desconocido: {output_format}")
+        Tracer.enabled = enabled
+        Tracer.output_format = output_format
+        # Absoluta: el reporte se escribe al salir, quizás después de un chdir (--repo)
+        Tracer.output_path = Path(output_path).absolute() if output_path else None
+        
+        if Tracer._profiler is not None:
+            Tracer._profiler.disable()
+            Tracer._profiler = None
+        if enabled and profile:
+            Tracer._profiler = cProfile.Profile()
+            Tracer._profiler.enable()
+        
+        if enabled and not Tracer._atexit_registered:
+            atexit.register(Tracer.emit)
+            Tracer._atexit_registered = True
+    
+    @staticmethod
+    def configure_from_env():
+        """Prende la traza si BRAVE_CM_TRACE lo pide ("1", "text", "json", con ",profile" opcional)"""
+        value = os.environ.get(Tracer.ENV_VAR, "").strip().lower()
+        if not value or value in ("0", "off", "false"):
+            return
+        options = {option.strip() for option in value.split(",")}
+        output_format = "json" if "json" in options else "text"
+        Tracer.configure(True, output_format, "profile" in options, os.environ.get(Tracer.OUTPUT_ENV_VAR) or None)
+    
+    @staticmethod
+    def span(name: str):
+        """
+        Abre un span (usar con with)
+        
+        Args:
+            name: Nombre del span (ej. "create_backup", "json.parse")
+        
+        Returns:
+            Context manager; con la traza apagada, uno que no hace nada
+        """
+        if not Tracer.enabled:
+            return Tracer._NULL
+        return _Span(name)
+    
+    @staticmethod
+    def count(name: str, amount: int = 1):
+        """
+        Suma a un contador del span activo y al total general
+        
+        Args:
+            name: Contador (ej. "files", "bytes", "json_bytes")
+            amount: Cantidad a sumar
+        """
+        if not Tracer.enabled:
+            return
+        path = Tracer._current_path()
+        with Tracer._lock:
+            Tracer._counters[name] = Tracer._counters.get(name, 0) + amount
+            if path:
+                stats = Tracer._spans.get(path)
+                if stats is None:
+                    stats = Tracer._spans[path] = _SpanStats()
+                stats.counters[name] = stats.counters.get(name, 0) + amount
+    
+    @staticmethod
+    def traced(name: str) -> Callable:
+        """Decorador: cada llamada a la función es un span"""
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not Tracer.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    @staticmethod
+    def bind(fn: Callable) -> Callable:
+        """
+        Hace que fn, al correr en otro hilo, cuelgue sus spans del span activo ahora
+        
+        Args:
+            fn: Tarea a enviar a un pool
+        
+        Returns:
+            fn tal cual con la traza apagada, o un envoltorio
+        """
+        if not Tracer.enabled:
+            return fn
+        path = Tracer._current_path()
+        
+        @functools.wraps(fn)
+        def bound(*args, **kwargs):
+            previous = Tracer._base()
+            Tracer._local.base = path
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                Tracer._local.base = previous
+        return bound
+    
+    @staticmethod
+    def reset():
+        """Descarta los spans y contadores registrados"""
+        with Tracer._lock:
+            Tracer._spans.clear()
+            Tracer._counters.clear()
+    
+    @staticmethod
+    def _profile_rows() -> List[Dict[str, Any]]:
+        """Funciones con más tiempo acumulado según cProfile"""
+        profiler = Tracer._profiler
+        if profiler is None:
+            return []
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        rows = []
+        for (filename, line, function), (calls, _, own, cumulative, _) in stats.stats.items():
+            rows.append({"function": f"{Path(filename).name}:{line}({function})", "calls": calls,
+                         "own_s": round(own, 6), "cumulative_s": round(cumulative, 6)})
+        rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+        profiler.enable()
+        return rows[:Tracer.PROFILE_TOP]
+    
+    @staticmethod
+    def report() -> Dict[str, Any]:
+        """
+        Reporte de lo registrado hasta ahora
+        
+        Returns:
+            {"operations": árbol de spans, "counters": totales, "profile": top de cProfile}
+            Cada nodo: name, calls, total_s, self_s, counters y children
+        """
+        with Tracer._lock:
+            spans = {path: (stats.calls, stats.total, stats.child, dict(stats.counters))
+                     for path, stats in Tracer._spans.items()}
+            counters = dict(Tracer._counters)
+        
+        nodes: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        
+        def node(path: Tuple[str, ...]) -> Dict[str, Any]:
+            if path not in nodes:
+                nodes[path] = {"name": path[-1], "calls": 0, "total_s": 0.0, "self_s": 0.0,
+                               "counters": {}, "children": []}
+                if len(path) > 1:
+                    node(path[:-1])["children"].append(nodes[path])
+            return nodes[path]
+        
+        for path in sorted(spans):
+            calls, total, child, span_counters = spans[path]
+            entry = node(path)
+            entry.update(calls=calls, total_s=round(total, 6), self_s=round(max(total - child, 0.0), 6),
+                         counters=span_counters)
+        
+        def by_time(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            entries.sort(key=lambda entry: entry["total_s"], reverse=True)
+            for entry in entries:
+                by_time(entry["children"])
+            return entries
+        
+        operations = by_time([entry for path, entry in nodes.items() if len(path) == 1])
+        return {"operations": operations, "counters": counters, "profile": Tracer._profile_rows()}
+    
+    @staticmethod
+    def _format_counters(counters: Dict[str, int]) -> str:
+        parts = []
+        for name, value in sorted(counters.items()):
+            if name.endswith("bytes"):
+                parts.append(f"{name}={value / (1024 * 1024):.1f}MB")
+            else:
+                parts.append(f"{name}={value}")
+        return " ".join(parts)
+    
+    @staticmethod
+    def format_text(report: Dict[str, Any]) -> str:
+        """Reporte legible: un renglón por span, indentado según el anidamiento"""
+        out = io.StringIO()
+        out.write("⏱️ Traza por operación\n")
+        
+        def write(entry: Dict[str, Any], depth: int):
+            label = "  " * depth + entry["name"]
+            line = (f"  {label:<40} {entry['calls']:>6}× {entry['total_s'] * 1000:>10.1f} ms "
+                    f"(propio {entry['self_s'] * 1000:.1f} ms)")
+            if entry["counters"]:
+                line += f"  {Tracer._format_counters(entry['counters'])}"
+            out.write(line + "\n")
+            for child in entry["children"]:
+                write(child, depth + 1)
+        
+        for operation in report["operations"]:
+            write(operation, 0)
+        if report["counters"]:
+            out.write(f"  Totales: {Tracer._format_counters(report['counters'])}\n")
+        if report["profile"]:
+            out.write(f"\n🔬 cProfile (top {len(report['profile'])} por tiempo acumulado)\n")
+            for row in report["profile"]:
+                out.write(f"  {row['cumulative_s'] * 1000:>10.1f} ms {row['own_s'] * 1000:>10.1f} ms "
+                          f"{row['calls']:>8}  {row['function']}\n")
+        return out.getvalue()
+    
+    @staticmethod
+    def emit():
+        """Escribe el reporte en el formato y destino configurados (si hay algo registrado)"""
+        if not Tracer.enabled or not (Tracer._spans or Tracer._counters or Tracer._profiler):
+            return
+        report = Tracer.report()
+        if Tracer.output_format == "json":
+            text = json.dumps(report, ensure_ascii=False, indent=2) + "\n"
+        else:
+            text = Tracer.format_text(report)
+        
+        if Tracer.output_path:
+            Tracer.output_path.write_text(text, encoding="utf-8")
+        else:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+
+
+Tracer.configure_from_env()
\ No newline at end of file